@@ -1,25 +1,44 @@
 import json
-import pandas as pd
+import os
 import re
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
-from textblob import TextBlob
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-import matplotlib.colors as mcolors
-from collections import defaultdict
-from apify_client import ApifyClient
-import base64
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from requests import HTTPError
-
-# Define stop words for filtering
-stop_words = set(stopwords.words('english'))
+from functools import lru_cache
+from sentiment_cache import SentimentCache
+from chart_renderer import hashtag_views_chart, render_charts, sentiment_chart, wordcloud_chart
+from report_delivery import deliver_report, load_delivery_config
+from json_stream import iter_json_items
+import twitter_analysis  # noqa: F401  (makes tweet_record importable)
+from tweet_record import TweetSchema
+
+# pandas, NLTK, TextBlob, the Apify client and the columnar store are imported by the
+# functions using them, so fetching and organising tweets does not pay for loading them.
+
+# Fields kept by filter_dataset_items
+DESIRED_FIELDS = [
+    "full_text", "lang", "reply_count", "retweet_count", "retweeted",
+    "user_id_str", "id_str", "url", "views_count", "created_at"
+]
+
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """
+    Load the NLTK English stop words on first use.
+
+    Returns:
+    frozenset: Stop words for filtering.
+    """
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=None)
+def get_sentiment_engine():
+    """
+    Create the batched sentiment engine shared by every analysis on first use.
+
+    Returns:
+    SentimentEngine: The shared engine.
+    """
+    from sentiment_engine import SentimentEngine
+    return SentimentEngine(get_stop_words())
 
 # Define the main functions
 def data_processing(text):
@@ -32,6 +51,8 @@ def data_processing(text):
     Returns:
     string: The cleaned and processed text.
     """
+    from nltk.tokenize import word_tokenize
+
     # Convert text to lowercase
     text = text.lower()
     # Remove URLs
@@ -43,6 +64,7 @@ def data_processing(text):
     # Tokenize text
     text_tokens = word_tokenize(text)
     # Filter out stop words
+    stop_words = get_stop_words()
     filtered_text = [w for w in text_tokens if not w in stop_words]
     return " ".join(filtered_text)
 
@@ -73,6 +95,7 @@ def stemming(data):
     Returns:
     list: List of stemmed words.
     """
+    from nltk.stem import PorterStemmer
     stemmer = PorterStemmer()
     return [stemmer.stem(word) for word in data]
 
@@ -86,116 +109,99 @@ def polarity(text):
     Returns:
     float: Polarity score.
     """
+    from textblob import TextBlob
     return TextBlob(text).sentiment.polarity
 
-def sentimental_analysis(df):
+def sentimental_analysis(df, cache=None, processes=1, similarity=None):
     """
     Perform sentiment analysis on the text data.
+
+    Runs the batched SentimentEngine instead of applying data_processing,
+    stemming, polarity and sentiment row by row. Rows with the same cleaned text,
+    or with a similarity, near copies such as retweets, are analysed once and weighted.
     
     Parameters:
-    df (DataFrame): DataFrame containing the text data.
+    df (DataFrame): DataFrame containing the text data. Rows sharing a 'tweet_id', such as the
+    hashtag rows of one tweet returned by data_cleaning, count as one tweet.
+    cache (SentimentCache): Optional persistent cache, so texts scored before are not rescored.
+    processes (int): Number of worker processes used for scoring.
+    similarity (float): Also collapse texts whose estimated shingle similarity reaches this
+    threshold, e.g. 0.8. None only collapses texts that are identical once cleaned.
     
     Returns:
-    DataFrame: DataFrame with sentiment analysis results.
+    DataFrame: DataFrame with sentiment analysis results, whose 'weight' column counts
+    the tweets of df every result stands for.
     """
-    # Create a DataFrame for text data
-    df_text = pd.DataFrame()
-    df_text['text'] = df['text']
-    # Apply text processing
-    df_text['text'] = df_text['text'].apply(data_processing)
-    # Remove duplicate texts
-    text_df = df_text.drop_duplicates()
-    # Apply stemming
-    text_df['text'] = text_df['text'].apply(lambda x: stemming(x))
-    # Compute polarity
-    text_df['polarity'] = text_df['text'].apply(polarity)
-    # Determine sentiment
-    text_df['sentiment'] = text_df['polarity'].apply(sentiment)
-    
-    return text_df
+    import numpy as np
+
+    # data_cleaning returns a row per hashtag of a tweet; keep one, so every tweet counts once
+    if 'tweet_id' in df:
+        df = df[~df['tweet_id'].duplicated() | df['tweet_id'].isna()]
 
-def plots(df, df_2):
+    # Clean, collapse, stem and score all texts in one batch, weighting every result by the rows it stands for
+    return get_sentiment_engine().analyse(df['text'], cache=cache, processes=processes,
+                                    weights=np.ones(len(df), dtype=np.int64), similarity=similarity)
+
+def plots(df, df_2, output_directory='.'):
     """
     Plot average views count per hashtag and sentiment distribution.
+
+    The charts are rendered headless by chart_renderer, and only when their data changed.
     
     Parameters:
     df (DataFrame): DataFrame containing hashtag and views count data.
     df_2 (DataFrame): DataFrame containing sentiment analysis results.
+    output_directory (string): Directory receiving hashtag_plot.png and sentiment_plot.png.
     
     Returns:
-    None
+    dict: Chart name -> PNG path.
     """
-    # Plotting Average views count per Hashtag
-    df = df.dropna(subset=['hashtag'])
-    plt.bar(df['hashtag'], df['views_count'], color='skyblue')
-
-    # Adding title and labels
-    plt.title('Average views count per Hashtag')
-    plt.xlabel('Hashtag')
-    plt.ylabel('Average views count')
-
-    # Rotate the x-axis labels for better readability
-    plt.xticks(rotation=45, ha='right')
-
-    # Display the plot
-    plt.tight_layout()
-    hashtag_plot_filename = 'hashtag_plot.png'
-    plt.savefig(hashtag_plot_filename)
-    plt.clf()
-    plt.show()
-
-    # Plotting Distribution of sentiments
-    fig = plt.figure(figsize=(7,7))
-    colors = ("yellowgreen", "gold", "red")
-    wp = {'linewidth': 2, 'edgecolor': "black"}
-    tags = df_2['sentiment'].value_counts()
-    explode = (0.1, 0.1, 0.1)
-    tags.plot(kind='pie', autopct='%1.1f%%', shadow=True, colors=colors,
-              startangle=90, wedgeprops=wp, explode=explode, label='')
-    plt.title('Distribution of sentiments')
-    plt.show()
+    return render_charts([hashtag_views_chart(df), sentiment_chart(df_2)], output_directory)
     
-def wordcloud(extract_data):
+def wordcloud(extract_data, word_stats=None, output_directory='.'):
     """
     Generate a word cloud with color indicating sentiment.
     
     Parameters:
     extract_data (DataFrame): DataFrame containing text and polarity data.
+    word_stats (WordSentimentStats): Optional statistics the tweets of extract_data are added to.
+    output_directory (string): Directory receiving wordcloud.png.
     
     Returns:
-    None
+    dict: Chart name -> PNG path.
+    """
+    from wordcloud_stats import WordSentimentStats
+
+    # Aggregate the polarity sum and mention count of every word
+    if word_stats is None:
+        word_stats = WordSentimentStats()
+    word_stats.update(extract_data)
+
+    # Render the word cloud from the aggregated mention counts and average sentiments
+    return render_charts([wordcloud_chart(word_stats)], output_directory)
+
+def report_charts(top_10, extract_data, word_stats=None, output_directory='.'):
+    """
+    Render every chart of the report in one batch, in parallel worker processes.
+
+    Parameters:
+    top_10 (DataFrame): DataFrame containing hashtag and views count data.
+    extract_data (DataFrame): DataFrame containing sentiment analysis results.
+    word_stats (WordSentimentStats): Optional statistics the tweets of extract_data are added to.
+    output_directory (string): Directory receiving the PNG files.
+
+    Returns:
+    dict: Chart name -> PNG path.
     """
-    # Tokenize the text and calculate the average polarity for each word
-    word_sentiment = defaultdict(list)
-    for _, row in extract_data.iterrows():
-        words = row['text'].split()
-        for word in words:
-            word_sentiment[word].append(row['polarity'])
-
-    # Calculate average sentiment for each word
-    word_avg_sentiment = {word: sum(sentiments) / len(sentiments) for word, sentiments in word_sentiment.items()}
-
-    # Define a function to determine the color of words in the word cloud
-    def color_func(word, **kwargs):
-        sentiment = word_avg_sentiment.get(word, 0)
-        # Normalize the sentiment score to be between 0 and 1 for the color map
-        norm_sentiment = (sentiment + 1) / 2
-        # Get the color from the RdYlGn color map
-        rgba_color = plt.cm.RdYlGn(norm_sentiment)
-        # Convert the RGBA color to hex format
-        return mcolors.rgb2hex(rgba_color)
-
-    # Generate word cloud
-    text = ' '.join(extract_data['text'])
-    wordcloud = WordCloud(width=800, height=400, color_func=color_func).generate(text)
-
-    # Display the generated image
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.show()
-
-def extract_tweets(api_token, actor_id, searchhashtag):
+    from wordcloud_stats import WordSentimentStats
+
+    if word_stats is None:
+        word_stats = WordSentimentStats()
+    word_stats.update(extract_data)
+    charts = [hashtag_views_chart(top_10), sentiment_chart(extract_data), wordcloud_chart(word_stats)]
+    return render_charts(charts, output_directory)
+
+def extract_tweets(api_token, actor_id, searchhashtag, client=None, result_file_path='tweets.json'):
     '''
     Extract tweets using Apify API.
     
@@ -203,12 +209,16 @@ def extract_tweets(api_token, actor_id, searchhashtag):
     api_token (string): Personal API token obtained from Apify.
     actor_id (string): Scraper ID provided by Apify.
     searchhashtag (string): Hashtag to search for tweets.
+    client: Client to run the actor with, e.g. a replay or synthetic client from apify_clients.make_client. Defaults to an ApifyClient.
+    result_file_path (string): Path of the JSON file receiving the dataset items.
 
     Returns:
     None
     '''
     # Initialize Apify client
-    client = ApifyClient(api_token)
+    if client is None:
+        from apify_client import ApifyClient
+        client = ApifyClient(api_token)
 
     # Define input for the Apify actor run
     run_input = {
@@ -223,88 +233,99 @@ def extract_tweets(api_token, actor_id, searchhashtag):
     run = client.actor(actor_id).call(run_input=run_input)
     dataset_id = run["defaultDatasetId"]
     
-    # Fetch dataset items
-    dataset_items = []
-    for item in client.dataset(dataset_id).iterate_items():
-        dataset_items.append(item)
-
-    # Save dataset items to a JSON file
-    result_file_path = 'tweets.json'
+    # Stream dataset items to a JSON file as they are downloaded
     with open(result_file_path, 'w') as file:
-        json.dump(dataset_items, file, ensure_ascii=False, indent=4)
+        file.write('[')
+        for index, item in enumerate(client.dataset(dataset_id).iterate_items()):
+            file.write(',\n' if index else '\n')
+            json.dump(item, file, ensure_ascii=False, indent=4)
+        file.write('\n]')
 
     print(f"Dataset items stored in '{result_file_path}'.")
 
-def filter_dataset_items(input_path, output_path, desired_fields, hashtag_filter):
+def item_hashtags(item):
     """
-    Filter dataset items to include only the desired fields and specified hashtag.
-    
+    Read the hashtag texts of a raw dataset item.
+
     Parameters:
-    input_path (string): Path to the input JSON file containing the original dataset items.
-    output_path (string): Path to save the filtered dataset items as a JSON file.
-    desired_fields (list): List of fields to be included in the filtered dataset items.
-    hashtag_filter (string): The specific hashtag to filter by (lowercase).
-    
+    item (dict): The raw tweet returned by the actor.
+
     Returns:
-    None
+    list: The hashtags, without '#'.
     """
-    # Load data from the input JSON file
-    with open(input_path, 'r') as file:
-        data = json.load(file)
+    return [hashtag['text'] for hashtag in item.get('entities', {}).get('hashtags', [])]
 
-    # Filter and extract desired fields from data
-    filtered_data = []
-    for item in data:
-        filtered_item = {field: item[field] for field in desired_fields if field in item}
-        hashtags = item.get('entities', {}).get('hashtags', [])
-        filtered_item['hashtags'] = [{'text': hashtag['text']} for hashtag in hashtags]
-        filtered_data.append(filtered_item)
+def filter_dataset_items(input_path, output_path, desired_fields, hashtag_filter=None):
+    """
+    Filter dataset items to include only the desired fields and specified hashtag.
 
-    # Save the filtered data to a new JSON file
-    with open(output_path, 'w') as file:
-        json.dump(filtered_data, file, indent=4)
+    The input is parsed one item at a time and every kept item is written as soon as it is
+    projected, so memory stays bounded however large the dump is.
 
-    print(f'Filtered data has been saved to {output_path}')
+    Parameters:
+    input_path (string): Path to the input file containing the original dataset items, as a JSON list or JSON lines.
+    output_path (string): Path to save the filtered dataset items as JSON lines, one compact item per line.
+    desired_fields (list): List of fields to be included in the filtered dataset items.
+    hashtag_filter (string): Only keep items tagged with this hashtag, with or without '#' and in any case.
+    None or '' keeps every item.
 
-def data_cleaning():
+    Returns:
+    int: Number of items saved.
+    """
+    # Filter and extract desired fields from data into compact records
+    fields = {field: field for field in desired_fields}
+    fields['hashtags'] = item_hashtags
+    schema = TweetSchema(fields, omit_missing=True)
+    hashtag_filter = hashtag_filter.lstrip('#').lower() if hashtag_filter else None
+
+    read = saved = 0
+    with open(output_path, 'w', encoding='utf-8') as file:
+        for item in iter_json_items(input_path):
+            read += 1
+            if hashtag_filter and not any(hashtag.lower() == hashtag_filter for hashtag in item_hashtags(item)):
+                continue
+            file.write(schema.record(item).dumps())
+            file.write('\n')
+            saved += 1
+
+    print(f'Filtered data has been saved to {output_path} ({saved} of {read} items)')
+    return saved
+
+def data_cleaning(store_path=None, keyword=None, since=None, until=None, filtered_path='required_tweet_content.jsonl'):
     """
     Clean and transform tweet data for analysis.
-    
+
+    Parameters:
+    store_path (string): Root directory of the columnar tweet store (see tweet_store.py). Queries only read
+    the needed columns and partitions; without a store, filtered_path is loaded.
+    keyword (string): Only analyse the tweets of this search keyword (store only).
+    since (string): Only analyse tweets created on or after this date, YYYY-MM-DD (store only).
+    until (string): Only analyse tweets created on or before this date, YYYY-MM-DD (store only).
+    filtered_path (string): Output of filter_dataset_items, analysed when no store is given.
+
     Returns:
     top_10 (DataFrame): DataFrame containing the top 10 hashtags by average views count.
-    extracted_df (DataFrame): DataFrame containing the cleaned tweet data.
+    extracted_df (DataFrame): DataFrame containing the cleaned tweet data, one row per hashtag of a tweet.
     """
-    # Load the filtered tweet content JSON file into a DataFrame
-    df = pd.read_json('required_tweet_content.json')
+    import pandas as pd
+    from tweet_store import hashtag_rows, hashtag_view_averages
+
+    if store_path is not None:
+        top_10 = hashtag_view_averages(store_path, 20, keyword, since, until)
+        return top_10, hashtag_rows(store_path, keyword, since, until)
+
+    # Load the filtered tweet content into a DataFrame, one item per line
+    df = pd.DataFrame(iter_json_items(filtered_path))
 
     # Check if the DataFrame has the required columns
     if 'user_id_str' in df.columns and 'views_count' in df.columns and 'full_text' in df.columns and 'hashtags' in df.columns:
-        # Initialize an empty list to store the extracted data
-        extracted_data = []
-
-        # Iterate over each row in the DataFrame
-        for index, row in df.iterrows():
-            username = row['user_id_str']
-            views_count = row['views_count']
-            text = row['full_text']
-            
-            # Ensure hashtags are in a list format
-            if isinstance(row['hashtags'], list):
-                hashtag_texts = [hashtag['text'] for hashtag in row['hashtags'] if 'text' in hashtag]
-            else:
-                hashtag_texts = []  # No hashtags or not in expected format
-
-            # Append data to the list
-            for hashtag_text in hashtag_texts:
-                extracted_data.append({
-                    'username': username,
-                    'views_count': views_count,
-                    'text': text,
-                    'hashtag': hashtag_text
-                })
-
-        # Create a DataFrame from the extracted data
-        extracted_df = pd.DataFrame(extracted_data)
+        # Ensure hashtags are in a list format, then give every hashtag its own row
+        hashtag_texts = df['hashtags'].map(
+            lambda hashtags: [hashtag['text'] for hashtag in hashtags if 'text' in hashtag] if isinstance(hashtags, list) else [])
+        tweet_ids = df['id_str'] if 'id_str' in df.columns else None
+        extracted_df = pd.DataFrame({'tweet_id': tweet_ids, 'username': df['user_id_str'],
+                                     'views_count': df['views_count'], 'text': df['full_text'], 'hashtag': hashtag_texts})
+        extracted_df = extracted_df.explode('hashtag').dropna(subset=['hashtag']).reset_index(drop=True)
 
     else:
         print("DataFrame does not have the required columns.")
@@ -320,6 +341,8 @@ def data_cleaning():
 
 # Main execution block
 if __name__ == "__main__":
+    from tweet_store import ingest_filtered_items
+
     api_token = 'Apify Api token'
     actor_id = "heLL6fUofdPgRXZie"
     searchterm = "#informs2023"
@@ -329,52 +352,25 @@ if __name__ == "__main__":
 
     # File paths for input and output
     input_file_path = 'tweets.json'
-    output_file_path = 'required_tweet_content.json'
-
-    # Desired fields for filtering
-    desired_fields = [
-        "full_text", "lang", "reply_count", "retweet_count", "retweeted",
-        "user_id_str", "id_str", "url", "views_count", "created_at"
-    ]
+    output_file_path = 'required_tweet_content.jsonl'
 
     # Filter dataset items
-    filter_dataset_items(input_file_path, output_file_path, desired_fields, 'businessanalysts')
+    filter_dataset_items(input_file_path, output_file_path, DESIRED_FIELDS, searchterm)
+
+    # Add the filtered tweets to the columnar store, then query it
+    store_path = 'tweet_store'
+    ingest_filtered_items(output_file_path, store_path, searchterm)
 
     # Clean and process data
-    top_10, extracted_data = data_cleaning()
-    extract_data = sentimental_analysis(extracted_data)
-
-    # Create and show the plots
-    plots(top_10, extract_data)
-    wordcloud(extract_data)
-
-    # Send the sentiment plot via email
-    SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-
-    # Authenticate and build the Gmail API service
-    flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-    creds = flow.run_local_server(port=0)
-    service = build('gmail', 'v1', credentials=creds)
-
-    # Create a MIMEMultipart message
-    message = MIMEMultipart()
-    message['to'] = 'himanishprakash23@gmail.com, himprakash@ucdavis.edu'
-    message['subject'] = 'Test Mail with Image Attachment'
-    message.attach(MIMEText('Yayy, first attempt successful with image!'))
-
-    # Attach the image to the email
-    with open("hashtag_plot.png", "rb") as image_file:
-        img_data = image_file.read()
-    image = MIMEImage(img_data)
-    image.add_header('Content-ID', '<image1>')  
-    message.attach(image)
-
-    # Encode the message in base64
-    encoded_message = {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
-
-    # Send the email
-    try:
-        sent_message = service.users().messages().send(userId="me", body=encoded_message).execute()
-        print(f'Sent message to {message["to"]}. Message Id: {sent_message["id"]}')
-    except HTTPError as error:
-        print(f'An error occurred: {error}')
+    top_10, extracted_data = data_cleaning(store_path, keyword=searchterm)
+    sentiment_cache = SentimentCache('sentiment_cache.sqlite')
+    extract_data = sentimental_analysis(extracted_data, cache=sentiment_cache, processes=os.cpu_count())
+    print(f"Sentiment cache hit rate: {sentiment_cache.hit_rate:.1%}")
+    sentiment_cache.close()
+
+    # Render the charts off-screen, skipping the ones whose data did not change. The word
+    # statistics are rebuilt from the store query, which already holds every earlier run
+    chart_paths = report_charts(top_10, extract_data)
+
+    # Email the charts inline to every recipient group, with the cached Gmail token or the configured transport
+    deliver_report(chart_paths, load_delivery_config('report_delivery.json'))
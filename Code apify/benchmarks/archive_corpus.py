@@ -0,0 +1,50 @@
+import glob
+import json
+import os
+import random
+
+ARCHIVE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'TWEET_ARCHIEVE')
+
+def load_archive_texts(archive_directory=ARCHIVE_DIRECTORY):
+    """
+    Load the tweet texts of every legacy tweets_*.json archive.
+
+    Parameters:
+    archive_directory (string): Directory searched recursively for archives.
+
+    Returns:
+    list: Tweet texts.
+    """
+    texts = []
+    for path in sorted(glob.glob(os.path.join(glob.escape(archive_directory), '**', 'tweets_*.json'), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as file:
+            for tweets in json.load(file).values():
+                texts.extend(tweet['text'] for tweet in tweets)
+    return texts
+
+def make_corpus(size, seed=0, retweet_ratio=0.3):
+    """
+    Build a corpus of the requested size from the archived texts.
+
+    Texts are reshuffled word by word so most of them are new, and a share of
+    them are repeated as retweets, like the archives themselves.
+
+    Parameters:
+    size (int): Number of texts.
+    seed (int): Seed of the random generator.
+    retweet_ratio (float): Share of texts repeating an earlier text.
+
+    Returns:
+    list: Tweet texts.
+    """
+    rng = random.Random(seed)
+    base = load_archive_texts()
+    corpus = []
+    for _ in range(size):
+        if corpus and rng.random() < retweet_ratio:
+            corpus.append(rng.choice(corpus))
+            continue
+        words = rng.choice(base).split()
+        rng.shuffle(words)
+        corpus.append(' '.join(words))
+    return corpus
@@ -0,0 +1,123 @@
+"""
+Benchmark the streaming filter_dataset_items against the previous json.load implementation.
+
+Writes a synthetic raw dump shaped like the tweets.json of extract_tweets (an indented
+JSON list) and the same items as JSON lines, then times both functions on it and
+measures their peak traced memory. The previous implementation ignores the hashtag
+filter, so it writes every item; the 'no filter' run does the same work with the streaming
+parser. Run from the Code apify directory:
+
+    python -m benchmarks.bench_filter_items --sizes 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from apify_code import DESIRED_FIELDS, filter_dataset_items, item_hashtags
+import twitter_analysis  # noqa: F401  (makes tweet_record and synthetic_tweets importable)
+from synthetic_tweets import make_keywords, make_tweets
+from tweet_record import TweetSchema
+
+# Tweets generated at a time while writing the dump
+CHUNK_SIZE = 10000
+
+def json_load_filter(input_path, output_path, desired_fields, hashtag_filter):
+    """
+    Previous filter_dataset_items, used as the reference.
+    """
+    with open(input_path, 'r') as file:
+        data = json.load(file)
+
+    fields = {field: field for field in desired_fields}
+    fields['hashtags'] = item_hashtags
+    schema = TweetSchema(fields, omit_missing=True)
+    filtered_data = [schema.record(item) for item in data]
+
+    with open(output_path, 'w') as file:
+        file.write('[')
+        for index, record in enumerate(filtered_data):
+            file.write(',\n' if index else '\n')
+            json.dump(record.to_json(), file, indent=4)
+        file.write('\n]')
+
+def write_dumps(size, keywords, directory):
+    """
+    Write the raw dump as a JSON list and as JSON lines, a chunk of tweets at a time.
+
+    Returns:
+    tuple: Paths of the JSON list and JSON lines files.
+    """
+    list_path = os.path.join(directory, 'tweets.json')
+    lines_path = os.path.join(directory, 'tweets.jsonl')
+    with open(list_path, 'w') as list_file, open(lines_path, 'w') as lines_file:
+        list_file.write('[')
+        written = 0
+        for start in range(0, size, CHUNK_SIZE):
+            tweets = make_tweets(min(CHUNK_SIZE, size - start), keywords, seed=start, first_id=1700000000000000000 + start,
+                                 entities=True)
+            for item in tweets:
+                list_file.write(',\n' if written else '\n')
+                json.dump(item, list_file, ensure_ascii=False, indent=4)
+                lines_file.write(json.dumps(item, ensure_ascii=False) + '\n')
+                written += 1
+        list_file.write('\n]')
+    return list_path, lines_path
+
+def measure(function, memory):
+    """
+    Time one call, then measure its peak traced memory in a second call.
+
+    Returns:
+    tuple: Wall time in seconds and peak memory in bytes (None if not measured).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        peak_memory = None
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return seconds, peak_memory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--keyword-count', type=int, default=10)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced memory measurement.')
+    args = parser.parse_args()
+
+    keywords = make_keywords(args.keyword_count)
+    hashtag = next(keyword for keyword in keywords if keyword.startswith('#'))
+    print(f"Filtering on {hashtag}")
+    print(f"{'size':>9} {'function':>22} {'input MiB':>10} {'seconds':>9} {'MiB/s':>8} {'items/s':>10} {'peak MiB':>9} {'kept':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            list_path, lines_path = write_dumps(size, keywords, directory)
+            output_path = os.path.join(directory, 'filtered')
+            configurations = [
+                ('json.load (previous)', list_path, lambda: json_load_filter(list_path, output_path, DESIRED_FIELDS, hashtag)),
+                ('streaming, no filter', list_path, lambda: filter_dataset_items(list_path, output_path, DESIRED_FIELDS, None)),
+                ('streaming, JSON list', list_path, lambda: filter_dataset_items(list_path, output_path, DESIRED_FIELDS, hashtag)),
+                ('streaming, JSON lines', lines_path, lambda: filter_dataset_items(lines_path, output_path, DESIRED_FIELDS, hashtag)),
+            ]
+            for name, input_path, function in configurations:
+                seconds, peak_memory = measure(function, not args.no_memory)
+                input_mib = os.path.getsize(input_path) / 2 ** 20
+                with open(output_path, 'r') as file:
+                    kept = sum(1 for _ in file) if name != 'json.load (previous)' else size
+                peak = f"{peak_memory / 2 ** 20:.1f}" if peak_memory is not None else '-'
+                print(f"{size:>9} {name:>22} {input_mib:>10.1f} {seconds:>9.2f} {input_mib / seconds:>8.1f} "
+                      f"{size / seconds:>10,.0f} {peak:>9} {kept:>9}", flush=True)
+
+if __name__ == '__main__':
+    main()
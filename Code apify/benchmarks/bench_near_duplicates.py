@@ -0,0 +1,85 @@
+"""
+Benchmark the sentiment analysis with near-duplicate collapsing against exact deduplication.
+
+The corpus is built from the archived texts like the other benchmarks, with a share of
+retweets, truncated retweets and copies with a different link, as in viral event weeks.
+Both runs are weighted, so their sentiment shares are compared directly; merges whose
+true shingle similarity is far below the threshold are counted as false merges.
+Run from the Code apify directory:
+
+    python -m benchmarks.bench_near_duplicates --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+import pandas as pd
+from apify_code import get_sentiment_engine, sentimental_analysis
+from benchmarks.archive_corpus import make_corpus
+import twitter_analysis  # noqa: F401  (makes near_duplicates and synthetic_tweets importable)
+from near_duplicates import cluster_representatives, strip_retweet
+from synthetic_tweets import make_near_copy
+
+def make_viral_corpus(size, copy_ratio, seed=0):
+    """
+    Build a corpus where a share of the texts are near copies of earlier ones.
+    """
+    rng = random.Random(seed)
+    corpus = make_corpus(size, seed, retweet_ratio=0)
+    for position in range(1, size):
+        if rng.random() < copy_ratio:
+            corpus[position] = make_near_copy(corpus[rng.randrange(position)], rng)
+    return corpus
+
+def shingles(tokens, size=3):
+    tokens = strip_retweet(tokens)
+    return {tuple(tokens[start:start + size]) for start in range(max(len(tokens) - size + 1, 1))}
+
+def false_merges(texts, similarity):
+    """
+    Count the texts merged with a representative whose exact shingle similarity is far below the threshold.
+
+    Returns:
+    tuple: Number of false merges and of merged texts.
+    """
+    token_lists = list({' '.join(tokens): tokens for tokens in get_sentiment_engine().tokenize(texts.unique())}.values())
+    representatives = cluster_representatives(token_lists, threshold=similarity).tolist()
+    merged = [(shingles(token_lists[position]), shingles(token_lists[representative]))
+              for position, representative in enumerate(representatives) if position != representative]
+    false = sum(len(first & second) / len(first | second) < similarity - 0.3 for first, second in merged)
+    return false, len(merged)
+
+def sentiment_shares(result):
+    return result.groupby('sentiment')['weight'].sum() / result['weight'].sum()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--copy-ratio', type=float, default=0.6)
+    parser.add_argument('--similarity', type=float, default=0.8)
+    args = parser.parse_args()
+
+    print(f"{'tweets':>8} {'exact rows':>11} {'exact (s)':>10} {'clusters':>9} {'collapsed (s)':>14} "
+          f"{'speedup':>8} {'max |share diff|':>17} {'false merges':>13}")
+    for size in args.sizes:
+        df = pd.DataFrame({'text': make_viral_corpus(size, args.copy_ratio)})
+
+        # Cold runs without a cache, so every distinct text is scored
+        start = time.perf_counter()
+        exact = sentimental_analysis(df, similarity=None)
+        exact_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        collapsed = sentimental_analysis(df, similarity=args.similarity)
+        collapsed_time = time.perf_counter() - start
+
+        if collapsed['weight'].sum() != size or exact['weight'].sum() != size:
+            raise SystemExit(f"Weights do not add up to {size} tweets")
+        share_diff = sentiment_shares(exact).sub(sentiment_shares(collapsed), fill_value=0).abs().max()
+
+        false, merged = false_merges(df['text'], args.similarity)
+
+        print(f"{size:>8} {len(exact):>11} {exact_time:>10.2f} {len(collapsed):>9} {collapsed_time:>14.2f} "
+              f"{exact_time / collapsed_time:>7.1f}x {share_diff:>17.4f} {false:>6}/{merged:<6}", flush=True)
+
+if __name__ == '__main__':
+    main()
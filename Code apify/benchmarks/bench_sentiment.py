@@ -0,0 +1,57 @@
+"""
+Benchmark the batched SentimentEngine against the per-row .apply chain.
+
+The reference chain is the previous sentimental_analysis with its stemming call
+fixed to stem words rather than characters, and TextBlob scoring the cleaned text.
+Run from the Code apify directory:
+
+    python -m benchmarks.bench_sentiment --sizes 10000 100000
+"""
+import argparse
+import time
+import pandas as pd
+from textblob import TextBlob
+from apify_code import data_processing, sentiment, stemming
+from benchmarks.archive_corpus import make_corpus
+from sentiment_engine import SentimentEngine
+
+def apply_chain(df):
+    """
+    Previous per-row sentiment pipeline, used as the reference.
+    """
+    df_text = pd.DataFrame()
+    df_text['text'] = df['text'].apply(data_processing)
+    text_df = df_text.drop_duplicates().copy()
+    text_df['polarity'] = text_df['text'].apply(lambda x: TextBlob(x).sentiment.polarity)
+    text_df['text'] = text_df['text'].apply(lambda x: " ".join(stemming(x.split())))
+    text_df['sentiment'] = text_df['polarity'].apply(sentiment)
+    return text_df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'tweets':>8} {'apply chain (s)':>16} {'engine (s)':>11} {'speedup':>8} {'max |dp|':>9} {'labels equal':>13}")
+    for size in args.sizes:
+        df = pd.DataFrame({'text': make_corpus(size)})
+
+        start = time.perf_counter()
+        expected = apply_chain(df)
+        chain_time = time.perf_counter() - start
+
+        # A new engine per size, so lexicon loading and stemmer warm-up are included
+        start = time.perf_counter()
+        actual = SentimentEngine().analyse(df['text'])
+        engine_time = time.perf_counter() - start
+
+        if not actual.index.equals(expected.index) or not (actual['text'] == expected['text']).all():
+            raise SystemExit(f"Engine rows differ from the apply chain for {size} tweets")
+        polarity_error = (actual['polarity'] - expected['polarity']).abs().max()
+        labels_equal = (actual['sentiment'] == expected['sentiment']).mean()
+
+        print(f"{size:>8} {chain_time:>16.2f} {engine_time:>11.2f} {chain_time / engine_time:>7.1f}x "
+              f"{polarity_error:>9.2g} {labels_equal:>12.2%}")
+
+if __name__ == '__main__':
+    main()
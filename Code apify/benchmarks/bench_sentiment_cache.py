@@ -0,0 +1,57 @@
+"""
+Benchmark process-pool scoring and the persistent sentiment cache.
+
+Scores the same corpus serially, with a process pool, with a cold cache and
+with a warm cache, and checks every configuration gives the same scores.
+Run from the Code apify directory:
+
+    python -m benchmarks.bench_sentiment_cache --size 100000 --processes 4
+"""
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from benchmarks.archive_corpus import make_corpus
+from sentiment_cache import SentimentCache
+from sentiment_engine import SentimentEngine
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    texts = pd.Series(make_corpus(args.size))
+    engine = SentimentEngine()
+    engine.lexicon  # Load the lexicon up front so every configuration is timed alike
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SentimentCache(os.path.join(directory, 'sentiment_cache.sqlite'))
+        configurations = [
+            ('serial', {}),
+            (f'{args.processes} processes', {'processes': args.processes}),
+            ('cold cache', {'cache': cache}),
+            ('warm cache', {'cache': cache}),
+            (f'warm, {args.processes} proc.', {'cache': cache, 'processes': args.processes}),
+        ]
+
+        expected = None
+        for name, options in configurations:
+            if 'cache' in options:
+                cache.hits = cache.misses = 0
+            start = time.perf_counter()
+            result = engine.analyse(texts, **options)
+            elapsed = time.perf_counter() - start
+
+            if expected is None:
+                expected = result
+            elif not result.equals(expected):
+                raise SystemExit(f"{name} results differ from the serial run")
+
+            hit_rate = f"{cache.hit_rate:.1%}" if 'cache' in options else '-'
+            print(f"{name:>18}: {elapsed:6.2f}s  cache hit rate {hit_rate}")
+        cache.close()
+
+if __name__ == '__main__':
+    main()
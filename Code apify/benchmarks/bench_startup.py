@@ -0,0 +1,140 @@
+"""
+Benchmark the startup cost of every cli.py command with python -X importtime.
+
+Runs fetch, organise, analyse, render and send one after the other in a scratch directory,
+against a synthetic Apify client and the outbox transport, so nothing leaves the machine.
+Each command runs in a fresh interpreter under -X importtime; the report shows its wall
+time, the time spent importing, the number of modules imported and the heaviest top level
+imports. The charts do not change between runs, so after the first one render finds them
+in its cache and skips matplotlib. The 'previous' row imports what apify_code.py loaded at
+module top before its imports were made lazy, the startup every command used to pay. Run
+from the Code apify directory:
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import twitter_analysis  # noqa: F401  (makes synthetic_tweets importable)
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cli.py')
+
+# Module top of apify_code.py and chart_renderer.py before their imports were made lazy
+PREVIOUS_IMPORTS = '''
+import sys
+sys.path.insert(0, {directory!r})
+import numpy, pandas
+from nltk.tokenize import word_tokenize
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer
+from textblob import TextBlob
+from apify_client import ApifyClient
+import matplotlib
+from matplotlib.figure import Figure
+from wordcloud import WordCloud
+from sentiment_engine import SentimentEngine
+from wordcloud_stats import WordSentimentStats
+from tweet_store import hashtag_rows
+from report_delivery import deliver_report
+SentimentEngine(set(stopwords.words('english')))
+'''
+
+# Commands in the order they run, each working on the output of the previous ones
+COMMANDS = [
+    ('--help', ['--help']),
+    ('fetch', ['fetch', '--setup', 'apify_setup.json']),
+    ('organise', ['organise']),
+    ('analyse', ['analyse', '--processes', '1']),
+    ('render', ['render', '--processes', '1']),
+    ('send', ['send', '--transport', 'outbox']),
+]
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def write_workspace(directory, tweets_per_day, keyword_count):
+    """
+    Write the synthetic Apify setup and the outbox delivery settings the commands use.
+    """
+    setup = {
+        'search_keywords': make_keywords(keyword_count),
+        'max_limit': tweets_per_day * 7,
+        'frequency': 'weekly',
+        'tweet_fields': TWEET_FIELDS,
+        'created_at_format': CREATED_AT_FORMAT,
+        'actor_id': 'synthetic',
+        'base_directory': 'TWEET_ARCHIEVE',
+        'client': {'backend': 'synthetic', 'tweets_per_day': tweets_per_day},
+    }
+    delivery = {'transport': 'outbox', 'recipient_groups': [{'name': 'benchmark', 'to': ['benchmark@example.com']}]}
+    for name, settings in (('apify_setup.json', setup), ('report_delivery.json', delivery)):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+            json.dump(settings, file, indent=4)
+
+def parse_importtime(stderr):
+    """
+    Sum up the -X importtime report of one run.
+
+    Returns:
+    tuple: Total import time in seconds, number of modules imported and
+    (cumulative seconds, name) of the top level imports.
+    """
+    total = modules = 0
+    top_level = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total += int(self_us)
+        modules += 1
+        if not indent[1:]:
+            top_level.append((int(cumulative_us) / 1e6, name))
+    return total / 1e6, modules, sorted(top_level, reverse=True)
+
+def run_command(arguments, directory):
+    """
+    Run one command under -X importtime.
+
+    Returns:
+    tuple: Wall time in seconds and the parsed import report.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=directory,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"{' '.join(arguments)} failed:\n" + '\n'.join(errors[-10:]))
+    return seconds, parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per command; the median is reported.')
+    parser.add_argument('--tweets-per-day', type=int, default=100)
+    parser.add_argument('--keyword-count', type=int, default=2)
+    parser.add_argument('--top', type=int, default=4, help='Heaviest top level imports shown per command.')
+    args = parser.parse_args()
+
+    code_directory = os.path.dirname(CLI_PATH)
+    configurations = [('previous', ['-c', PREVIOUS_IMPORTS.format(directory=code_directory)])]
+    configurations += [(name, [CLI_PATH] + arguments) for name, arguments in COMMANDS]
+
+    print(f"{'command':>10} {'wall s':>8} {'import s':>9} {'modules':>8}  heaviest imports (cumulative s)")
+    with tempfile.TemporaryDirectory() as directory:
+        write_workspace(directory, args.tweets_per_day, args.keyword_count)
+        for name, arguments in configurations:
+            runs = [run_command(arguments, directory) for _ in range(args.repeat)]
+            seconds = statistics.median(wall for wall, _ in runs)
+            import_seconds, modules, top_level = sorted(runs, key=lambda run: run[1][0])[len(runs) // 2][1]
+            heaviest = ', '.join(f"{module} {cumulative:.2f}" for cumulative, module in top_level[:args.top])
+            print(f"{name:>10} {seconds:>8.2f} {import_seconds:>9.2f} {modules:>8}  {heaviest}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+End-to-end benchmark suite of the ingest and analysis functions, compared with a stored baseline.
+
+Drives group_tweets_by_week, organise_tweets_to_json, filter_dataset_items, data_cleaning,
+sentimental_analysis and wordcloud with synthetic corpora of every requested size and
+keyword count, and records latency, throughput and peak memory. Results can be saved
+and later runs compared with them; regressions beyond the tolerance make the run fail.
+Run from the Code apify directory:
+
+    python -m benchmarks.bench_suite --output benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --tweets 1000 1000000 --keywords 1 100 --cases organise_tweets_to_json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from apify_code import DESIRED_FIELDS, data_cleaning, filter_dataset_items, sentimental_analysis, wordcloud
+from tweet_store import ingest_filtered_items
+import twitter_analysis  # noqa: F401  (makes apify_config and synthetic_tweets importable)
+from apify_config import group_tweets_by_week, organise_tweets_to_json
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords, make_tweets
+
+# Corpus sizes and keyword counts of the predefined scales
+SCALES = {
+    'small': ([1000, 10000], [1, 10]),
+    'full': ([1000, 10000, 100000, 1000000], [1, 10, 100]),
+}
+
+class Corpus:
+    """
+    Synthetic tweets of one size and keyword count, and the files derived from them.
+
+    Every derived input (the dataset dump, the filtered items, the store, the cleaned and
+    scored tweets) is prepared once, untimed, the first time a case needs it.
+
+    Parameters:
+    size (int): Number of tweets.
+    keyword_count (int): Number of search keywords.
+    directory (string): Scratch directory of the corpus.
+    """
+
+    def __init__(self, size, keyword_count, directory):
+        self.size = size
+        self.keywords = make_keywords(keyword_count)
+        self.directory = directory
+        self.tweets = make_tweets(size, self.keywords, entities=True)
+        self._prepared = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def prepared(self, name, prepare):
+        if name not in self._prepared:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._prepared[name] = prepare()
+        return self._prepared[name]
+
+    @property
+    def hashtag(self):
+        return next((keyword[1:].lower() for keyword in self.keywords if keyword.startswith('#')), '')
+
+    @property
+    def items_path(self):
+        def prepare():
+            with open(self.path('tweets.json'), 'w') as file:
+                json.dump(self.tweets, file, ensure_ascii=False)
+            return self.path('tweets.json')
+        return self.prepared('items', prepare)
+
+    @property
+    def filtered_path(self):
+        def prepare():
+            filter_dataset_items(self.items_path, self.path('required_tweet_content.jsonl'), DESIRED_FIELDS, self.hashtag)
+            return self.path('required_tweet_content.jsonl')
+        return self.prepared('filtered', prepare)
+
+    @property
+    def store_path(self):
+        def prepare():
+            ingest_filtered_items(self.filtered_path, self.path('tweet_store'), self.keywords[0])
+            return self.path('tweet_store')
+        return self.prepared('store', prepare)
+
+    @property
+    def extracted(self):
+        return self.prepared('extracted', lambda: data_cleaning(filtered_path=self.filtered_path)[1])
+
+    @property
+    def scored(self):
+        return self.prepared('scored', lambda: sentimental_analysis(self.extracted))
+
+# Each case prepares its inputs and returns the function to time
+def case_group_tweets_by_week(corpus):
+    # One call per keyword in the archive code; time the call of the first keyword
+    return lambda: group_tweets_by_week(corpus.tweets, corpus.keywords[0], TWEET_FIELDS, CREATED_AT_FORMAT)
+
+def case_organise_tweets_to_json(corpus):
+    def run():
+        setup = {"search_keywords": corpus.keywords, "tweet_fields": TWEET_FIELDS, "created_at_format": CREATED_AT_FORMAT,
+                 "base_directory": tempfile.mkdtemp(prefix='archive_', dir=corpus.directory)}
+        organise_tweets_to_json(corpus.tweets, setup)
+    return run
+
+def case_filter_dataset_items(corpus):
+    input_path = corpus.items_path
+    return lambda: filter_dataset_items(input_path, corpus.path('filtered_items.jsonl'), DESIRED_FIELDS, corpus.hashtag)
+
+def case_data_cleaning_json(corpus):
+    filtered_path = corpus.filtered_path
+    return lambda: data_cleaning(filtered_path=filtered_path)
+
+def case_data_cleaning_store(corpus):
+    store_path = corpus.store_path
+    return lambda: data_cleaning(store_path, keyword=corpus.keywords[0])
+
+def case_sentimental_analysis(corpus):
+    extracted = corpus.extracted
+    return lambda: sentimental_analysis(extracted)
+
+def case_wordcloud(corpus):
+    scored = corpus.scored
+    # Render into a new directory every time, so the chart cache never skips the rendering
+    return lambda: wordcloud(scored, output_directory=tempfile.mkdtemp(prefix='charts_', dir=corpus.directory))
+
+CASES = {
+    'group_tweets_by_week': case_group_tweets_by_week,
+    'organise_tweets_to_json': case_organise_tweets_to_json,
+    'filter_dataset_items': case_filter_dataset_items,
+    'data_cleaning[json]': case_data_cleaning_json,
+    'data_cleaning[store]': case_data_cleaning_store,
+    'sentimental_analysis': case_sentimental_analysis,
+    'wordcloud': case_wordcloud,
+}
+
+def measure(function, repeat, memory):
+    """
+    Time a function and measure its peak traced memory.
+
+    Memory is measured in a separate traced call made first, since tracemalloc slows
+    allocation-heavy code unevenly; that call also warms up lazy loads and caches. Only the
+    Python heap is traced, so buffers allocated by Arrow or NumPy in C are not counted.
+
+    Parameters:
+    function (callable): The function to measure.
+    repeat (int): Number of timed calls.
+    memory (bool): Whether to measure the peak memory.
+
+    Returns:
+    dict: Best and median wall time in seconds and peak memory in bytes (None if not measured).
+    """
+    timings = []
+    peak_memory = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        gc.collect()
+        if memory:
+            tracemalloc.start()
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            function()
+
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return {'seconds': min(timings), 'median_seconds': statistics.median(timings), 'peak_memory_bytes': peak_memory}
+
+def environment():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+def compare(result, baseline, tolerance):
+    """
+    Compare a result with its baseline.
+
+    Parameters:
+    result (dict): The measured result.
+    baseline (dict): The stored result of the same case, size and keyword count.
+    tolerance (float): Relative slowdown or memory growth accepted, e.g. 0.1 for 10%.
+
+    Returns:
+    tuple: (description of the ratios, True if the result regressed).
+    """
+    time_ratio = result['seconds'] / baseline['seconds']
+    description = f"{time_ratio:.2f}x time"
+    regressed = time_ratio > 1 + tolerance
+    if result['peak_memory_bytes'] and baseline.get('peak_memory_bytes'):
+        memory_ratio = result['peak_memory_bytes'] / baseline['peak_memory_bytes']
+        description += f", {memory_ratio:.2f}x memory"
+        regressed = regressed or memory_ratio > 1 + tolerance
+    return description, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Predefined sizes and keyword counts.')
+    parser.add_argument('--tweets', type=int, nargs='+', help='Corpus sizes, overriding the scale.')
+    parser.add_argument('--keywords', type=int, nargs='+', help='Keyword counts, overriding the scale.')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help='Timed calls per case; the best is kept.')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced memory measurement.')
+    parser.add_argument('--output', help='Write the results to this JSON file, e.g. to store a new baseline.')
+    parser.add_argument('--baseline', help='Compare with the results stored in this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Accepted relative slowdown or memory growth.')
+    args = parser.parse_args()
+
+    sizes, keyword_counts = SCALES[args.scale]
+    sizes, keyword_counts = args.tweets or sizes, args.keywords or keyword_counts
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            stored = json.load(file)
+        baseline = stored['results']
+        if stored.get('environment') != environment():
+            print(f"Note: the baseline was recorded on {stored.get('environment')}, not on {environment()}.")
+
+    results = {}
+    regressions = []
+    print(f"{'case':>24} {'tweets':>8} {'keywords':>8} {'seconds':>9} {'tweets/s':>10} {'peak MiB':>9}  baseline")
+    for size in sizes:
+        for keyword_count in keyword_counts:
+            directory = tempfile.mkdtemp(prefix='bench_suite_')
+            try:
+                corpus = Corpus(size, keyword_count, directory)
+                for name in args.cases:
+                    result = measure(CASES[name](corpus), args.repeat, not args.no_memory)
+                    result['tweets_per_second'] = size / result['seconds']
+                    key = f"{name}/{size}x{keyword_count}"
+                    results[key] = result
+
+                    comparison = ''
+                    if key in baseline:
+                        comparison, regressed = compare(result, baseline[key], args.tolerance)
+                        if regressed:
+                            regressions.append(key)
+                            comparison += '  REGRESSION'
+                    peak = f"{result['peak_memory_bytes'] / 2 ** 20:.1f}" if result['peak_memory_bytes'] is not None else '-'
+                    print(f"{name:>24} {size:>8} {keyword_count:>8} {result['seconds']:>9.3f} "
+                          f"{result['tweets_per_second']:>10,.0f} {peak:>9}  {comparison}", flush=True)
+            finally:
+                shutil.rmtree(directory)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=4)
+        print(f"Results saved to {args.output}")
+
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark the word cloud aggregation against the previous iterrows loop.
+
+Run from the Code apify directory:
+
+    python -m benchmarks.bench_wordcloud --sizes 10000 100000
+"""
+import argparse
+import math
+import time
+from collections import defaultdict
+import pandas as pd
+from benchmarks.archive_corpus import make_corpus
+from sentiment_engine import SentimentEngine
+from wordcloud_stats import WordSentimentStats
+
+def iterrows_averages(extract_data):
+    """
+    Previous word -> average polarity aggregation of wordcloud().
+    """
+    word_sentiment = defaultdict(list)
+    for _, row in extract_data.iterrows():
+        for word in row['text'].split():
+            word_sentiment[word].append(row['polarity'])
+    return {word: sum(sentiments) / len(sentiments) for word, sentiments in word_sentiment.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    engine = SentimentEngine()
+    print(f"{'tweets':>8} {'rows':>7} {'iterrows (s)':>13} {'groupby (s)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        extract_data = engine.analyse(pd.Series(make_corpus(size, retweet_ratio=0)))
+
+        start = time.perf_counter()
+        expected = iterrows_averages(extract_data)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = WordSentimentStats()
+        stats.update(extract_data)
+        actual = stats.averages()
+        groupby_time = time.perf_counter() - start
+
+        # The aggregation skips the numbers and stop words WordCloud would drop anyway
+        if any(not math.isclose(average, expected[word], abs_tol=1e-9) for word, average in actual.items()):
+            raise SystemExit(f"Averages differ from the iterrows loop for {size} tweets")
+
+        print(f"{size:>8} {len(extract_data):>7} {loop_time:>13.2f} {groupby_time:>12.2f} {loop_time / groupby_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+# Bump when the drawing code changes, so cached charts are rendered again
+RENDER_VERSION = 1
+
+# Chart name -> key of the aggregates its PNG was rendered from, kept in the output directory
+CACHE_INDEX_FILE = 'chart_cache.json'
+
+# WordCloud only draws the most frequent words
+WORDCLOUD_MAX_WORDS = 200
+
+SENTIMENT_COLORS = {'Positive': 'yellowgreen', 'Neutral': 'gold', 'Negative': 'red'}
+
+def hashtag_views_chart(top_10, name='hashtag_plot'):
+    """
+    Describe the bar chart of the average views count per hashtag.
+
+    Parameters:
+    top_10 (DataFrame): DataFrame containing hashtag and views count data.
+    name (string): Name of the chart, used as its file name.
+
+    Returns:
+    dict: The chart, holding only the aggregates it is drawn from.
+    """
+    top_10 = top_10.dropna(subset=['hashtag'])
+    return {'name': name, 'kind': 'bar', 'figsize': [6.4, 4.8], 'title': 'Average views count per Hashtag',
+            'xlabel': 'Hashtag', 'ylabel': 'Average views count', 'color': 'skyblue',
+            'labels': [str(hashtag) for hashtag in top_10['hashtag']],
+            'values': [float(views) for views in top_10['views_count']]}
+
+def sentiment_chart(extract_data, name='sentiment_plot'):
+    """
+    Describe the pie chart of the distribution of sentiments.
+
+    Parameters:
+    extract_data (DataFrame): DataFrame containing sentiment analysis results; rows are counted
+    'weight' times if it has a weight column.
+    name (string): Name of the chart, used as its file name.
+
+    Returns:
+    dict: The chart, holding only the aggregates it is drawn from.
+    """
+    if 'weight' in extract_data:
+        counts = extract_data.groupby('sentiment')['weight'].sum().sort_values(ascending=False, kind='stable')
+    else:
+        counts = extract_data['sentiment'].value_counts()
+    return {'name': name, 'kind': 'pie', 'figsize': [7, 7], 'title': 'Distribution of sentiments',
+            'labels': [str(label) for label in counts.index], 'values': [int(count) for count in counts]}
+
+def wordcloud_chart(word_stats, name='wordcloud'):
+    """
+    Describe the word cloud coloured by the average sentiment of each word.
+
+    Only the words WordCloud draws are kept, so the chart key does not change with rare words.
+
+    Parameters:
+    word_stats (WordSentimentStats): Word statistics of the analysed tweets.
+    name (string): Name of the chart, used as its file name.
+
+    Returns:
+    dict: The chart, holding only the aggregates it is drawn from.
+    """
+    # Same selection as WordCloud.generate_from_frequencies, ties included
+    frequencies = sorted(word_stats.frequencies().items(), key=itemgetter(1), reverse=True)[:WORDCLOUD_MAX_WORDS]
+    averages = word_stats.averages()
+    return {'name': name, 'kind': 'wordcloud', 'figsize': [10, 5],
+            'words': [[word, int(count), round(float(averages[word]), 6)] for word, count in frequencies]}
+
+def event_charts(results):
+    """
+    Describe one chart per analysed keyword, comparing its periods.
+
+    Parameters:
+    results (dict): Output of event_analysis.run_analysis.
+
+    Returns:
+    list: The charts, named 'event_<keyword>'.
+    """
+    charts = []
+    for keyword, result in results.items():
+        periods = result['periods']
+        panels = [['Tweets', [summary['tweets'] for summary in periods.values()]],
+                  ['Engagement per tweet', [round(summary['engagement_per_tweet'], 6) for summary in periods.values()]]]
+        if all('polarity' in summary for summary in periods.values()):
+            panels.append(['Average polarity', [round(summary['polarity'], 6) for summary in periods.values()]])
+        title = f"{keyword} ({result['type']})" if result.get('type') else keyword
+        charts.append({'name': f'event_{keyword}', 'kind': 'panels', 'figsize': [4 * len(panels), 4],
+                       'title': title, 'labels': list(periods), 'panels': panels})
+    return charts
+
+def chart_key(chart):
+    """
+    Hash the aggregates of a chart.
+
+    Parameters:
+    chart (dict): The chart.
+
+    Returns:
+    string: SHA-256 of the chart and the render version.
+    """
+    payload = json.dumps([RENDER_VERSION, chart], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def draw_bar(figure, chart):
+    axes = figure.add_subplot()
+    axes.bar(chart['labels'], chart['values'], color=chart['color'])
+    axes.set_title(chart['title'])
+    axes.set_xlabel(chart['xlabel'])
+    axes.set_ylabel(chart['ylabel'])
+    # Rotate the x-axis labels for better readability
+    for label in axes.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+    figure.tight_layout()
+
+def draw_pie(figure, chart):
+    axes = figure.add_subplot()
+    axes.pie(chart['values'], labels=chart['labels'], autopct='%1.1f%%', shadow=True, startangle=90,
+             colors=[SENTIMENT_COLORS.get(label, 'lightgrey') for label in chart['labels']],
+             wedgeprops={'linewidth': 2, 'edgecolor': "black"}, explode=[0.1] * len(chart['values']))
+    axes.set_title(chart['title'])
+
+def draw_wordcloud(figure, chart):
+    import matplotlib
+    from wordcloud import WordCloud
+
+    averages = {word: average for word, _, average in chart['words']}
+    colormap = matplotlib.colormaps['RdYlGn']
+
+    # Colour every word by its average sentiment, normalised to be between 0 and 1 for the color map
+    def color_func(word, **kwargs):
+        return matplotlib.colors.rgb2hex(colormap((averages.get(word, 0) + 1) / 2))
+
+    # A fixed random state lays out the same aggregates the same way
+    cloud = WordCloud(width=800, height=400, color_func=color_func, max_words=WORDCLOUD_MAX_WORDS, random_state=0)
+    cloud.generate_from_frequencies({word: count for word, count, _ in chart['words']})
+    axes = figure.add_subplot()
+    axes.imshow(cloud, interpolation='bilinear')
+    axes.axis('off')
+
+def draw_panels(figure, chart):
+    panels = figure.subplots(1, len(chart['panels']), squeeze=False)[0]
+    for axes, (title, values) in zip(panels, chart['panels']):
+        axes.bar(chart['labels'], values, color='skyblue')
+        axes.set_title(title)
+        for label in axes.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+    figure.suptitle(chart['title'])
+    figure.tight_layout()
+
+DRAWERS = {'bar': draw_bar, 'pie': draw_pie, 'wordcloud': draw_wordcloud, 'panels': draw_panels}
+
+def render_chart(chart, path):
+    """
+    Render a chart to a PNG file with the Agg backend, without touching the pyplot state.
+
+    matplotlib is only imported here, so describing charts stays cheap. The image is
+    written next to the target and renamed over it, so a crash never leaves a
+    truncated PNG behind.
+
+    Parameters:
+    chart (dict): The chart.
+    path (string): Path of the PNG file.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=chart['figsize'])
+    FigureCanvasAgg(figure)
+    DRAWERS[chart['kind']](figure, chart)
+    temp_path = f'{path}.tmp'
+    figure.savefig(temp_path, format='png')
+    os.replace(temp_path, path)
+
+def render_charts(charts, output_directory='.', processes=None):
+    """
+    Render charts whose aggregates changed since they were last rendered, in parallel.
+
+    Every PNG is recorded in the output directory's chart_cache.json with the key of
+    the aggregates it was drawn from; a chart with the same key and an existing PNG
+    is not rendered again.
+
+    Parameters:
+    charts (list): Charts from hashtag_views_chart, sentiment_chart, wordcloud_chart or event_charts.
+    output_directory (string): Directory receiving the <name>.png files.
+    processes (int): Number of worker processes. Defaults to the number of CPUs; 1 renders in this process.
+
+    Returns:
+    dict: Chart name -> PNG path, for every chart rendered or found in the cache.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    index_path = os.path.join(output_directory, CACHE_INDEX_FILE)
+    index = {}
+    if os.path.isfile(index_path):
+        with open(index_path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+
+    paths = {}
+    stale = []
+    for chart in charts:
+        key = chart_key(chart)
+        path = os.path.join(output_directory, f"{chart['name']}.png")
+        if index.get(chart['name']) == key and os.path.isfile(path):
+            paths[chart['name']] = path
+        else:
+            stale.append((chart, path, key))
+
+    processes = processes or os.cpu_count() or 1
+    if len(stale) > 1 and processes > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(stale))) as executor:
+            futures = [executor.submit(render_chart, chart, path) for chart, path, _ in stale]
+            outcomes = [future.exception() for future in futures]
+    else:
+        outcomes = []
+        for chart, path, _ in stale:
+            try:
+                render_chart(chart, path)
+                outcomes.append(None)
+            except Exception as e:
+                outcomes.append(e)
+
+    for (chart, path, key), error in zip(stale, outcomes):
+        if error is not None:
+            print(f"Error rendering the {chart['name']} chart: {error}")
+            index.pop(chart['name'], None)
+            continue
+        index[chart['name']] = key
+        paths[chart['name']] = path
+
+    with open(index_path, 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=4, ensure_ascii=False)
+    print(f"{len(stale)} of {len(charts)} charts rendered, {len(charts) - len(stale)} unchanged.")
+    return paths
+
+def main():
+    import twitter_analysis  # noqa: F401  (makes event_analysis importable)
+    from event_analysis import load_analysis_config, run_analysis, textblob_polarity
+
+    parser = argparse.ArgumentParser(description="Render the per-keyword and per-event charts of analysis_config.json.")
+    parser.add_argument('--config', default=os.path.join(twitter_analysis.TWITTER_ANALYSIS_DIRECTORY, 'analysis_config.json'))
+    parser.add_argument('--base-directory', default='TWEET_ARCHIEVE', help='Directory holding the archives.')
+    parser.add_argument('--output-directory', default='charts')
+    parser.add_argument('--processes', type=int, help='Number of worker processes (default: one per CPU).')
+    parser.add_argument('--no-sentiment', action='store_true', help='Skip the sentiment analysis.')
+    args = parser.parse_args()
+
+    results = run_analysis(load_analysis_config(args.config), args.base_directory,
+                           None if args.no_sentiment else textblob_polarity)
+    for name, path in render_charts(event_charts(results), args.output_directory, args.processes).items():
+        print(f"{name}: {path}")
+
+if __name__ == '__main__':
+    main()
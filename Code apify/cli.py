@@ -0,0 +1,240 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import twitter_analysis
+
+# Every command imports what it needs when it runs, so a scheduled fetch does not load
+# pandas, NLTK, TextBlob or matplotlib; keep the imports at the top of this file light.
+
+# Charts described by analyse, read by render and send, in the output directory
+CHARTS_FILE = 'charts.json'
+
+def load_charts(output_directory):
+    """
+    Load the charts described by the last analyse run.
+
+    Parameters:
+    output_directory (string): Directory holding charts.json.
+
+    Returns:
+    list: The charts, or an empty list if analyse has not run yet.
+    """
+    path = os.path.join(output_directory, CHARTS_FILE)
+    if not os.path.isfile(path):
+        print(f"No {path}; run the analyse command first.")
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def fetch(args):
+    """
+    Archive the tweets of the setup's keywords, or dump the dataset of one search term.
+
+    Parameters:
+    args (Namespace): Parsed command line arguments.
+
+    Returns:
+    bool: True on success.
+    """
+    if args.dump is None:
+        from apify_config import run
+        return run(args.setup)
+
+    from apify_clients import make_client
+    from apify_config import load_apify_setup
+    from apify_code import extract_tweets
+
+    setup = load_apify_setup(args.setup)
+    if not setup:
+        print(f"Error loading {args.setup}.")
+        return False
+    search_term = args.search_term or setup['search_keywords'][0]
+    extract_tweets(setup.get('api_token'), setup['actor_id'], search_term, client=make_client(setup),
+                   result_file_path=args.dump)
+    return True
+
+def organise(args):
+    """
+    Add tweets to the columnar store, from a dataset dump or from the keyword archives.
+
+    Parameters:
+    args (Namespace): Parsed command line arguments.
+
+    Returns:
+    bool: True if any tweet was stored.
+    """
+    from tweet_store import export_archive, ingest_filtered_items
+
+    if args.dump is None:
+        exported = export_archive(args.base_directory, args.store)
+        for keyword, count in exported.items():
+            print(f"{count} {keyword} tweets exported to {args.store}.")
+        return bool(exported)
+
+    from apify_code import DESIRED_FIELDS, filter_dataset_items
+
+    if not args.search_term:
+        print("--search-term is required with --dump.")
+        return False
+    if not filter_dataset_items(args.dump, args.filtered, DESIRED_FIELDS, args.search_term):
+        return False
+    ingest_filtered_items(args.filtered, args.store, args.search_term)
+    return True
+
+def analyse(args):
+    """
+    Analyse the stored tweets and describe the report charts in charts.json.
+
+    Every chart covers the tweets of the store query, e.g. of --since..--until.
+
+    Parameters:
+    args (Namespace): Parsed command line arguments.
+
+    Returns:
+    bool: True if the analysis produced charts.
+    """
+    from apify_code import data_cleaning, sentimental_analysis
+    from chart_renderer import event_charts, hashtag_views_chart, sentiment_chart, wordcloud_chart
+    from sentiment_cache import SentimentCache
+    from wordcloud_stats import WordSentimentStats
+
+    top_10, extracted_data = data_cleaning(args.store, args.search_term, args.since, args.until)
+    if extracted_data is None or extracted_data.empty:
+        print(f"No stored tweets with hashtags match the query in {args.store}.")
+        return False
+
+    sentiment_cache = SentimentCache(args.sentiment_cache)
+    try:
+        extract_data = sentimental_analysis(extracted_data, cache=sentiment_cache,
+                                            processes=args.processes or os.cpu_count(), similarity=args.similarity)
+        print(f"Sentiment cache hit rate: {sentiment_cache.hit_rate:.1%}")
+    finally:
+        sentiment_cache.close()
+
+    # The query already holds every earlier run, so the word statistics are rebuilt rather than added to
+    word_stats = WordSentimentStats()
+    word_stats.update(extract_data)
+    charts = [hashtag_views_chart(top_10), sentiment_chart(extract_data), wordcloud_chart(word_stats)]
+
+    if args.events:
+        from event_analysis import load_analysis_config, run_analysis, textblob_polarity
+        charts += event_charts(run_analysis(load_analysis_config(args.analysis_config), args.base_directory,
+                                            textblob_polarity))
+
+    os.makedirs(args.output_directory, exist_ok=True)
+    with open(os.path.join(args.output_directory, CHARTS_FILE), 'w', encoding='utf-8') as file:
+        json.dump(charts, file, indent=4, ensure_ascii=False)
+    print(f"{len(charts)} charts described in {os.path.join(args.output_directory, CHARTS_FILE)}.")
+    return True
+
+def render(args):
+    """
+    Render the charts of charts.json to PNG files, skipping the unchanged ones.
+
+    Parameters:
+    args (Namespace): Parsed command line arguments.
+
+    Returns:
+    bool: True if every chart has a PNG.
+    """
+    from chart_renderer import render_charts
+
+    charts = load_charts(args.output_directory)
+    paths = render_charts(charts, args.output_directory, args.processes)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    return bool(charts) and len(paths) == len(charts)
+
+def send(args):
+    """
+    Email the rendered charts to every recipient group.
+
+    Parameters:
+    args (Namespace): Parsed command line arguments.
+
+    Returns:
+    bool: True if every message was sent.
+    """
+    from report_delivery import deliver_report, load_delivery_config
+
+    if args.charts:
+        chart_paths = {os.path.splitext(os.path.basename(path))[0]: path for path in args.charts}
+    else:
+        chart_paths = {chart['name']: os.path.join(args.output_directory, f"{chart['name']}.png")
+                       for chart in load_charts(args.output_directory)}
+        chart_paths = {name: path for name, path in chart_paths.items() if os.path.isfile(path)}
+    if not chart_paths:
+        print("No chart to send; run the render command first.")
+        return False
+
+    config = load_delivery_config(args.config)
+    if args.transport:
+        config['transport'] = args.transport
+    results = deliver_report(chart_paths, config)
+    return all(message_id is not None for _, _, message_id in results)
+
+def build_parser():
+    """
+    Build the parser of every command.
+
+    Returns:
+    ArgumentParser: The parser; the handler of the chosen command is in its 'handler' default.
+    """
+    parser = argparse.ArgumentParser(description="Fetch, organise, analyse, render and send the tweet report.")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    setup_file = os.path.join(twitter_analysis.TWITTER_ANALYSIS_DIRECTORY, 'apify_setup.json')
+
+    command = commands.add_parser('fetch', help="Fetch tweets from the Apify actor.")
+    command.add_argument('--setup', default=setup_file, help='Path of apify_setup.json.')
+    command.add_argument('--dump', metavar='PATH',
+                         help="Save the raw dataset items of one search term here instead of archiving them.")
+    command.add_argument('--search-term', help='Search term of --dump. Defaults to the first keyword of the setup.')
+    command.set_defaults(handler=fetch)
+
+    command = commands.add_parser('organise', help="Add tweets to the columnar store.")
+    command.add_argument('--store', default='tweet_store', help='Root directory of the store.')
+    command.add_argument('--base-directory', default='TWEET_ARCHIEVE', help='Directory holding the keyword archives.')
+    command.add_argument('--dump', metavar='PATH', help="Filter and store a raw dataset dump instead of the archives.")
+    command.add_argument('--search-term', help='Hashtag the dump was fetched for; other items are dropped.')
+    command.add_argument('--filtered', default='required_tweet_content.jsonl', help='Filtered items of the dump.')
+    command.set_defaults(handler=organise)
+
+    command = commands.add_parser('analyse', help="Analyse the stored tweets and describe the charts.")
+    command.add_argument('--store', default='tweet_store', help='Root directory of the store.')
+    command.add_argument('--search-term', help='Only analyse the tweets of this keyword.')
+    command.add_argument('--since', help='Only tweets created on or after this date (YYYY-MM-DD).')
+    command.add_argument('--until', help='Only tweets created on or before this date (YYYY-MM-DD).')
+    command.add_argument('--similarity', type=float,
+                         help='Also score near copies once, e.g. 0.8 (default: only identical texts).')
+    command.add_argument('--processes', type=int, help='Number of scoring processes (default: one per CPU).')
+    command.add_argument('--sentiment-cache', default='sentiment_cache.sqlite')
+    command.add_argument('--events', action='store_true', help='Add the per-event charts of analysis_config.json.')
+    command.add_argument('--analysis-config',
+                         default=os.path.join(twitter_analysis.TWITTER_ANALYSIS_DIRECTORY, 'analysis_config.json'))
+    command.add_argument('--base-directory', default='TWEET_ARCHIEVE', help='Directory holding the archives (--events).')
+    command.add_argument('--output-directory', default='charts')
+    command.set_defaults(handler=analyse)
+
+    command = commands.add_parser('render', help="Render the described charts to PNG files.")
+    command.add_argument('--output-directory', default='charts')
+    command.add_argument('--processes', type=int, help='Number of worker processes (default: one per CPU).')
+    command.set_defaults(handler=render)
+
+    command = commands.add_parser('send', help="Email the rendered charts.")
+    command.add_argument('charts', nargs='*', help='PNG files to send. Defaults to the rendered charts.')
+    command.add_argument('--output-directory', default='charts')
+    command.add_argument('--config', default='report_delivery.json')
+    command.add_argument('--transport', choices=['gmail', 'outbox', 'smtp'],
+                         help='Overrides the configured transport.')
+    command.set_defaults(handler=send)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+    return 0 if args.handler(args) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
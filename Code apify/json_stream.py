@@ -0,0 +1,87 @@
+import json
+
+# Characters read from the file at a time when parsing a JSON list
+READ_CHUNK_SIZE = 1 << 20
+
+# Characters an item of a JSON list may span before the file is reported as malformed
+MAX_ITEM_SIZE = 16 << 20
+
+WHITESPACE = ' \t\r\n'
+
+def is_json_lines(path):
+    """
+    Tell a JSON lines file from a JSON list by its first non-blank character.
+
+    Parameters:
+    path (string): Path of the file.
+
+    Returns:
+    bool: False if the file holds a JSON list, True otherwise (an empty file counts as JSON lines).
+    """
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        while True:
+            chunk = file.read(4096)
+            if not chunk:
+                return True
+            stripped = chunk.lstrip(WHITESPACE)
+            if stripped:
+                return stripped[0] != '['
+
+def iter_json_items(path, chunk_size=READ_CHUNK_SIZE, max_item_size=MAX_ITEM_SIZE):
+    """
+    Yield the items of a JSON list or JSON lines file one at a time.
+
+    JSON lists, such as the tweets.json dump of extract_tweets, are read in chunks and
+    decoded item by item, so memory stays bounded by the largest item rather than the file.
+    An item that still does not decode once it spans max_item_size characters is reported
+    as malformed, instead of reading the rest of the file into memory.
+
+    Parameters:
+    path (string): Path of the file.
+    chunk_size (int): Characters read at a time from a JSON list.
+    max_item_size (int): Characters an item of a JSON list may span.
+
+    Returns:
+    generator: The decoded items.
+    """
+    if is_json_lines(path):
+        with open(path, 'r', encoding='utf-8-sig') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        # Skip the opening bracket
+        buffer = ''
+        while not buffer:
+            buffer = file.read(chunk_size).lstrip(WHITESPACE)
+        buffer = buffer[1:]
+        position = 0
+        at_end = False
+        while True:
+            # Skip the separator before the next item
+            while position < len(buffer) and buffer[position] in WHITESPACE + ',':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                # A number may continue in the next chunk, e.g. '12' of '1234' or '9876.' of '9876.5'
+                complete = at_end or (end < len(buffer) and buffer[end] in WHITESPACE + ',]')
+            except json.JSONDecodeError:
+                if at_end:
+                    raise
+                complete = False
+            if not complete:
+                if len(buffer) - position > max_item_size:
+                    raise json.JSONDecodeError(f'Item longer than {max_item_size} characters', buffer, position)
+                # The item continues past the buffer: keep its start and read more
+                chunk = file.read(chunk_size)
+                at_end = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item
+            position = end
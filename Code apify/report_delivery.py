@@ -0,0 +1,382 @@
+import argparse
+import base64
+import json
+import os
+import smtplib
+import sys
+import time
+from datetime import datetime
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+
+GMAIL_SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
+
+# Settings used when report_delivery.json does not define them
+DEFAULT_DELIVERY = {
+    'transport': 'gmail',
+    'sender': None,
+    'subject': 'Tweet analysis report',
+    'body': 'The charts of this week\'s tweets are below.',
+    'recipient_groups': [{'name': 'default', 'to': ['himanishprakash23@gmail.com', 'himprakash@ucdavis.edu']}],
+    'max_recipients_per_message': 100,
+    'max_retries': 3,
+    'retry_backoff': 2.0,
+    'messages_per_second': 2.0,
+    'credentials_file': 'credentials.json',
+    'token_file': 'token.json',
+    'smtp_host': 'localhost',
+    'smtp_port': 25,
+    'smtp_starttls': False,
+    'smtp_username': None,
+    'smtp_password_env': 'SMTP_PASSWORD',
+    'outbox_directory': 'outbox',
+}
+
+# SMTP reply codes worth retrying: temporary failures, server busy or shutting down
+TRANSIENT_SMTP_CODES = range(400, 500)
+
+# Gmail API statuses worth retrying: rate limited or server errors
+TRANSIENT_HTTP_STATUSES = {429, 500, 502, 503, 504}
+
+def load_delivery_config(config_path='report_delivery.json'):
+    """
+    Load the delivery settings, falling back to DEFAULT_DELIVERY for missing keys.
+
+    Parameters:
+    config_path (string): Path of the JSON settings file. A missing file gives the defaults.
+
+    Returns:
+    dict: The delivery settings.
+    """
+    config = dict(DEFAULT_DELIVERY)
+    if os.path.isfile(config_path):
+        with open(config_path, 'r', encoding='utf-8') as file:
+            config.update(json.load(file))
+    return config
+
+def load_gmail_credentials(credentials_file='credentials.json', token_file='token.json', interactive=None):
+    """
+    Load cached Gmail credentials, refreshing them when they expired.
+
+    The browser consent flow only runs when no usable token is cached, and the
+    resulting token is saved for the next runs.
+
+    Parameters:
+    credentials_file (string): OAuth client secrets downloaded from the Google Cloud console.
+    token_file (string): Cache of the authorised user's token.
+    interactive (bool): Whether the consent flow may run. Defaults to whether stdin is a terminal,
+                        so scheduled runs fail fast instead of waiting for a browser.
+
+    Returns:
+    Credentials: Valid Gmail credentials.
+    """
+    from google.auth.exceptions import RefreshError
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
+    creds = None
+    if os.path.isfile(token_file):
+        creds = Credentials.from_authorized_user_file(token_file, GMAIL_SCOPES)
+    if creds and creds.valid:
+        return creds
+
+    if creds and creds.expired and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+        except RefreshError as e:
+            print(f"Could not refresh the cached Gmail token: {e}")
+            creds = None
+
+    if not creds or not creds.valid:
+        if interactive is None:
+            interactive = sys.stdin.isatty()
+        if not interactive:
+            raise RuntimeError(f"No valid Gmail token in {token_file}. Run 'python report_delivery.py --authorize' once.")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(credentials_file, GMAIL_SCOPES)
+        creds = flow.run_local_server(port=0)
+
+    # The token grants access to the mailbox, so keep it readable by the owner only
+    temp_path = f'{token_file}.tmp'
+    with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+        file.write(creds.to_json())
+    os.replace(temp_path, token_file)
+    return creds
+
+class GmailTransport:
+    """
+    Send messages with the Gmail API, authenticated with cached credentials.
+
+    Parameters:
+    config (dict): Delivery settings; uses credentials_file and token_file.
+    """
+
+    def __init__(self, config):
+        from googleapiclient.discovery import build
+        creds = load_gmail_credentials(config['credentials_file'], config['token_file'], config.get('interactive_auth'))
+        self.service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+
+    def send(self, message):
+        encoded_message = {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+        return self.service.users().messages().send(userId="me", body=encoded_message).execute()['id']
+
+    def is_transient(self, error):
+        from googleapiclient.errors import HttpError
+        if isinstance(error, HttpError):
+            return error.resp.status in TRANSIENT_HTTP_STATUSES
+        return isinstance(error, OSError)
+
+    def close(self):
+        self.service.close()
+
+class SmtpTransport:
+    """
+    Send messages through an SMTP server, keeping one connection open for the whole delivery.
+
+    Parameters:
+    config (dict): Delivery settings; uses smtp_host, smtp_port, smtp_starttls, smtp_username
+                   and the password in the smtp_password_env environment variable.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.connection = None
+
+    def connect(self):
+        connection = smtplib.SMTP(self.config['smtp_host'], self.config['smtp_port'], timeout=60)
+        if self.config['smtp_starttls']:
+            connection.starttls()
+        if self.config['smtp_username']:
+            connection.login(self.config['smtp_username'], os.environ.get(self.config['smtp_password_env'], ''))
+        return connection
+
+    def send(self, message):
+        if self.connection is None:
+            self.connection = self.connect()
+        try:
+            self.connection.send_message(message)
+        except OSError:
+            # Start the next attempt on a new connection
+            self.close()
+            raise
+        return message['Message-ID']
+
+    def is_transient(self, error):
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code in TRANSIENT_SMTP_CODES
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        # Network errors, but not refused recipients or failed logins
+        return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except OSError:
+                self.connection.close()
+            self.connection = None
+
+class OutboxTransport:
+    """
+    Write messages as .eml files to a local directory instead of sending them, e.g. to test a report.
+
+    Parameters:
+    config (dict): Delivery settings; uses outbox_directory.
+    """
+
+    def __init__(self, config):
+        self.directory = config['outbox_directory']
+        os.makedirs(self.directory, exist_ok=True)
+        self.count = 0
+
+    def send(self, message):
+        self.count += 1
+        path = os.path.join(self.directory, f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.count}.eml")
+        with open(path, 'wb') as file:
+            file.write(message.as_bytes())
+        return path
+
+    def is_transient(self, error):
+        return False
+
+    def close(self):
+        pass
+
+TRANSPORTS = {'gmail': GmailTransport, 'smtp': SmtpTransport, 'outbox': OutboxTransport}
+
+def make_transport(config):
+    """
+    Create the transport selected by the 'transport' setting.
+
+    Parameters:
+    config (dict): Delivery settings.
+
+    Returns:
+    object: A transport exposing send(message), is_transient(error) and close().
+    """
+    if config['transport'] not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{config['transport']}', expected one of {', '.join(TRANSPORTS)}.")
+    return TRANSPORTS[config['transport']](config)
+
+class RateLimiter:
+    """
+    Space out calls so no more than a given number happen per second.
+
+    Parameters:
+    per_second (float): Maximum calls per second; 0 or None disables the limit.
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self.next_call = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_call:
+            time.sleep(self.next_call - now)
+            now = self.next_call
+        self.next_call = now + self.interval
+
+def recipient_batches(recipient_groups, max_recipients):
+    """
+    Split the recipient groups into the recipient lists of individual messages.
+
+    Parameters:
+    recipient_groups (list): Groups as {'name': ..., 'to': [addresses]}.
+    max_recipients (int): Maximum recipients per message.
+
+    Returns:
+    list: (group name, addresses) per message.
+    """
+    batches = []
+    for group in recipient_groups:
+        addresses = list(dict.fromkeys(group['to']))
+        for start in range(0, len(addresses), max_recipients):
+            batches.append((group.get('name', ''), addresses[start:start + max_recipients]))
+    return batches
+
+def build_report_message(subject, body, chart_paths):
+    """
+    Build the report message with every chart shown inline below the text.
+
+    The message is built once and only its recipients change between sends, so the
+    images are read and encoded a single time.
+
+    Parameters:
+    subject (string): Subject of the email.
+    body (string): Text shown above the charts.
+    chart_paths (dict): Chart name -> PNG path, e.g. from report_charts.
+
+    Returns:
+    MIMEMultipart: The message, without recipients.
+    """
+    message = MIMEMultipart('related')
+    message['Subject'] = subject
+
+    alternative = MIMEMultipart('alternative')
+    alternative.attach(MIMEText(body))
+    images = ''.join(f'<p><img src="cid:image{index}" alt="{name}"></p>'
+                     for index, name in enumerate(chart_paths, start=1))
+    alternative.attach(MIMEText(f'<p>{body}</p>{images}', 'html'))
+    message.attach(alternative)
+
+    for index, chart_path in enumerate(chart_paths.values(), start=1):
+        with open(chart_path, "rb") as image_file:
+            image = MIMEImage(image_file.read())
+        image.add_header('Content-ID', f'<image{index}>')
+        image.add_header('Content-Disposition', 'inline', filename=os.path.basename(chart_path))
+        message.attach(image)
+    return message
+
+def send_with_retries(transport, message, max_retries, retry_backoff):
+    """
+    Send a message, retrying transient failures with exponential backoff.
+
+    Parameters:
+    transport (object): Transport from make_transport.
+    message (Message): The message to send.
+    max_retries (int): Retries after the first attempt.
+    retry_backoff (float): Delay before the first retry in seconds, doubled after each attempt.
+
+    Returns:
+    string: The message id returned by the transport.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return transport.send(message)
+        except Exception as e:
+            if attempt == max_retries or not transport.is_transient(e):
+                raise
+            delay = retry_backoff * (2 ** attempt)
+            print(f"Sending the report failed ({e}), retrying in {delay:.1f}s.")
+            time.sleep(delay)
+
+def deliver_report(chart_paths, config=None, transport=None):
+    """
+    Email the report charts to every recipient group, one message per group.
+
+    Groups larger than max_recipients_per_message are split into several messages,
+    and messages are spaced out to stay under messages_per_second.
+
+    Parameters:
+    chart_paths (dict): Chart name -> PNG path, e.g. from report_charts.
+    config (dict): Delivery settings from load_delivery_config. Defaults to DEFAULT_DELIVERY.
+    transport (object): Transport to send with. Defaults to the one selected by the settings.
+
+    Returns:
+    list: (group name, addresses, message id or None if sending failed) per message.
+    """
+    config = config or dict(DEFAULT_DELIVERY)
+    message = build_report_message(config['subject'], config['body'], chart_paths)
+    # Gmail fills in the authorised account; SMTP servers need an explicit sender
+    if config['sender']:
+        message['From'] = config['sender']
+    rate_limiter = RateLimiter(config['messages_per_second'])
+    transport = transport or make_transport(config)
+
+    results = []
+    try:
+        for name, addresses in recipient_batches(config['recipient_groups'], config['max_recipients_per_message']):
+            for header in ('To', 'Date', 'Message-ID'):
+                del message[header]
+            message['To'] = ', '.join(addresses)
+            message['Date'] = formatdate(localtime=True)
+            message['Message-ID'] = make_msgid()
+            rate_limiter.wait()
+            try:
+                message_id = send_with_retries(transport, message, config['max_retries'], config['retry_backoff'])
+                print(f'Sent message to {len(addresses)} recipients of the {name} group. Message Id: {message_id}')
+            except Exception as error:
+                message_id = None
+                print(f'An error occurred sending to the {name} group: {error}')
+            results.append((name, addresses, message_id))
+    finally:
+        transport.close()
+
+    sent = sum(1 for result in results if result[2] is not None)
+    print(f"{sent} of {len(results)} report messages sent.")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Email report charts, or cache the Gmail token for scheduled runs.")
+    parser.add_argument('charts', nargs='*', help='PNG files to send.')
+    parser.add_argument('--config', default='report_delivery.json')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), help='Overrides the configured transport.')
+    parser.add_argument('--authorize', action='store_true', help='Run the Gmail consent flow once and cache the token.')
+    args = parser.parse_args()
+
+    config = load_delivery_config(args.config)
+    if args.transport:
+        config['transport'] = args.transport
+    if args.authorize:
+        load_gmail_credentials(config['credentials_file'], config['token_file'], interactive=True)
+        print(f"Gmail token saved to {config['token_file']}.")
+    if args.charts:
+        chart_paths = {os.path.splitext(os.path.basename(path))[0]: path for path in args.charts}
+        deliver_report(chart_paths, config)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import hashlib
+import sqlite3
+
+# Bump when the scoring changes, so stale scores are dropped
+CACHE_VERSION = 1
+
+# Maximum number of parameters bound in a single SQLite query
+QUERY_CHUNK_SIZE = 500
+
+def text_key(text):
+    """
+    Hash a normalized text into a cache key.
+
+    Parameters:
+    text (string): The cleaned text, i.e. its tokens joined by spaces.
+
+    Returns:
+    bytes: 16-byte BLAKE2b digest.
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+class SentimentCache:
+    """
+    Persistent, size-bounded cache of polarity scores keyed by a hash of the normalized text.
+
+    Retweets and texts scored in earlier runs are looked up instead of rescored.
+    Every hit refreshes the entry, and once the cache holds more than max_entries
+    scores the least recently used ones are evicted.
+
+    Parameters:
+    path (string): Path of the SQLite file, or ':memory:'.
+    max_entries (int): Maximum number of cached scores.
+    """
+
+    def __init__(self, path='sentiment_cache.sqlite', max_entries=1000000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS scores (
+                key BLOB PRIMARY KEY,
+                polarity REAL NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if meta.get('version') != CACHE_VERSION:
+            with self.connection:
+                self.connection.execute("DELETE FROM scores")
+                self.connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                            (('version', CACHE_VERSION), ('entries', 0)))
+        elif 'entries' not in meta:
+            # Caches written before the entry count was kept are counted once
+            with self.connection:
+                self.connection.execute("INSERT INTO meta (key, value) SELECT 'entries', COUNT(*) FROM scores")
+        # Logical clock ordering the entries by last use
+        self.clock = self.connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM scores").fetchone()[0]
+
+    @property
+    def hit_rate(self):
+        """
+        Share of lookups answered from the cache since it was opened.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_many(self, keys):
+        """
+        Look up cached scores.
+
+        Parameters:
+        keys (list): Cache keys from text_key.
+
+        Returns:
+        dict: Key -> polarity for every cached key.
+        """
+        keys = list(set(keys))
+        found = {}
+        self.clock += 1
+        with self.connection:
+            for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+                chunk = keys[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.connection.execute(
+                    f"SELECT key, polarity FROM scores WHERE key IN ({placeholders})", chunk))
+                # Refresh the entries that were used
+                self.connection.execute(f"UPDATE scores SET last_used = ? WHERE key IN ({placeholders})",
+                                        [self.clock] + chunk)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, scores):
+        """
+        Store scores and evict the least recently used entries beyond max_entries.
+
+        The number of entries is kept in the meta table, so the cache is not counted on every call.
+
+        Parameters:
+        scores (dict): Key -> polarity.
+        """
+        if not scores:
+            return
+        self.clock += 1
+        rows = [(float(polarity), self.clock, key) for key, polarity in scores.items()]
+        with self.connection:
+            # Update the cached keys, then insert the others and count them
+            self.connection.executemany("UPDATE scores SET polarity = ?, last_used = ? WHERE key = ?", rows)
+            added = self.connection.executemany(
+                "INSERT OR IGNORE INTO scores (polarity, last_used, key) VALUES (?, ?, ?)", rows).rowcount
+            self.connection.execute("UPDATE meta SET value = value + ? WHERE key = 'entries'", (added,))
+            entries = self.connection.execute("SELECT value FROM meta WHERE key = 'entries'").fetchone()[0]
+            if entries > self.max_entries:
+                evicted = self.connection.execute("DELETE FROM scores WHERE key IN "
+                                                  "(SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+                                                  (entries - self.max_entries,)).rowcount
+                self.connection.execute("UPDATE meta SET value = value - ? WHERE key = 'entries'", (evicted,))
+
+    def stats(self):
+        """
+        Returns:
+        dict: Hit and miss counters and the hit rate.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,302 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer
+from sentiment_cache import text_key
+import twitter_analysis  # noqa: F401  (makes near_duplicates importable)
+from near_duplicates import cluster_representatives
+
+# Regexes of data_processing, compiled once
+URL_PATTERN = re.compile(r"https\S+|www\S+https\S+", flags=re.MULTILINE)
+MENTION_HASHTAG_PATTERN = re.compile(r'\@w+|\#')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+# Words word_tokenize splits even without punctuation (Treebank contractions)
+TREEBANK_SPLITS = {"cannot": ("can", "not"), "gimme": ("gim", "me"), "gonna": ("gon", "na"),
+                   "gotta": ("got", "ta"), "lemme": ("lem", "me"), "wanna": ("wan", "na")}
+TREEBANK_WORDS = frozenset(TREEBANK_SPLITS)
+
+# Sentiment labels indexed by the sign of the polarity plus one
+SENTIMENT_LABELS = np.array(["Negative", "Neutral", "Positive"])
+
+# Negation words of the TextBlob (Pattern) English lexicon
+NEGATIONS = ("no", "not", "n't", "never")
+
+# Shared stemmer; the vocabulary of a corpus is small, so every word is stemmed once
+_stemmer = PorterStemmer()
+
+@lru_cache(maxsize=None)
+def stem_word(word):
+    """
+    Stem a word with a shared, memoized Porter stemmer.
+
+    Parameters:
+    word (string): The word to stem.
+
+    Returns:
+    string: The stemmed word.
+    """
+    return _stemmer.stem(word)
+
+def load_polarity_lexicon():
+    """
+    Precompute a word lookup table from the lexicon TextBlob uses for polarity.
+
+    Returns:
+    dict: Word -> (polarity, intensity, is_modifier) tuples.
+    """
+    from textblob.en import sentiment as pattern_sentiment
+
+    lexicon = {}
+    for word in pattern_sentiment.keys():
+        entries = pattern_sentiment[word]
+        polarity, _, intensity = entries[None]
+        # Adverbs modify the polarity of the word that follows ("really good")
+        is_modifier = any(pos in entries for pos in pattern_sentiment.modifiers)
+        lexicon[word] = (polarity, intensity, is_modifier)
+    return lexicon
+
+def score_tokens(tokens, lexicon):
+    """
+    Compute the polarity of a token array with a precomputed lexicon.
+
+    Follows the rules of TextBlob's default analyzer: known words are averaged,
+    a preceding adverb scales the next word by its intensity, and a negation
+    flips and halves the polarity ("not good" is slightly bad).
+
+    Parameters:
+    tokens (list): Lowercased tokens.
+    lexicon (dict): Lookup table from load_polarity_lexicon.
+
+    Returns:
+    float: Polarity score between -1 and 1.
+    """
+    assessments = []  # [polarity, intensity, negated]
+    modifier = None
+    negation = None
+    for word in tokens:
+        entry = lexicon.get(word)
+        if entry is not None:
+            polarity, intensity, is_modifier = entry
+            if modifier is None:
+                assessments.append([polarity, intensity, False])
+            else:
+                # Known word preceded by a modifier
+                last = assessments[-1]
+                last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                last[1] = intensity
+            if negation is not None:
+                # Known word preceded by a negation
+                last = assessments[-1]
+                last[1] = 1.0 / last[1] if last[1] else last[1]
+                last[2] = True
+            modifier = word if is_modifier else None
+            negation = word if word in NEGATIONS else None
+        else:
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                # Retain a negation across small words only ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+
+    if not assessments:
+        return 0.0
+    return sum(polarity * -0.5 if negated else polarity for polarity, _, negated in assessments) / len(assessments)
+
+def clean_tokens(text, stop_words):
+    """
+    Clean a text the way data_processing does and split it into tokens.
+
+    Once URLs and punctuation are removed a text only holds word characters and
+    whitespace, so splitting on whitespace, plus the few contractions the Treebank
+    tokenizer splits ("cannot"), gives the same tokens as word_tokenize.
+
+    Parameters:
+    text (string): Raw tweet text.
+    stop_words (frozenset): Words to drop.
+
+    Returns:
+    list: Tokens without stop words.
+    """
+    text = URL_PATTERN.sub('', text.lower())
+    text = PUNCTUATION_PATTERN.sub('', MENTION_HASHTAG_PATTERN.sub('', text))
+    words = text.split()
+    if not TREEBANK_WORDS.isdisjoint(words):
+        words = [token for word in words for token in TREEBANK_SPLITS.get(word, (word,))]
+    return [word for word in words if word not in stop_words]
+
+# State of a worker process, set up by _init_worker
+_worker_stop_words = None
+_worker_lexicon = None
+
+def _init_worker(stop_words):
+    global _worker_stop_words
+    _worker_stop_words = stop_words
+
+def _tokenize_chunk(texts):
+    return [clean_tokens(text, _worker_stop_words) for text in texts]
+
+def _score_chunk(token_lists):
+    global _worker_lexicon
+    if _worker_lexicon is None:
+        _worker_lexicon = load_polarity_lexicon()
+    return [score_tokens(tokens, _worker_lexicon) for tokens in token_lists]
+
+def _map_chunks(executor, function, items, chunk_size):
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    return [result for results in executor.map(function, chunks) for result in results]
+
+def sentiment_labels(polarities):
+    """
+    Bucket polarity scores into sentiment labels.
+
+    Parameters:
+    polarities (array): Polarity scores.
+
+    Returns:
+    array: "Negative", "Neutral" or "Positive" for every score.
+    """
+    return SENTIMENT_LABELS[np.sign(np.asarray(polarities, dtype=float)).astype(int) + 1]
+
+class SentimentEngine:
+    """
+    Batched replacement for the per-row data_processing / stemming / polarity / sentiment chain.
+
+    Texts are cleaned with precompiled regexes and split into token arrays in bulk,
+    stemmed through a memoized stemmer and scored against a lexicon loaded once.
+    Polarity is scored on the cleaned tokens before stemming, since the lexicon holds
+    unstemmed words; the returned text column holds the stemmed tokens.
+    """
+
+    def __init__(self, stop_words=None):
+        self.stop_words = frozenset(stop_words if stop_words is not None else stopwords.words('english'))
+        self._lexicon = None
+
+    @property
+    def lexicon(self):
+        if self._lexicon is None:
+            self._lexicon = load_polarity_lexicon()
+        return self._lexicon
+
+    def tokenize(self, texts):
+        """
+        Clean texts the way data_processing does and split them into tokens.
+
+        Parameters:
+        texts (iterable): Raw tweet texts.
+
+        Returns:
+        list: Lists of tokens without stop words.
+        """
+        stop_words = self.stop_words
+        return [clean_tokens(text, stop_words) for text in texts]
+
+    def score(self, token_lists):
+        """
+        Compute the polarity of token arrays.
+
+        Parameters:
+        token_lists (iterable): Token arrays to score.
+
+        Returns:
+        list: Polarity scores, in input order.
+        """
+        lexicon = self.lexicon
+        return [score_tokens(tokens, lexicon) for tokens in token_lists]
+
+    def analyse(self, texts, cache=None, processes=1, chunk_size=2000, weights=None, similarity=None):
+        """
+        Perform sentiment analysis on a batch of texts.
+
+        Parameters:
+        texts (Series): Raw tweet texts.
+        cache (SentimentCache): Optional cache of scores from earlier batches and runs.
+        processes (int): Number of worker processes cleaning and scoring the texts; 1 runs in this process.
+        chunk_size (int): Texts sent to a worker at a time.
+        weights (Series): Optional weight of every text, e.g. 1 per tweet.
+        similarity (float): Also collapse cleaned texts whose estimated shingle similarity reaches
+        this threshold (see near_duplicates.py), so only one text of each cluster is scored. None
+        only collapses identical cleaned texts.
+
+        Returns:
+        DataFrame: One row per distinct cleaned text, or per cluster, with its stemmed text, polarity
+        and sentiment, indexed like the first occurrence of the text. With weights or a similarity,
+        a 'weight' column holds the total weight of the texts collapsed into the row.
+        """
+        # Retweets repeat the raw text, so drop exact duplicates before cleaning
+        texts = texts.astype(str)
+        if weights is None and similarity is not None:
+            weights = np.ones(len(texts), dtype=np.int64)
+        if weights is not None:
+            weights = pd.Series(np.asarray(weights), index=texts.index).groupby(texts, sort=False).sum().to_numpy()
+        texts = texts[~texts.duplicated()]
+
+        parallel = processes > 1 and len(texts) > chunk_size
+        pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                   initargs=(self.stop_words,)) if parallel else nullcontext()
+        with pool as executor:
+            if parallel:
+                tokens = _map_chunks(executor, _tokenize_chunk, list(texts), chunk_size)
+            else:
+                tokens = self.tokenize(texts)
+
+            # Remove duplicate cleaned texts before the expensive steps
+            first = {}
+            keys = [" ".join(words) for words in tokens]
+            for position, key in enumerate(keys):
+                first.setdefault(key, position)
+            positions = list(first.values())
+            if weights is not None:
+                # groupby keeps the keys in order of first occurrence, like first
+                weights = pd.Series(weights).groupby(keys, sort=False).sum().to_numpy()
+
+            if similarity is not None:
+                # Only keep the representative of every cluster of near copies, carrying its weight
+                representatives = cluster_representatives([tokens[position] for position in positions],
+                                                          weights, similarity)
+                kept = np.flatnonzero(representatives == np.arange(len(positions)))
+                weights = np.bincount(representatives, weights, len(positions))[kept].astype(weights.dtype)
+                positions = [positions[index] for index in kept]
+
+            unique = [tokens[position] for position in positions]
+            polarities = np.empty(len(unique), dtype=float)
+            pending = list(range(len(unique)))
+
+            if cache is not None:
+                # Only score the texts the cache has never seen
+                hashes = [text_key(keys[position]) for position in positions]
+                cached = cache.get_many(hashes)
+                pending = []
+                for index, digest in enumerate(hashes):
+                    if digest in cached:
+                        polarities[index] = cached[digest]
+                    else:
+                        pending.append(index)
+
+            to_score = [unique[index] for index in pending]
+            if parallel and len(to_score) > chunk_size:
+                scores = _map_chunks(executor, _score_chunk, to_score, chunk_size)
+            else:
+                scores = self.score(to_score)
+            polarities[pending] = scores
+
+        if cache is not None:
+            cache.put_many({hashes[index]: polarity for index, polarity in zip(pending, scores)})
+
+        stemmed = [" ".join(stem_word(w) for w in words) for words in unique]
+        index = texts.index[positions]
+
+        result = pd.DataFrame({'text': stemmed, 'polarity': polarities,
+                               'sentiment': sentiment_labels(polarities)}, index=index)
+        if weights is not None:
+            result['weight'] = weights
+        return result
@@ -0,0 +1,376 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import twitter_analysis  # noqa: F401  (makes tweet_archive importable)
+from tweet_archive import TweetArchive, MANIFEST_FILE
+from json_stream import iter_json_items
+
+# Columns of the store; keyword, year and week are the partition columns
+SCHEMA = pa.schema([
+    ('tweet_id', pa.int64()),
+    ('author_id', pa.string()),
+    ('created_at', pa.timestamp('s', tz='UTC')),
+    ('text', pa.string()),
+    ('hashtags', pa.list_(pa.string())),
+    ('views_count', pa.int64()),
+    ('retweet_count', pa.int64()),
+    ('reply_count', pa.int64()),
+    ('quote_count', pa.int64()),
+    ('like_count', pa.int64()),
+    ('bookmark_count', pa.int64()),
+    ('url', pa.string()),
+    ('keyword', pa.string()),
+    ('year', pa.int32()),
+    ('week', pa.string()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('keyword', pa.string()), ('year', pa.int32()), ('week', pa.string())]),
+                               flavor='hive')
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+ARCHIVE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+TWITTER_DATE_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+METRICS = ('retweet_count', 'reply_count', 'quote_count', 'like_count', 'bookmark_count')
+
+# Views sums and counts per keyword, week and hashtag, kept in the store root; files starting
+# with '_' are not part of the Parquet dataset
+VIEWS_FILE = '_hashtag_views.sqlite'
+
+# Bump when the views totals change, so stored totals are rebuilt
+VIEWS_VERSION = 1
+
+def _to_int(value):
+    return int(value) if value not in (None, '') else None
+
+def archived_tweet_row(tweet):
+    """
+    Convert a tweet of TWEET_ARCHIEVE into a store row.
+
+    Parameters:
+    tweet (dict): Archived tweet, as written by apify_config.py or the Twitter API archives.
+
+    Returns:
+    dict: Row without the partition columns.
+    """
+    metrics = tweet.get('public_metrics', {})
+    row = {
+        'tweet_id': int(tweet['tweet_id'] if 'tweet_id' in tweet else tweet['id']),
+        'author_id': tweet.get('author_id'),
+        'created_at': pd.to_datetime(tweet['created_at'], format=ARCHIVE_DATE_FORMAT, utc=True),
+        'text': tweet.get('text', ''),
+        'hashtags': HASHTAG_PATTERN.findall(tweet.get('text', '')),
+        'views_count': _to_int(metrics.get('impression_count')),
+        'url': tweet.get('url'),
+    }
+    for metric in METRICS:
+        row[metric] = _to_int(metrics.get(metric))
+    return row
+
+def filtered_item_row(item):
+    """
+    Convert an item of required_tweet_content.jsonl (see filter_dataset_items) into a store row.
+
+    Parameters:
+    item (dict): Filtered actor item.
+
+    Returns:
+    dict: Row without the partition columns.
+    """
+    row = {
+        'tweet_id': int(item['id_str']),
+        'author_id': item.get('user_id_str'),
+        'created_at': pd.to_datetime(item['created_at'], format=TWITTER_DATE_FORMAT, utc=True),
+        'text': item.get('full_text', ''),
+        'hashtags': [hashtag['text'] for hashtag in item.get('hashtags', []) if 'text' in hashtag],
+        'views_count': _to_int(item.get('views_count')),
+        'url': item.get('url'),
+    }
+    for metric in METRICS:
+        row[metric] = _to_int(item.get(metric.replace('like_count', 'favorite_count')))
+    return row
+
+def rows_to_table(rows, keyword):
+    """
+    Build an Arrow table with the partition columns filled in.
+
+    Tweets are bucketed in the Monday-to-Sunday weeks of the archive, e.g. week
+    '2023-10-16_to_2023-10-22', and the year of the week start.
+
+    Parameters:
+    rows (list): Rows from archived_tweet_row or filtered_item_row.
+    keyword (string): Search keyword the tweets were collected for.
+
+    Returns:
+    Table: Tweets in the store schema.
+    """
+    df = pd.DataFrame(rows, columns=[field.name for field in SCHEMA if field.name not in ('keyword', 'year', 'week')])
+    week_start = (df['created_at'].dt.tz_localize(None).dt.normalize()
+                  - pd.to_timedelta(df['created_at'].dt.weekday, unit='D'))
+    df['keyword'] = keyword
+    df['year'] = week_start.dt.year.astype('int32')
+    df['week'] = week_start.dt.strftime('%Y-%m-%d') + '_to_' + (week_start + pd.Timedelta(days=6)).dt.strftime('%Y-%m-%d')
+    return pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+def write_tweets(table, store_path):
+    """
+    Write tweets into the partitioned store.
+
+    Every keyword/year/week partition touched is rewritten with its previous rows plus
+    the new ones, deduplicated by tweet ID, so writes are idempotent.
+
+    Parameters:
+    table (Table): Tweets in the store schema.
+    store_path (string): Root directory of the store.
+    """
+    if table.num_rows == 0:
+        return
+    if os.path.isdir(store_path):
+        partitions = table.select(['keyword', 'year', 'week']).group_by(['keyword', 'year', 'week']).aggregate([])
+        existing = open_store(store_path)
+        touched = None
+        for keyword, year, week in zip(*(partitions[name].to_pylist() for name in ('keyword', 'year', 'week'))):
+            condition = (pc.field('keyword') == keyword) & (pc.field('year') == year) & (pc.field('week') == week)
+            touched = condition if touched is None else touched | condition
+        previous = existing.to_table(filter=touched).select(SCHEMA.names).cast(SCHEMA)
+        table = pa.concat_tables([previous, table])
+
+    # Keep the latest copy of every tweet
+    df = table.to_pandas().drop_duplicates(subset=['keyword', 'tweet_id'], keep='last')
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    ds.write_dataset(table, store_path, format='parquet', partitioning=PARTITIONING,
+                     existing_data_behavior='delete_matching', basename_template='part-{i}.parquet')
+
+    # The rewritten partitions hold every tweet of their weeks, so their views totals are replaced
+    weeks = table.select(['keyword', 'week']).group_by(['keyword', 'week']).aggregate([])
+    connection = open_view_totals(store_path)
+    try:
+        with connection:
+            connection.executemany('DELETE FROM views WHERE keyword = ? AND week = ?',
+                                   zip(weeks['keyword'].to_pylist(), weeks['week'].to_pylist()))
+            insert_view_totals(connection, table)
+    finally:
+        connection.close()
+
+def insert_view_totals(connection, table):
+    """
+    Add the views sums and counts of every keyword, week and hashtag of a table.
+
+    Parameters:
+    connection (Connection): Open views totals, see open_view_totals.
+    table (Table): Tweets with the keyword, week, hashtags and views_count columns.
+    """
+    parents = pc.list_parent_indices(table['hashtags'])
+    exploded = pa.table({
+        'keyword': pc.take(table['keyword'], parents),
+        'week': pc.take(table['week'], parents),
+        'hashtag': pc.list_flatten(table['hashtags']),
+        'views_count': pc.take(table['views_count'], parents),
+    })
+    totals = exploded.group_by(['keyword', 'week', 'hashtag']).aggregate([('views_count', 'sum'),
+                                                                          ('views_count', 'count')])
+    # The sum of a hashtag whose tweets all lack views is null; its count is 0
+    columns = [totals['keyword'], totals['week'], totals['hashtag'], pc.fill_null(totals['views_count_sum'], 0),
+               totals['views_count_count']]
+    connection.executemany('INSERT OR REPLACE INTO views (keyword, week, hashtag, total, count) VALUES (?, ?, ?, ?, ?)',
+                           zip(*(column.to_pylist() for column in columns)))
+
+def open_view_totals(store_path):
+    """
+    Open the views totals of the store, rebuilding them from every stored tweet when they
+    are missing or were computed by another version.
+
+    Parameters:
+    store_path (string): Root directory of the store.
+
+    Returns:
+    Connection: The SQLite connection; the caller closes it.
+    """
+    connection = sqlite3.connect(os.path.join(store_path, VIEWS_FILE))
+    connection.executescript('''
+        CREATE TABLE IF NOT EXISTS views (
+            keyword TEXT NOT NULL,
+            week TEXT NOT NULL,
+            hashtag TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (keyword, week, hashtag)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    ''')
+    if connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone() != (VIEWS_VERSION,):
+        with connection:
+            connection.execute('DELETE FROM views')
+            insert_view_totals(connection, query(store_path, ['keyword', 'week', 'hashtags', 'views_count']))
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (VIEWS_VERSION,))
+    return connection
+
+def open_store(store_path):
+    """
+    Open the store as a partitioned Arrow dataset.
+
+    Parameters:
+    store_path (string): Root directory of the store.
+
+    Returns:
+    Dataset: The store; queries prune columns and partitions.
+    """
+    return ds.dataset(store_path, format='parquet', partitioning=PARTITIONING, schema=SCHEMA)
+
+def store_filter(keyword=None, since=None, until=None):
+    """
+    Build a predicate on the partition and date columns.
+
+    Parameters:
+    keyword (string): Only this keyword.
+    since (string): Only tweets created on or after this date (YYYY-MM-DD).
+    until (string): Only tweets created on or before this date (YYYY-MM-DD).
+
+    Returns:
+    Expression: The predicate, or None for the whole store.
+    """
+    conditions = []
+    if keyword is not None:
+        conditions.append(pc.field('keyword') == keyword)
+    if since is not None:
+        since = pd.Timestamp(since, tz='UTC')
+        # The year partitions let the scan skip whole directories
+        conditions.append(pc.field('year') >= since.year - 1)
+        conditions.append(pc.field('created_at') >= since)
+    if until is not None:
+        until = pd.Timestamp(until, tz='UTC') + pd.Timedelta(days=1)
+        conditions.append(pc.field('year') <= until.year)
+        conditions.append(pc.field('created_at') < until)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def query(store_path, columns, keyword=None, since=None, until=None):
+    """
+    Read only the given columns of the tweets matching the filters.
+
+    Parameters:
+    store_path (string): Root directory of the store.
+    columns (list): Columns to read.
+    keyword, since, until: See store_filter.
+
+    Returns:
+    Table: The matching rows.
+    """
+    return open_store(store_path).to_table(columns=columns, filter=store_filter(keyword, since, until))
+
+def hashtag_view_averages(store_path, limit=20, keyword=None, since=None, until=None):
+    """
+    Rank hashtags by the average views count of the tweets using them.
+
+    Without dates the ranking is read from the weekly views totals kept next to the store,
+    in O(weeks); otherwise only the hashtags and views_count columns of the matching
+    tweets are read and aggregated in Arrow.
+
+    Parameters:
+    store_path (string): Root directory of the store.
+    limit (int): Number of hashtags to return.
+    keyword, since, until: See store_filter.
+
+    Returns:
+    DataFrame: 'hashtag' and 'views_count' columns, highest average first.
+    """
+    if since is None and until is None:
+        connection = open_view_totals(store_path)
+        try:
+            rows = connection.execute(
+                'SELECT hashtag, CAST(SUM(total) AS REAL) / NULLIF(SUM(count), 0) AS average FROM views '
+                'WHERE ? IS NULL OR keyword = ? GROUP BY hashtag ORDER BY average DESC LIMIT ?',
+                (keyword, keyword, limit)).fetchall()
+        finally:
+            connection.close()
+        return pd.DataFrame(rows, columns=['hashtag', 'views_count']).astype({'views_count': float})
+
+    table = query(store_path, ['hashtags', 'views_count'], keyword, since, until)
+    hashtags = pc.list_flatten(table['hashtags'])
+    views = pc.take(table['views_count'], pc.list_parent_indices(table['hashtags']))
+    exploded = pa.table({'hashtag': hashtags, 'views_count': views})
+    averages = exploded.group_by('hashtag').aggregate([('views_count', 'mean')])
+    averages = averages.rename_columns(['hashtag', 'views_count']).sort_by([('views_count', 'descending')])
+    return averages.slice(0, limit).to_pandas()
+
+def ingest_filtered_items(json_path, store_path, keyword):
+    """
+    Add the items of a filter_dataset_items output file to the store.
+
+    Parameters:
+    json_path (string): Path of the filtered JSON lines file (a JSON list is read too).
+    store_path (string): Root directory of the store.
+    keyword (string): Search keyword the items were collected for.
+
+    Returns:
+    int: Number of items read.
+    """
+    rows = [filtered_item_row(item) for item in iter_json_items(json_path)]
+    write_tweets(rows_to_table(rows, keyword), store_path)
+    return len(rows)
+
+def export_archive(archive_directory, store_path):
+    """
+    Export every keyword archive of TWEET_ARCHIEVE into the store.
+
+    Reads both the weekly segment folders and the legacy tweets_<keyword>.json files;
+    a keyword stored in both formats is exported from its segment folder.
+
+    Parameters:
+    archive_directory (string): Directory holding the archives.
+    store_path (string): Root directory of the store.
+
+    Returns:
+    dict: Keyword -> number of tweets exported.
+    """
+    exported = {}
+    pattern = os.path.join(glob.escape(archive_directory), 'tweets_*')
+    for path in sorted(glob.glob(pattern)):
+        name = os.path.basename(path)
+        if os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+            keyword = name[len('tweets_'):]
+            with TweetArchive(archive_directory, keyword) as archive:
+                tweets_by_week = archive.read_weeks()
+        elif name.endswith('.json') and not os.path.isdir(path[:-len('.json')]):
+            keyword = name[len('tweets_'):-len('.json')]
+            with open(path, 'r', encoding='utf-8') as file:
+                tweets_by_week = json.load(file)
+        else:
+            continue
+
+        rows = [archived_tweet_row(tweet) for tweets in tweets_by_week.values() for tweet in tweets]
+        write_tweets(rows_to_table(rows, keyword), store_path)
+        exported[keyword] = len(rows)
+    return exported
+
+def hashtag_rows(store_path, keyword=None, since=None, until=None):
+    """
+    Read one row per (tweet, hashtag) pair, the input of the sentiment analysis.
+
+    Parameters:
+    store_path (string): Root directory of the store.
+    keyword, since, until: See store_filter.
+
+    Returns:
+    DataFrame: 'tweet_id', 'username', 'views_count', 'text' and 'hashtag' columns.
+    """
+    table = query(store_path, ['tweet_id', 'author_id', 'views_count', 'text', 'hashtags'], keyword, since, until)
+    parents = pc.list_parent_indices(table['hashtags'])
+    exploded = pa.table({
+        'tweet_id': pc.take(table['tweet_id'], parents),
+        'username': pc.take(table['author_id'], parents),
+        'views_count': pc.take(table['views_count'], parents),
+        'text': pc.take(table['text'], parents),
+        'hashtag': pc.list_flatten(table['hashtags']),
+    })
+    return exploded.to_pandas()
@@ -0,0 +1,8 @@
+# Make the modules of the Twitter_Analysis folder (archive, keyword matcher, ...) importable from here
+import os
+import sys
+
+TWITTER_ANALYSIS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Twitter_Analysis')
+
+if TWITTER_ANALYSIS_DIRECTORY not in sys.path:
+    sys.path.append(TWITTER_ANALYSIS_DIRECTORY)
@@ -0,0 +1,53 @@
+import pandas as pd
+from wordcloud import STOPWORDS
+
+class WordSentimentStats:
+    """
+    Running word -> (polarity sum, mention count) statistics for the sentiment word cloud.
+
+    Each batch of analysed tweets is folded in with one explode/groupby, and only the
+    sufficient statistics are kept, so memory grows with the vocabulary rather than
+    with the number of mentions. A batch that repeats tweets already folded in counts
+    them again.
+
+    Parameters:
+    totals (DataFrame): Optional starting totals indexed by word, with 'sum' and 'count' columns.
+    """
+
+    def __init__(self, totals=None):
+        self.totals = totals if totals is not None else pd.DataFrame({'sum': pd.Series(dtype=float),
+                                                                      'count': pd.Series(dtype='int64')})
+
+    def update(self, extract_data):
+        """
+        Fold a batch of analysed tweets into the totals.
+
+        Words are filtered like WordCloud.generate does: numbers and word cloud stop words are dropped.
+
+        Parameters:
+        extract_data (DataFrame): DataFrame containing text and polarity data; a 'weight' column,
+        as returned for near-duplicate clusters, counts every row that many times.
+        """
+        weights = extract_data['weight'] if 'weight' in extract_data else 1
+        words = pd.DataFrame({'word': extract_data['text'].str.split(), 'polarity': extract_data['polarity'] * weights,
+                              'weight': weights})
+        words = words.explode('word').dropna(subset=['word'])
+        words = words[~words['word'].str.isdigit() & ~words['word'].str.lower().isin(STOPWORDS)]
+
+        batch = words.groupby('word').agg(sum=('polarity', 'sum'), count=('weight', 'sum'))
+        self.totals = self.totals.add(batch, fill_value=0)
+        self.totals['count'] = self.totals['count'].astype('int64')
+
+    def frequencies(self):
+        """
+        Returns:
+        dict: Word -> number of mentions, for WordCloud.generate_from_frequencies.
+        """
+        return self.totals['count'].to_dict()
+
+    def averages(self):
+        """
+        Returns:
+        dict: Word -> average polarity of the tweets mentioning it.
+        """
+        return (self.totals['sum'] / self.totals['count']).to_dict()
@@ -0,0 +1,71 @@
+# Import necessary libraries
+from datetime import datetime, timedelta
+
+# Function to check whether the setup asks for an explicit backfill window
+def is_backfill(setup):
+    return bool(setup.get("since"))
+
+# Function to compute the search window from the configured frequency
+def get_search_window(setup, current_date=None):
+    """
+    Computes the dates the actor searches between.
+
+    In backfill mode, i.e. when the setup has a `since` date, the window runs from
+    `since` to the end of `until` (inclusive, defaults to yesterday) instead.
+
+    Args:
+        setup (dict): The apify setup. `frequency` is 'daily', 'weekly' or 'monthly'.
+        current_date (datetime): End of the window. Defaults to now.
+
+    Returns:
+        tuple: (since_date, until_date) as datetimes.
+    """
+    if is_backfill(setup):
+        since_date = datetime.strptime(setup["since"], "%Y-%m-%d")
+        if setup.get("until"):
+            until_date = datetime.strptime(setup["until"], "%Y-%m-%d") + timedelta(days=1)
+        else:
+            until_date = datetime.combine((current_date or datetime.now()).date(), datetime.min.time())
+        return since_date, until_date
+
+    # Get the current date
+    current_date = current_date or datetime.now()
+
+    # Initiate the datetime variable
+    since_date = current_date
+
+    if setup["frequency"] == 'daily':
+        # Go back by a day
+        since_date = current_date - timedelta(days=1)
+    elif setup["frequency"] == 'weekly':
+        # Go back by a week
+        since_date = current_date - timedelta(weeks=1)
+    elif setup["frequency"] == 'monthly':
+        # Go back by a month
+        since_date = current_date - timedelta(days=30)
+
+    return since_date, current_date
+
+# Function to prepare the actor input
+def build_run_input(setup, search_keywords, since_date, until_date):
+    """
+    Prepares the input of a tweet scraper actor run.
+
+    Args:
+        setup (dict): The apify setup.
+        search_keywords (list): The keywords to search for.
+        since_date (datetime): Start of the search window.
+        until_date (datetime): End of the search window.
+
+    Returns:
+        dict: The actor input.
+    """
+    return {
+        "searchTerms": search_keywords,
+        "searchMode": "live",
+        "maxTweets": setup["max_limit"],
+        "addUserInfo": True,
+        "scrapeTweetReplies": False,
+        "sinceDate": since_date.strftime("%Y-%m-%d"),
+        "untilDate": until_date.strftime("%Y-%m-%d")
+    }
@@ -0,0 +1,480 @@
+# Import necessary libraries
+import itertools
+from array import array
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from metric_aggregates import HASHTAG_PATTERN
+from tweet_archive import MANIFEST_FILE, TweetArchive
+from tweet_time import TWITTER_DATE_FORMAT, DateParser
+
+# Default number of items per dataset page when the caller does not ask for a limit
+DEFAULT_PAGE_SIZE = 1000
+
+# Log of the runs a recording client captured, next to one <dataset_id>.jsonl file per run
+RUNS_FILE = "runs.jsonl"
+
+# Number of synthetic tweets generated at once per keyword
+SYNTHETIC_CHUNK_SIZE = 1000
+
+# Synthetic chunks kept in memory across every run, so pages read again are not regenerated
+SYNTHETIC_CACHED_CHUNKS = 16
+
+ARCHIVE_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+# Function to build the Apify client selected by the setup
+def make_client(setup):
+    """
+    Builds the client the fetch code talks to.
+
+    The optional `client` setting of apify_setup.json selects a backend:
+
+        {"backend": "apify"}                                   the Apify API (default)
+        {"backend": "record", "directory": "fixtures"}         the Apify API, saving every run and dataset
+        {"backend": "replay", "source": "fixtures"}            recorded runs, an archive folder or a JSON/JSONL file
+        {"backend": "synthetic", "tweets_per_day": 100}        generated tweets
+
+    The local backends also accept `latency` (seconds per actor run), `page_latency`
+    (seconds per dataset page) and `page_size`; `synthetic` accepts `seconds_per_tweet`.
+
+    Args:
+        setup (dict): The apify setup.
+
+    Returns:
+        An ApifyClient, or a local client exposing the same `actor(id).call(run_input=)`
+        and `dataset(id).list_items()/iterate_items()` calls.
+    """
+    options = setup.get("client") or {}
+    backend = options.get("backend", "apify")
+    if backend in ("apify", "record"):
+        # Only needed when the Apify API is actually used
+        from apify_client import ApifyClient
+        client = ApifyClient(setup["api_token"])
+        return RecordingClient(client, options["directory"]) if backend == "record" else client
+    if backend == "replay":
+        return ReplayClient(options["source"], setup.get("tweet_fields"), setup.get("created_at_format"),
+                            latency=options.get("latency", 0.0), page_latency=options.get("page_latency", 0.0),
+                            page_size=options.get("page_size", DEFAULT_PAGE_SIZE))
+    if backend == "synthetic":
+        return SyntheticClient(options.get("tweets_per_day", 100), options.get("seconds_per_tweet", 0.0),
+                               page_latency=options.get("page_latency", 0.0),
+                               page_size=options.get("page_size", DEFAULT_PAGE_SIZE), latency=options.get("latency", 0.0))
+    raise ValueError(f"Unknown client backend '{backend}'.")
+
+# Function to turn an archived tweet back into a raw actor item
+def archived_tweet_to_item(tweet, tweet_fields, created_at_format):
+    """
+    Inverts the `tweet_fields` projection of the archive.
+
+    Args:
+        tweet (dict): A tweet in the archived layout.
+        tweet_fields (dict): The `tweet_fields` mapping the archive was written with.
+        created_at_format (str): Format of the creation date in raw items.
+
+    Returns:
+        dict: The tweet in the layout of the actor's dataset items, with `entities.hashtags`
+              recovered from the text.
+    """
+    item = {}
+    for name, source in tweet_fields.items():
+        if isinstance(source, dict):
+            metrics = tweet.get(name) or {}
+            for nested_name, nested_source in source.items():
+                if nested_name in metrics:
+                    item[nested_source] = metrics[nested_name]
+        elif name == "created_at" and name in tweet:
+            created_at = datetime.strptime(tweet[name], ARCHIVE_DATE_FORMAT)
+            item[source] = created_at.strftime(created_at_format)
+        elif name == "tweet_id":
+            # Older archives store the ID as 'id'
+            item[source] = tweet.get("tweet_id", tweet.get("id"))
+        elif name in tweet:
+            item[source] = tweet[name]
+    item["entities"] = {"hashtags": [{"text": hashtag} for hashtag in HASHTAG_PATTERN.findall(tweet.get("text", ""))]}
+    return item
+
+# Function to read the raw items of a local source
+def load_items(source, tweet_fields, created_at_format):
+    """
+    Reads raw items from a dataset dump, an archive file or an archive folder.
+
+    Args:
+        source (str): A JSON list of items (e.g. the tweets.json of apify_code.py), a JSONL file of items,
+                      a legacy week-keyed `tweets_<keyword>.json` file, a `tweets_<keyword>/` archive,
+                      or a folder of any of these such as TWEET_ARCHIEVE.
+        tweet_fields (dict): The `tweet_fields` mapping archives were written with.
+        created_at_format (str): Format of the creation date in raw items.
+
+    Returns:
+        list: Raw items. Tweets found in several archives are returned once.
+    """
+    def from_archive(tweets_by_week):
+        return [archived_tweet_to_item(tweet, tweet_fields, created_at_format)
+                for tweets in tweets_by_week.values() for tweet in tweets]
+
+    if os.path.isdir(source):
+        if os.path.isfile(os.path.join(source, MANIFEST_FILE)):
+            base_directory, name = os.path.split(os.path.normpath(source))
+            with TweetArchive(base_directory, name[len("tweets_"):]) as archive:
+                return from_archive(archive.read_weeks())
+        items = []
+        for entry in sorted(os.listdir(source)):
+            path = os.path.join(source, entry)
+            if entry.endswith((".json", ".jsonl")) or os.path.isdir(path):
+                items.extend(load_items(path, tweet_fields, created_at_format))
+        return unique_items(items, tweet_fields.get("tweet_id", "id_str"))
+
+    with open(source, 'r', encoding='utf-8') as file:
+        if source.endswith(".jsonl"):
+            return [json.loads(line) for line in file if line.strip()]
+        data = json.load(file)
+    return from_archive(data) if isinstance(data, dict) else data
+
+# Function to drop repeated items, keeping the first
+def unique_items(items, id_field):
+    seen = set()
+    unique = []
+    for item in items:
+        tweet_id = item.get(id_field)
+        if tweet_id is None or tweet_id not in seen:
+            seen.add(tweet_id)
+            unique.append(item)
+    return unique
+
+# Function to compare run inputs regardless of key order
+def run_input_key(run_input):
+    return json.dumps(run_input, sort_keys=True)
+
+# Items of a JSON lines file read as pages are requested
+class JsonLinesItems:
+    """
+    The items of a JSON lines file, read from disk a slice at a time.
+
+    Only the byte offset of every item is kept in memory, so a recorded dataset of millions
+    of tweets costs eight bytes per tweet however long the client lives.
+
+    Args:
+        path (str): The JSON lines file.
+        offsets (array): Byte offsets of the items, if the writer recorded them. Read from the file otherwise.
+    """
+
+    def __init__(self, path, offsets=None):
+        self.path = path
+        if offsets is None:
+            offsets = array('q')
+            with open(path, 'rb') as file:
+                offset = 0
+                for line in file:
+                    if line.strip():
+                        offsets.append(offset)
+                    offset += len(line)
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        items = []
+        if start >= stop:
+            return items
+        with open(self.path, 'rb') as file:
+            file.seek(self.offsets[start])
+            while len(items) < stop - start:
+                line = file.readline()
+                if line.strip():
+                    items.append(json.loads(line))
+        return items
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+# Dataset served from memory
+class LocalDataset:
+    """
+    Mimics the dataset client of ApifyClient over a sequence of items.
+
+    Args:
+        items: The items; any sequence supporting `len` and slicing.
+        page_latency (float): Simulated latency of one page request, in seconds.
+        page_size (int): Items per page when the caller does not pass a limit.
+    """
+
+    def __init__(self, items, page_latency=0.0, page_size=DEFAULT_PAGE_SIZE):
+        self.items = items
+        self.page_latency = page_latency
+        self.page_size = page_size
+
+    def list_items(self, offset=0, limit=None, **kwargs):
+        time.sleep(self.page_latency)
+        limit = limit or self.page_size
+        page = list(self.items[offset:offset + limit])
+        return SimpleNamespace(items=page, total=len(self.items), offset=offset, limit=limit, count=len(page))
+
+    def iterate_items(self, offset=0, limit=None, page_size=None, **kwargs):
+        end = len(self.items) if limit is None else min(offset + limit, len(self.items))
+        page_size = page_size or self.page_size
+        for page_offset in range(offset, end, page_size):
+            yield from self.list_items(page_offset, min(page_size, end - page_offset)).items
+
+# Client replaying local datasets
+class ReplayClient:
+    """
+    Serves actor runs from local files instead of the Apify API.
+
+    A run whose input was recorded by `RecordingClient` replays the recorded dataset, read from
+    its file as pages are requested. Any other run is answered like the tweet scraper would from
+    the pool of known items: the tweets containing one of `searchTerms`, created in
+    [sinceDate, untilDate), latest first and at most `maxTweets` of them.
+
+    Args:
+        source (str): A folder recorded by `RecordingClient`, or any source `load_items` reads.
+        tweet_fields (dict): The `tweet_fields` mapping of archives. Defaults to that of the default setup.
+        created_at_format (str): Format of the creation date in raw items. Defaults to Twitter's.
+        latency (float): Simulated duration of an actor run, in seconds.
+        page_latency (float): Simulated latency of one dataset page request, in seconds.
+        page_size (int): Items per page when the caller does not pass a limit.
+    """
+
+    def __init__(self, source, tweet_fields=None, created_at_format=None, latency=0.0, page_latency=0.0,
+                 page_size=DEFAULT_PAGE_SIZE):
+        if tweet_fields is None:
+            from synthetic_tweets import TWEET_FIELDS
+            tweet_fields = TWEET_FIELDS
+        self.source = source
+        self.tweet_fields = tweet_fields
+        self.created_at_format = created_at_format or TWITTER_DATE_FORMAT
+        self.latency = latency
+        self.page_latency = page_latency
+        self.page_size = page_size
+        self.datasets = {}
+        self.actor_calls = 0
+        self._recorded = {}  # run input key -> recorded dataset ID
+        self._pool = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        runs_path = os.path.join(source, RUNS_FILE)
+        if os.path.isfile(runs_path):
+            with open(runs_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        run = json.loads(line)
+                        self._recorded[run_input_key(run["run_input"])] = run["dataset"]
+
+    def _recorded_items(self, dataset_id):
+        return JsonLinesItems(os.path.join(self.source, f"{dataset_id}.jsonl"))
+
+    def _load_pool(self):
+        # (timestamp, lowercase text, item) of every known item, parsed once
+        if self._recorded:
+            items = unique_items([item for dataset_id in dict.fromkeys(self._recorded.values())
+                                  for item in self._recorded_items(dataset_id)], self.tweet_fields.get("tweet_id", "id_str"))
+        else:
+            items = load_items(self.source, self.tweet_fields, self.created_at_format)
+        parse = DateParser(self.created_at_format).parse
+        created_at, text = self.tweet_fields.get("created_at", "created_at"), self.tweet_fields.get("text", "full_text")
+        pool = [(parse(item[created_at])[0], item.get(text, "").lower(), item) for item in items]
+        pool.sort(key=lambda entry: entry[0], reverse=True)
+        return pool
+
+    def actor(self, actor_id):
+        return SimpleNamespace(call=self._call)
+
+    def dataset(self, dataset_id):
+        return LocalDataset(self.datasets[dataset_id], self.page_latency, self.page_size)
+
+    def _call(self, run_input=None, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.actor_calls += 1
+            dataset_id = f"replay-{next(self._ids)}"
+            recorded = self._recorded.get(run_input_key(run_input))
+            if recorded is not None:
+                self.datasets[dataset_id] = self._recorded_items(recorded)
+                return {"status": "SUCCEEDED", "defaultDatasetId": dataset_id}
+            if self._pool is None:
+                self._pool = self._load_pool()
+
+        search_terms = [term.lower() for term in run_input.get("searchTerms", [])]
+        epoch = datetime(1970, 1, 1)
+        since = (datetime.strptime(run_input["sinceDate"], "%Y-%m-%d") - epoch) // timedelta(seconds=1) \
+            if run_input.get("sinceDate") else None
+        until = (datetime.strptime(run_input["untilDate"], "%Y-%m-%d") - epoch) // timedelta(seconds=1) \
+            if run_input.get("untilDate") else None
+
+        items = []
+        for timestamp, text, item in self._pool:
+            if (until is not None and timestamp >= until) or not any(term in text for term in search_terms):
+                continue
+            if since is not None and timestamp < since:
+                break
+            items.append(item)
+            if len(items) == run_input.get("maxTweets"):
+                break
+        self.datasets[dataset_id] = items
+        return {"status": "SUCCEEDED", "defaultDatasetId": dataset_id}
+
+# Client saving the runs of another client as replay fixtures
+class RecordingClient:
+    """
+    Wraps a client and records every actor run and its dataset into a folder `ReplayClient` can replay.
+
+    Each dataset is streamed once to <directory>/<dataset_id>.jsonl as it is downloaded and then
+    served from that file, so recording a backfill never holds its shards in memory; the run
+    input is appended to <directory>/runs.jsonl.
+
+    Args:
+        client: The ApifyClient to record.
+        directory (str): Folder receiving the fixtures.
+    """
+
+    def __init__(self, client, directory):
+        self.client = client
+        self.directory = directory
+        self.datasets = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def actor(self, actor_id):
+        return SimpleNamespace(call=lambda run_input=None, **kwargs: self._call(actor_id, run_input, **kwargs))
+
+    def dataset(self, dataset_id):
+        if dataset_id in self.datasets:
+            return LocalDataset(self.datasets[dataset_id])
+        return self.client.dataset(dataset_id)
+
+    def _call(self, actor_id, run_input, **kwargs):
+        run = self.client.actor(actor_id).call(run_input=run_input, **kwargs)
+        if not run:
+            return run
+
+        dataset_id = run["defaultDatasetId"]
+        path = os.path.join(self.directory, f"{dataset_id}.jsonl")
+        offsets = array('q')
+        with open(path, 'wb') as file:
+            offset = 0
+            for item in self.client.dataset(dataset_id).iterate_items():
+                line = (json.dumps(item, ensure_ascii=False) + "\n").encode('utf-8')
+                file.write(line)
+                offsets.append(offset)
+                offset += len(line)
+        with self._lock:
+            self.datasets[dataset_id] = JsonLinesItems(path, offsets)
+            with open(os.path.join(self.directory, RUNS_FILE), 'a', encoding='utf-8') as file:
+                file.write(json.dumps({"actor_id": actor_id, "run_input": run_input, "dataset": dataset_id}) + "\n")
+        return run
+
+# Function to generate one chunk of the tweets of a synthetic run
+@lru_cache(maxsize=SYNTHETIC_CACHED_CHUNKS)
+def synthetic_chunk(run_number, keyword_index, keyword, chunk_index, size, since_date, days):
+    # Only the synthetic backend needs the test data generator
+    from synthetic_tweets import make_tweets
+
+    seed = (run_number * 1000 + keyword_index) * 10 ** 6 + chunk_index
+    first_id = 1700000000000000000 + (run_number * 1000 + keyword_index) * 10 ** 9 + chunk_index * SYNTHETIC_CHUNK_SIZE
+    return make_tweets(size, [keyword], seed=seed, start=since_date, days=days, first_id=first_id, entities=True)
+
+# Lazily generated items of a synthetic run
+class SyntheticItems:
+    """
+    The items of a synthetic run, generated chunk by chunk as pages are read.
+
+    Every keyword contributes `count` tweets, generated in chunks of `SYNTHETIC_CHUNK_SIZE`
+    seeded by run, keyword and chunk, so the same slice always holds the same tweets. The
+    last `SYNTHETIC_CACHED_CHUNKS` chunks of all runs are cached together, so neither a run
+    of millions of tweets nor a backfill of many runs is ever held in memory at once.
+    """
+
+    def __init__(self, run_number, search_terms, count, since_date, days):
+        self.run_number = run_number
+        self.search_terms = search_terms
+        self.count = count
+        self.since_date = since_date
+        self.days = days
+
+    def _chunk(self, keyword_index, chunk_index):
+        size = min(SYNTHETIC_CHUNK_SIZE, self.count - chunk_index * SYNTHETIC_CHUNK_SIZE)
+        return synthetic_chunk(self.run_number, keyword_index, self.search_terms[keyword_index], chunk_index, size,
+                               self.since_date, self.days)
+
+    def __len__(self):
+        return self.count * len(self.search_terms)
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        items = []
+        while start < stop:
+            keyword_index, position = divmod(start, self.count)
+            chunk_index, chunk_offset = divmod(position, SYNTHETIC_CHUNK_SIZE)
+            chunk = self._chunk(keyword_index, chunk_index)
+            taken = chunk[chunk_offset:chunk_offset + stop - start]
+            items.extend(taken)
+            start += len(taken)
+        return items
+
+# Client generating synthetic tweets
+class SyntheticClient:
+    """
+    Mimics the parts of ApifyClient used by the fetch code with generated tweets, without network or credits.
+
+    An actor run produces `tweets_per_day` synthetic tweets per searched keyword and day (at
+    most `maxTweets`) and takes `seconds_per_tweet` per tweet, like a scraper whose run time
+    grows with its output. Dataset pages take `page_latency` seconds each.
+
+    Args:
+        tweets_per_day (int): Tweets produced per keyword and day.
+        seconds_per_tweet (float): Simulated actor time per produced tweet.
+        page_latency (float): Simulated latency of one dataset page request, in seconds.
+        failures (int): Number of actor calls that fail before calls start succeeding.
+        page_size (int): Items per page when the caller does not pass a limit.
+        latency (float): Simulated fixed duration of an actor run, in seconds.
+    """
+
+    def __init__(self, tweets_per_day=100, seconds_per_tweet=0.0001, page_latency=0.02, failures=0,
+                 page_size=DEFAULT_PAGE_SIZE, latency=0.0):
+        self.tweets_per_day = tweets_per_day
+        self.seconds_per_tweet = seconds_per_tweet
+        self.page_latency = page_latency
+        self.failures = failures
+        self.page_size = page_size
+        self.latency = latency
+        self.datasets = {}
+        self.actor_calls = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def actor(self, actor_id):
+        return SimpleNamespace(call=self._call)
+
+    def dataset(self, dataset_id):
+        return LocalDataset(self.datasets[dataset_id], self.page_latency, self.page_size)
+
+    def _call(self, run_input=None, **kwargs):
+        with self._lock:
+            self.actor_calls += 1
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("simulated actor failure")
+            run_number = next(self._ids)
+
+        # Runs without a window, like the one of apify_code.py, search the last week
+        until_date = datetime.strptime(run_input["untilDate"], "%Y-%m-%d") if run_input.get("untilDate") \
+            else datetime.combine(datetime.now().date(), datetime.min.time())
+        since_date = datetime.strptime(run_input["sinceDate"], "%Y-%m-%d") if run_input.get("sinceDate") \
+            else until_date - timedelta(days=7)
+        days = max((until_date - since_date).days, 1)
+        count = min(self.tweets_per_day * days, run_input.get("maxTweets") or self.tweets_per_day * days)
+        items = SyntheticItems(run_number, list(run_input["searchTerms"]), count, since_date, days)
+        time.sleep(self.latency + self.seconds_per_tweet * len(items))
+
+        dataset_id = f"synthetic-{run_number}"
+        self.datasets[dataset_id] = items
+        return {"status": "SUCCEEDED", "defaultDatasetId": dataset_id}
@@ -4,8 +4,24 @@
 import json
 import os
 import logging
-from apify_client import ApifyClient
-from datetime import datetime, timedelta
+import time
+from actor_input import build_run_input, get_search_window, is_backfill
+from apify_clients import make_client
+from backfill_checkpoint import BackfillCheckpoint
+from keyword_matcher import KeywordMatcher
+from run_metrics import METRICS
+from shard_scheduler import ShardScheduler, format_shard, make_shards
+from tweet_archive import TweetArchive, migrate_json_archive
+from tweet_record import TweetSchema
+
+# Number of matched tweets held in memory before they are flushed to the archives
+DEFAULT_BUFFER_SIZE = 1000
+
+# Length in days of the sub-windows of a sharded or backfill search
+DEFAULT_SHARD_DAYS = 7
+
+# Run report appended to after every run, in the base directory
+RUN_REPORT_FILE = "run_report.jsonl"
 
 # Function to load apify_setup from a JSON file
 def load_apify_setup(file_name):
@@ -25,38 +41,36 @@ def contains_keyword(text, search_keyword):
 # Function to fetch relevant tweets
 def run_actor(client, setup):
     try:
-        # Get the current date
-        current_date = datetime.now()
-
-        # Initiate the datetime variable
-        since_date = datetime.now()
-
-        if setup["frequency"] == 'daily':
-            # Go back by a day
-            since_date = current_date - timedelta(days=1)
-        elif setup["frequency"] == 'weekly':
-            # Go back by a week
-            since_date = current_date - timedelta(weeks=1)
-        elif setup["frequency"] == 'monthly':
-            # Go back by a month
-            since_date = current_date - timedelta(days=30)
+        # Search the window covered by the configured frequency
+        since_date, current_date = get_search_window(setup)
 
         # Prepare the Actor input
-        run_input = {
-            "searchTerms": setup["search_keywords"],
-            "searchMode": "live",
-            "maxTweets": setup["max_limit"],
-            "addUserInfo": True,
-            "scrapeTweetReplies": False,
-            "sinceDate": since_date.strftime("%Y-%m-%d"),
-            "untilDate": current_date.strftime("%Y-%m-%d")
-        }
-
-        return client.actor(setup['actor_id']).call(run_input=run_input)
+        run_input = build_run_input(setup, setup["search_keywords"], since_date, current_date)
+
+        with METRICS.stage("actor_run"):
+            return client.actor(setup['actor_id']).call(run_input=run_input)
     except Exception as e:
         print(f"Error searching tweets: {e}")
         return None
 
+# Function to sort week groups and the tweets inside them (latest first)
+def sort_tweets_by_week(tweets_by_week):
+    """
+    Sorts week groups by their start date and tweets by their creation date.
+
+    Args:
+        tweets_by_week (dict): A dictionary where keys are week ranges and values are lists of `TweetRecord`s.
+
+    Returns:
+        dict: The same groups, latest week first and latest tweet first within each week.
+    """
+    # Sort tweets within each week group by their creation date (latest first)
+    for week_key in tweets_by_week:
+        tweets_by_week[week_key] = sorted(tweets_by_week[week_key], key=lambda x: x.created_at, reverse=True)
+
+    # Sort the groups by the start date of the week (latest first); ISO dates sort as strings
+    return dict(sorted(tweets_by_week.items(), key=lambda x: x[0][:10], reverse=True))
+
 # Function to group tweets by week based on their creation date.
 def group_tweets_by_week(tweets, search_keyword, tweet_fields, created_at_format):
     """
@@ -69,11 +83,12 @@ def group_tweets_by_week(tweets, search_keyword, tweet_fields, created_at_format
         created_at_format (str): The format of the 'created_at' field in tweets.
 
     Returns:
-        dict: A dictionary where keys are week ranges and values are lists of tweets.
+        dict: A dictionary where keys are week ranges and values are lists of `TweetRecord`s.
               Tweets within each week group are sorted by their creation date (latest first).
               The dictionary is sorted by the start date of each week group (latest first).
     """
     try:
+        schema = TweetSchema(tweet_fields, created_at_format)
         tweets_by_week = {}
         seen_ids = set()  # Set to keep track of encountered tweet IDs 
 
@@ -85,50 +100,92 @@ def group_tweets_by_week(tweets, search_keyword, tweet_fields, created_at_format
                     continue
 
                 seen_ids.add(tweet_id)
-                created_at = datetime.strptime(tweet[tweet_fields["created_at"]], created_at_format)
-                # Calculate the start and end of the week for the tweet
-                start_of_week = created_at - timedelta(days=created_at.weekday())
-                end_of_week = start_of_week + timedelta(days=6)
-                week_key = f"{start_of_week.strftime('%Y-%m-%d')}_to_{end_of_week.strftime('%Y-%m-%d')}"
+                # Parse the creation date and find the week of the tweet
+                timestamp, week_key = schema.date_parser.parse(tweet[tweet_fields["created_at"]])
 
                 # Initialize an empty list for the week if not exists
                 if week_key not in tweets_by_week:
                     tweets_by_week[week_key] = []
-                
-                # Dictionary to store processed tweet fields
-                tweet_json = {}
-
-                for key, value in tweet_fields.items():
-                    if key == "public_metrics":
-                        
-                        public_metrics_json = {} # Dictionary to store public metrics
-
-                        for item_key, item_value in tweet_fields[key].items():
-                            # Get public metric value from tweet
-                            public_metrics_json[item_key] = tweet.get(item_value, "")
-
-                        tweet_json[key] = public_metrics_json # Assign public metrics to tweet JSON
-                    elif key == 'created_at':
-                        tweet_json[key] = created_at.strftime('%Y-%m-%dT%H:%M:%S.000Z') # Format tweet creation date
-                    else:
-                        tweet_json[key] = tweet.get(value, "") # Get tweet field value from tweet
 
                 # Append processed tweet to the corresponding week group
-                tweets_by_week[week_key].append(tweet_json)
+                tweets_by_week[week_key].append(schema.record(tweet, timestamp))
 
         if tweets_by_week:
-            # Sort tweets within each week group by their creation date (latest first)
-            for week_key in tweets_by_week:
-                tweets_by_week[week_key] = sorted(tweets_by_week[week_key], key=lambda x: x["created_at"], reverse=True)
-            
-            # Sort the groups by the start date of the week (latest first)
-            tweets_by_week = dict(sorted(tweets_by_week.items(), key=lambda x: datetime.strptime(x[0][:10], '%Y-%m-%d'), reverse=True))
+            tweets_by_week = sort_tweets_by_week(tweets_by_week)
         
         return tweets_by_week
     except Exception as e:
         logging.error(f"Error organising {search_keyword} tweets: {e}")
         return None
 
+# Function to group tweets by week for every search keyword in a single pass
+def group_tweets_by_keywords(tweets, search_keywords, tweet_fields, created_at_format):
+    """
+    Groups tweets by keyword and week in a single pass over the tweets.
+
+    Produces the same groups as calling `group_tweets_by_week` once per keyword,
+    but each tweet is lowercased, matched against all keywords and parsed only once.
+
+    Args:
+        tweets (iterable): Tweets to be grouped.
+        search_keywords (list): The keywords to filter tweets.
+        tweet_fields (dict): Dictionary containing tweet field mappings.
+        created_at_format (str): The format of the 'created_at' field in tweets.
+
+    Returns:
+        dict: A dictionary where keys are search keywords and values are dictionaries
+              shaped like the output of `group_tweets_by_week`.
+    """
+    try:
+        matcher = KeywordMatcher(search_keywords)
+        schema = TweetSchema(tweet_fields, created_at_format)
+        keywords = matcher.keywords
+        groups = [{} for _ in keywords]
+        seen_ids = [set() for _ in keywords]  # Encountered tweet IDs per keyword
+
+        for tweet in tweets:
+            matched = matcher.match(tweet[tweet_fields["text"]])
+            if not matched:
+                continue
+
+            tweet_id = tweet[tweet_fields["tweet_id"]]
+            record = None
+            for index in matched:
+                # Skip if tweet ID is already encountered for this keyword
+                if tweet_id in seen_ids[index]:
+                    continue
+                seen_ids[index].add(tweet_id)
+
+                # Parse and project the tweet once, whatever the number of matching keywords
+                if record is None:
+                    timestamp, week_key = schema.date_parser.parse(tweet[tweet_fields["created_at"]])
+                    record = schema.record(tweet, timestamp)
+
+                groups[index].setdefault(week_key, []).append(record)
+
+        return {keyword: sort_tweets_by_week(group) if group else group
+                for keyword, group in zip(keywords, groups)}
+    except Exception as e:
+        logging.error(f"Error organising tweets: {e}")
+        return None
+
+# Function to open the archive of a keyword
+def open_keyword_archive(base_directory, keyword):
+    """
+    Opens the archive of a keyword, converting its legacy whole-file archive on first use.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        keyword (str): The search keyword.
+
+    Returns:
+        TweetArchive: The archive of the keyword.
+    """
+    legacy_file = os.path.join(base_directory, f"tweets_{keyword}.json")
+    if not TweetArchive(base_directory, keyword).exists() and os.path.isfile(legacy_file):
+        migrate_json_archive(legacy_file, base_directory)
+    return TweetArchive(base_directory, keyword)
+
 # Function to save a list of tweets to a generic and year-specific JSON files
 def organise_tweets_to_json(tweets, setup):
     try:
@@ -142,77 +199,300 @@ def organise_tweets_to_json(tweets, setup):
         if not os.path.exists(base_directory):
             os.makedirs(base_directory)
 
+        # Match every keyword in a single pass over the tweets
+        grouped_tweets = group_tweets_by_keywords(tweets, search_keywords, tweet_fields, created_at_format)
+        if grouped_tweets is None:
+            return False
+
         for keyword in search_keywords:
-            tweets_by_week = group_tweets_by_week(tweets, keyword, tweet_fields, created_at_format)
+            tweets_by_week = grouped_tweets.get(keyword)
 
             if tweets_by_week:
-                # Write grouped and sorted tweets to a JSON file
-                output_file = os.path.join(base_directory, f"tweets_{keyword}.json")
+                # Append the tweets not archived yet to the segments of their weeks
+                with open_keyword_archive(base_directory, keyword) as archive:
+                    written = archive.append(tweets_by_week)
+                logging.info(f"{written} new {keyword} tweets saved to {archive.path}.")
+                count += 1
+            else:
+                logging.warning(f"No tweets found for {keyword}.")
 
-                # Check if the file exists, and determine the mode accordingly
-                mode = 'r+' if os.path.isfile(output_file) else 'w'
+        return count > 0
+    except Exception as e:
+        logging.error(f"Error processing and saving tweets: {e}")
+        return False
 
-                # Open the file in the determined mode
-                with open(output_file, mode, encoding='utf-8') as file:
+# Function to route tweets from a dataset iterator into the archives
+def archive_tweet_stream(items, setup):
+    """
+    Routes tweets to their keyword and week buckets as they arrive and flushes them to the archives.
 
-                    # Initialize the list with existing data if exists
-                    existing_data = json.load(file) if mode == 'r+' else {}
-                    # Initialize a dictionary to store the tweets
-                    all_data = {**tweets_by_week, **existing_data}
+    Each item is projected onto a compact `TweetRecord` as soon as it is read, and the
+    buckets are appended to the archives whenever they hold `buffer_size` tweets, so memory
+    stays constant whatever the number of items. Duplicates within and across flushes are
+    skipped by the archives. Errors are raised to the caller.
 
-                    if mode == 'r+':
-                        # Reset the pointer if mode is 'r+'
-                        file.seek(0)
+    Args:
+        items (iterable): Raw tweets, e.g. `client.dataset(dataset_id).iterate_items()`.
+        setup (dict): The apify setup. `buffer_size` (default 1000) sets the flush threshold.
 
-                    # Write the data to the file
-                    json.dump(all_data, file, ensure_ascii=False, indent=4)
-                    logging.info(f"{keyword} tweets saved to {output_file}.")
-                    count += 1
-            else:
-                logging.warning(f"No tweets found for {keyword}.")
+    Returns:
+        dict: Number of new tweets written per keyword, for the keywords matched by at least one tweet.
+    """
+    archives = []
+    try:
+        tweet_fields = setup["tweet_fields"]
+        created_at_format = setup["created_at_format"]
+        base_directory = setup["base_directory"]
+        buffer_size = setup.get("buffer_size", DEFAULT_BUFFER_SIZE)
 
-        return count > 0
+        # Ensure the base directory exists
+        if not os.path.exists(base_directory):
+            os.makedirs(base_directory)
+
+        matcher = KeywordMatcher(setup["search_keywords"])
+        schema = TweetSchema(tweet_fields, created_at_format)
+        keywords = matcher.keywords
+        archives = [open_keyword_archive(base_directory, keyword) for keyword in keywords]
+        buffers = [{} for _ in keywords]  # Pending tweets per keyword, grouped by week
+        routed = [0] * len(keywords)
+        written = [0] * len(keywords)
+        buffered = 0
+        read = parsed = 0
+        clock = time.perf_counter
+        match_seconds = parse_seconds = project_seconds = 0.0
+
+        def flush():
+            for index, tweets_by_week in enumerate(buffers):
+                if tweets_by_week:
+                    written[index] += archives[index].append(tweets_by_week)
+                    buffers[index] = {}
+
+        for item in items:
+            start = clock()
+            matched = matcher.match(item.get(tweet_fields["text"], ""))
+            matched_at = clock()
+            match_seconds += matched_at - start
+            read += 1
+            if not matched:
+                continue
+
+            # Project the item and route it to every matching keyword
+            timestamp, week_key = schema.date_parser.parse(item[tweet_fields["created_at"]])
+            parsed_at = clock()
+            record = schema.record(item, timestamp)
+            parse_seconds += parsed_at - matched_at
+            project_seconds += clock() - parsed_at
+            parsed += 1
+            for index in matched:
+                buffers[index].setdefault(week_key, []).append(record)
+                routed[index] += 1
+
+            buffered += 1
+            if buffered >= buffer_size:
+                flush()
+                buffered = 0
+
+        flush()
+        METRICS.add("match", match_seconds, items=read)
+        METRICS.add("parse_dates", parse_seconds, items=parsed)
+        METRICS.add("project", project_seconds, items=parsed)
+
+        return {keyword: written_count for keyword, matched_count, written_count in zip(keywords, routed, written)
+                if matched_count}
+    finally:
+        for archive in archives:
+            archive.close()
+
+# Function to stream tweets from a dataset iterator into the archives
+def stream_tweets_to_archive(items, setup):
+    """
+    Streams tweets into the archives with `archive_tweet_stream` and logs the outcome.
+
+    Args:
+        items (iterable): Raw tweets, e.g. `client.dataset(dataset_id).iterate_items()`.
+        setup (dict): The apify setup.
+
+    Returns:
+        bool: True if tweets were saved for at least one keyword.
+    """
+    try:
+        written = archive_tweet_stream(items, setup)
+        log_archived_counts(setup["search_keywords"], written)
+        return bool(written)
     except Exception as e:
-        logging.error(f"Error processing and saving tweets: {e}")
+        logging.error(f"Error streaming tweets to the archive: {e}")
         return False
 
-def main():
+# Function to log how many tweets were archived per keyword
+def log_archived_counts(search_keywords, written):
+    for keyword in dict.fromkeys(search_keywords):
+        if keyword in written:
+            logging.info(f"{written[keyword]} new {keyword} tweets archived.")
+        else:
+            logging.warning(f"No tweets found for {keyword}.")
+
+# Function to fetch tweets with concurrent per-keyword, per-window actor runs
+def fetch_sharded(client, setup):
+    """
+    Fetches the search window as shards run concurrently and archives their tweets.
+
+    In backfill mode (`since`/`until` in the setup) every shard committed to the archive is
+    recorded in its keyword's checkpoint, and shards already recorded are not fetched again,
+    so an interrupted or repeated backfill only fetches the missing sub-windows. A shard that
+    returned `max_limit` tweets may have been truncated and is not recorded.
+
+    Args:
+        client: The ApifyClient.
+        setup (dict): The apify setup. `shard_days` sets the length of each sub-window
+                      (default 7) and `max_limit` applies to each shard.
+
+    Returns:
+        bool: True if every shard was fetched and archived.
+    """
     try:
-        # Set up Apify client
-        setup = load_apify_setup("apify_setup.json")
-        if not setup:
-            logging.error("Error loading the set up.")
-            return
+        since_date, until_date = get_search_window(setup)
+        shards = make_shards(setup["search_keywords"], since_date, until_date,
+                             setup.get("shard_days", DEFAULT_SHARD_DAYS))
+        checkpoints = {}
+        if is_backfill(setup):
+            checkpoints = {keyword: BackfillCheckpoint(setup["base_directory"], keyword)
+                           for keyword in dict.fromkeys(setup["search_keywords"])}
+            pending = [shard for shard in shards
+                       if not checkpoints[shard.keyword].is_done(shard.since_date, shard.until_date)]
+            logging.info(f"Backfill: {len(shards) - len(pending)} of {len(shards)} shards already archived.")
+            shards = pending
+    except Exception as e:
+        logging.error(f"Error planning the shards: {e}")
+        return False
 
-        # Initialize the ApifyClient with the API token
-        client = ApifyClient(setup["api_token"])
-        if not client:
-            logging.error("Error initializing ApifyClient.")
-            return
+    scheduler = ShardScheduler(client, setup)
+    written = {}
+    failed = 0
+
+    # Archive the items of each shard as soon as it completes
+    for shard, items in scheduler.run(shards):
+        try:
+            for keyword, count in archive_tweet_stream(items, setup).items():
+                written[keyword] = written.get(keyword, 0) + count
+        except Exception as e:
+            logging.error(f"Error archiving shard {format_shard(shard)}: {e}")
+            failed += 1
+            continue
+
+        if shard.keyword in checkpoints:
+            # A shard that reached max_limit was cut short, so keep it pending for a later run
+            if len(items) >= setup["max_limit"]:
+                logging.warning(f"Shard {format_shard(shard)} reached max_limit ({setup['max_limit']} tweets) "
+                                f"and stays pending; lower shard_days or raise max_limit to backfill it.")
+            else:
+                checkpoints[shard.keyword].mark_done(shard.since_date, shard.until_date)
 
-        # Run the Actor and wait for it to finish
-        run = run_actor(client, setup)
-        if not run:
-            logging.error("Error running the actor.")
-            return
+    log_archived_counts(setup["search_keywords"], written)
+    failed += len(scheduler.failed)
+    if failed:
+        logging.error(f"{failed} of {len(shards)} shards failed.")
+        return False
+    return True
+
+# Function to fetch the configured search and archive its tweets
+def fetch_and_archive(client, setup):
+    if get_run_mode(setup) != "single":
+        # Run one actor per keyword and sub-window concurrently
+        return fetch_sharded(client, setup)
+
+    # Run the Actor and wait for it to finish
+    run = run_actor(client, setup)
+    if not run:
+        logging.error("Error running the actor.")
+        return False
 
-        response_generator = client.dataset(run["defaultDatasetId"]).iterate_items()
-        if not response_generator:
-            logging.warning("Empty response.")
-            return
+    response_generator = client.dataset(run["defaultDatasetId"]).iterate_items()
+    if not response_generator:
+        logging.warning("Empty response.")
+        return False
+
+    # Process the tweets as they are downloaded
+    return stream_tweets_to_archive(METRICS.timed_iter("download", response_generator), setup)
+
+# Function to name the way a run fetches its tweets
+def get_run_mode(setup):
+    if is_backfill(setup):
+        return "backfill"
+    return "sharded" if setup.get("shard_days") else "single"
+
+# Function to append the metrics of a run to the run report
+def write_run_report(setup, is_success):
+    """
+    Appends the stage metrics of the run and the size of every keyword archive to the run report.
 
-        tweets = list(response_generator)
-        if not tweets:
-            logging.warning("No tweets found.")
+    Args:
+        setup (dict): The apify setup. `run_report` sets the JSON lines file (default
+                      `<base_directory>/run_report.jsonl`, an empty value disables the report).
+        is_success (bool): Whether the run succeeded.
+    """
+    try:
+        report_path = setup.get("run_report", os.path.join(setup["base_directory"], RUN_REPORT_FILE))
+        if not report_path:
             return
 
-        # Process the tweets if the list is not empty
-        is_success = organise_tweets_to_json(tweets, setup)
+        # Record the size of the archives so their growth can be followed across runs
+        archives = {}
+        for keyword in dict.fromkeys(setup["search_keywords"]):
+            weeks = TweetArchive(setup["base_directory"], keyword).manifest["weeks"]
+            archives[keyword] = {"tweets": sum(week["tweets"] for week in weeks.values()),
+                                 "bytes": sum(week["bytes"] for week in weeks.values()),
+                                 "weeks": len(weeks)}
+
+        METRICS.write_report(report_path, status="success" if is_success else "failed", mode=get_run_mode(setup),
+                             client=(setup.get("client") or {}).get("backend", "apify"),
+                             keywords=list(dict.fromkeys(setup["search_keywords"])), archives=archives)
+        METRICS.log_summary()
+    except Exception as e:
+        logging.error(f"Error writing the run report: {e}")
+
+# Function to run a scheduled fetch: load the setup, fetch the tweets and archive them
+def run(setup_file="apify_setup.json"):
+    """
+    Fetches and archives the tweets of the setup's keywords, then appends the run report.
+
+    Args:
+        setup_file (str): Path of the apify_setup.json file.
+
+    Returns:
+        bool: True if the tweets were fetched and archived.
+    """
+    try:
+        # Set up Apify client
+        setup = load_apify_setup(setup_file)
+        if not setup:
+            logging.error("Error loading the set up.")
+            return False
+
+        # Initialize the ApifyClient with the API token, or the local client chosen in the setup
+        client = make_client(setup)
+        if not client:
+            logging.error("Error initializing the Apify client.")
+            return False
+
+        # Time every stage of the run, and profile it if the setup asks for it
+        METRICS.reset()
+        is_success = False
+        try:
+            with METRICS.profile(setup.get("profile")):
+                is_success = fetch_and_archive(client, setup)
+        finally:
+            write_run_report(setup, is_success)
+
         if is_success:
             logging.info("Request Executed Successfully!")
+        return is_success
 
     except Exception as e:
         logging.error(f"Error in main execution: {e}")
+        return False
+
+def main():
+    run("apify_setup.json")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+# Import necessary libraries
+import json
+import os
+from datetime import datetime
+from tweet_archive import write_json_atomic
+
+CHECKPOINT_FILE = "checkpoint.json"
+DATE_FORMAT = "%Y-%m-%d"
+
+# Persisted record of the sub-windows already fetched for a keyword
+class BackfillCheckpoint:
+    """
+    Records which date windows of a keyword were fetched and committed to its archive.
+
+    Windows are half-open ranges of days [since, until), merged on write and stored in
+    `checkpoint.json` next to the keyword's archive segments.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        keyword (str): The search keyword.
+    """
+
+    def __init__(self, base_directory, keyword):
+        self.keyword = keyword
+        self.path = os.path.join(base_directory, f"tweets_{keyword}", CHECKPOINT_FILE)
+        self.windows = self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return [(datetime.strptime(since, DATE_FORMAT), datetime.strptime(until, DATE_FORMAT))
+                for since, until in data["windows"]]
+
+    def is_done(self, since_date, until_date):
+        """
+        Checks whether a window is entirely covered by committed windows.
+
+        Args:
+            since_date (datetime): Start of the window.
+            until_date (datetime): End of the window (exclusive).
+
+        Returns:
+            bool: True if the window does not need fetching again.
+        """
+        return any(since <= since_date and until_date <= until for since, until in self.windows)
+
+    def mark_done(self, since_date, until_date):
+        """
+        Records a window as committed and persists the checkpoint atomically.
+
+        Args:
+            since_date (datetime): Start of the window.
+            until_date (datetime): End of the window (exclusive).
+        """
+        merged = []
+        for since, until in sorted(self.windows + [(since_date, until_date)]):
+            if merged and since <= merged[-1][1]:
+                # Overlapping or adjacent windows collapse into one
+                merged[-1] = (merged[-1][0], max(merged[-1][1], until))
+            else:
+                merged.append((since, until))
+        self.windows = merged
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json_atomic(self.path, {
+            "keyword": self.keyword,
+            "windows": [[since.strftime(DATE_FORMAT), until.strftime(DATE_FORMAT)] for since, until in merged]
+        })
@@ -0,0 +1,77 @@
+"""
+Compares filtering the full archive per period with the bisect-indexed event analysis.
+
+Builds a synthetic multi-year archive for the keywords of analysis_config.json. Run from
+the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_event_analysis --tweets 200000 --years 4
+"""
+# Import necessary libraries
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from functools import partial
+
+from apify_config import group_tweets_by_keywords
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_tweets
+from event_analysis import PeriodStats, analyse_keyword, get_periods, load_analysis_config, textblob_polarity
+from tweet_archive import TweetArchive
+
+# Function to write a synthetic archive for every keyword
+def build_archives(base_directory, keywords, count, years):
+    tweets = make_tweets(count, keywords, start=datetime(2024 - years, 1, 1), days=years * 365)
+    for keyword, tweets_by_week in group_tweets_by_keywords(tweets, keywords, TWEET_FIELDS, CREATED_AT_FORMAT).items():
+        with TweetArchive(base_directory, keyword) as archive:
+            archive.append(tweets_by_week)
+
+# Function to analyse a keyword by loading and filtering the whole archive for each period
+def full_scan(archive, periods, polarity):
+    summaries = {}
+    for name, start_date, end_date in periods:
+        stats = PeriodStats(name, start_date, end_date)
+        tweets_by_week = archive.read_weeks()
+        # Oldest week first, the order of the indexed analysis, so float sums match exactly
+        for week_key in sorted(tweets_by_week):
+            for tweet in tweets_by_week[week_key]:
+                if start_date <= tweet["created_at"][:10] <= end_date:
+                    stats.add(tweet, polarity(tweet["text"]) if polarity else None)
+        summaries[name] = stats.summary(polarity is not None)
+    return summaries
+
+# Function to time an analysis over every configured keyword
+def run(analyse, base_directory, entries, polarity):
+    start = time.perf_counter()
+    results = {}
+    for entry in entries:
+        with TweetArchive(base_directory, entry["keyword"]) as archive:
+            results[entry["keyword"]] = analyse(archive, get_periods(entry), polarity)
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=200000)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--config", default="analysis_config.json")
+    parser.add_argument("--sentiment", action="store_true", help="Also score sentiment with TextBlob (slow).")
+    args = parser.parse_args()
+
+    entries = load_analysis_config(args.config)
+    polarity = textblob_polarity if args.sentiment else None
+    base_directory = tempfile.mkdtemp(prefix="bench_events_")
+    try:
+        build_archives(base_directory, [entry["keyword"] for entry in entries], args.tweets, args.years)
+
+        scan_time, expected = run(full_scan, base_directory, entries, polarity)
+        # Near copies get the polarity of their cluster; score them all to compare with the scan
+        indexed_time, results = run(partial(analyse_keyword, similarity=None), base_directory, entries, polarity)
+        assert results == expected, "the indexed analysis disagrees with the full scan"
+    finally:
+        shutil.rmtree(base_directory)
+
+    print(f"{'full scan (s)':>14} {'indexed (s)':>12} {'speedup':>8}")
+    print(f"{scan_time:>14.2f} {indexed_time:>12.2f} {scan_time / indexed_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compares the per-keyword grouping loop with the single-pass keyword matcher.
+
+Run from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_keyword_matching --tweets 20000 --keywords 1 10 50
+"""
+# Import necessary libraries
+import argparse
+import time
+
+from apify_config import group_tweets_by_week, group_tweets_by_keywords
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords, make_tweets
+
+# Function to group tweets the way organise_tweets_to_json used to
+def per_keyword_loop(tweets, keywords):
+    return {keyword: group_tweets_by_week(tweets, keyword, TWEET_FIELDS, CREATED_AT_FORMAT) for keyword in keywords}
+
+# Function to time a grouping strategy
+def best_time(function, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=20000)
+    parser.add_argument("--keywords", type=int, nargs="+", default=[1, 5, 20, 50, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>8} {'per-keyword (s)':>16} {'single-pass (s)':>16} {'speedup':>8}")
+    for keyword_count in args.keywords:
+        keywords = make_keywords(keyword_count)
+        tweets = make_tweets(args.tweets, keywords)
+
+        loop_time, expected = best_time(per_keyword_loop, args.repeat, tweets, keywords)
+        single_time, actual = best_time(
+            group_tweets_by_keywords, args.repeat, tweets, keywords, TWEET_FIELDS, CREATED_AT_FORMAT)
+
+        if actual != expected:
+            raise SystemExit(f"Single-pass output differs from the per-keyword loop for {keyword_count} keywords")
+
+        print(f"{keyword_count:>8} {loop_time:>16.3f} {single_time:>16.3f} {loop_time / single_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares the event analysis sentiment with and without near-duplicate collapsing.
+
+Builds a synthetic archive of a viral event, where a share of the tweets are retweets,
+truncated retweets or reposts of earlier ones, and scores it with TextBlob both ways.
+Run from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_near_duplicates --tweets 20000 --copy-ratio 0.6
+"""
+# Import necessary libraries
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from apify_config import group_tweets_by_keywords
+from event_analysis import DEFAULT_SIMILARITY, analyse_keyword, textblob_polarity
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_tweets
+from tweet_archive import TweetArchive
+
+KEYWORD = "#INFORMS2023"
+
+# Pre-, during- and post-event periods of the synthetic event
+PERIODS = [("pre-event", "2023-10-01", "2023-10-14"), ("during-event", "2023-10-15", "2023-10-18"),
+           ("post-event", "2023-10-19", "2023-10-31")]
+
+# Function to count the texts scored by a polarity function
+def counting(polarity):
+    def score(text):
+        score.calls += 1
+        return polarity(text)
+    score.calls = 0
+    return score
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=20000)
+    parser.add_argument("--copy-ratio", type=float, default=0.6)
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY)
+    args = parser.parse_args()
+
+    tweets = make_tweets(args.tweets, [KEYWORD], start=datetime(2023, 10, 1), days=31, copy_ratio=args.copy_ratio)
+    base_directory = tempfile.mkdtemp(prefix="bench_near_duplicates_")
+    try:
+        for keyword, tweets_by_week in group_tweets_by_keywords(tweets, [KEYWORD], TWEET_FIELDS,
+                                                                CREATED_AT_FORMAT).items():
+            with TweetArchive(base_directory, keyword) as archive:
+                archive.append(tweets_by_week)
+
+        runs = {}
+        for name, similarity in (("exact", None), ("collapsed", args.similarity)):
+            polarity = counting(textblob_polarity)
+            with TweetArchive(base_directory, KEYWORD) as archive:
+                start = time.perf_counter()
+                summaries = analyse_keyword(archive, PERIODS, polarity, similarity)
+                runs[name] = (time.perf_counter() - start, polarity.calls, summaries)
+    finally:
+        shutil.rmtree(base_directory)
+
+    print(f"{'run':>10} {'seconds':>8} {'scored':>7} " + " ".join(f"{period:>13}" for period, _, _ in PERIODS))
+    for name, (seconds, calls, summaries) in runs.items():
+        polarities = " ".join(f"{summaries[period]['polarity']:>13.4f}" for period, _, _ in PERIODS)
+        print(f"{name:>10} {seconds:>8.2f} {calls:>7} {polarities}")
+    exact_time, collapsed_time = runs["exact"][0], runs["collapsed"][0]
+    print(f"speedup: {exact_time / collapsed_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
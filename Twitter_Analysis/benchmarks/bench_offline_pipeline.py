@@ -0,0 +1,90 @@
+"""
+Times the fetch, archive and analysis stages end to end without the Apify API.
+
+The actor run is served by a local client from apify_clients.py: generated tweets
+(`synthetic`) or the tweets of an archive folder or recorded fixtures (`replay`). Run
+from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_offline_pipeline --keyword-count 5 --days 90 --tweets-per-day 200
+    python -m benchmarks.bench_offline_pipeline --backend replay --source "../Code apify/TWEET_ARCHIEVE" \
+        --since 2023-01-01 --until 2024-01-01
+"""
+# Import necessary libraries
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from actor_input import build_run_input
+from apify_clients import make_client
+from apify_config import stream_tweets_to_archive
+from event_analysis import run_analysis, textblob_polarity
+from run_metrics import METRICS
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords
+from tweet_archive import TweetArchive
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("synthetic", "replay"), default="synthetic")
+    parser.add_argument("--source", default="../Code apify/TWEET_ARCHIEVE", help="Replay source.")
+    parser.add_argument("--keywords", nargs="+", help="Search keywords. Defaults to --keyword-count synthetic ones.")
+    parser.add_argument("--keyword-count", type=int, default=5)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--since", help="Start of the search window (YYYY-MM-DD). Defaults to --days before --until.")
+    parser.add_argument("--until", default="2023-11-01", help="End of the search window (YYYY-MM-DD, exclusive).")
+    parser.add_argument("--tweets-per-day", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per actor run.")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Simulated seconds per dataset page.")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--sentiment", action="store_true", help="Score the sentiment of every period.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    keywords = args.keywords or make_keywords(args.keyword_count)
+    until_date = datetime.strptime(args.until, "%Y-%m-%d")
+    since_date = datetime.strptime(args.since, "%Y-%m-%d") if args.since else until_date - timedelta(days=args.days)
+    base_directory = tempfile.mkdtemp(prefix="offline_pipeline_")
+    setup = {"search_keywords": keywords, "max_limit": 10 ** 9, "actor_id": "offline",
+             "tweet_fields": TWEET_FIELDS, "created_at_format": CREATED_AT_FORMAT, "base_directory": base_directory,
+             "client": {"backend": args.backend, "source": args.source, "tweets_per_day": args.tweets_per_day,
+                        "latency": args.latency, "page_latency": args.page_latency, "page_size": args.page_size}}
+
+    try:
+        timings = []
+        client = make_client(setup)
+        METRICS.reset()
+
+        start = time.perf_counter()
+        run = client.actor(setup["actor_id"]).call(run_input=build_run_input(setup, keywords, since_date, until_date))
+        items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
+        timings.append(("fetch", time.perf_counter() - start, f"{len(items)} items"))
+
+        start = time.perf_counter()
+        stream_tweets_to_archive(items, setup)
+        archived = 0
+        for keyword in keywords:
+            with TweetArchive(base_directory, keyword) as archive:
+                archived += archive.count()
+        timings.append(("group + store", time.perf_counter() - start, f"{archived} archived tweets"))
+
+        start = time.perf_counter()
+        results = run_analysis([{"keyword": keyword, "year": "All"} for keyword in keywords], base_directory,
+                               textblob_polarity if args.sentiment else None)
+        timings.append(("analyse", time.perf_counter() - start, f"{len(results)} keywords"))
+
+        total = sum(seconds for _, seconds, _ in timings)
+        for name, seconds, detail in timings:
+            print(f"{name:>14}: {seconds:7.2f}s  {seconds / total:4.0%}  {detail}")
+        print(f"{'total':>14}: {total:7.2f}s  {len(items) / total:,.0f} items/s")
+
+        # Finer stages recorded by the pipeline itself
+        for name, stage in sorted(METRICS.report()["stages"].items(), key=lambda stage: stage[1]["seconds"], reverse=True):
+            print(f"{name:>14}: {stage['seconds']:7.2f}s  {stage['items']} items  "
+                  f"{(stage['bytes_read'] + stage['bytes_written']) / 2 ** 20:.1f} MiB")
+    finally:
+        shutil.rmtree(base_directory)
+
+if __name__ == "__main__":
+    main()
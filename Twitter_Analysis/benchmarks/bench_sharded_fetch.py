@@ -0,0 +1,53 @@
+"""
+Compares one serial actor run with concurrent per-keyword, per-window shards.
+
+Uses the local synthetic client, so no credits or network are spent. Run from the
+Twitter_Analysis directory:
+
+    python -m benchmarks.bench_sharded_fetch --keywords 5 --days 30 --concurrency 8
+"""
+# Import necessary libraries
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from actor_input import build_run_input
+from apify_clients import SyntheticClient
+from synthetic_tweets import make_keywords
+from shard_scheduler import ShardScheduler, make_shards
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keywords", type=int, default=5)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--shard-days", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tweets-per-day", type=int, default=50)
+    args = parser.parse_args()
+
+    keywords = make_keywords(args.keywords)
+    until_date = datetime(2023, 11, 1)
+    since_date = until_date - timedelta(days=args.days)
+    setup = {"search_keywords": keywords, "max_limit": 10 ** 9, "actor_id": "stub",
+             "max_concurrency": args.concurrency, "page_size": 500}
+
+    # One actor run over every keyword and the whole window, downloaded serially
+    client = SyntheticClient(args.tweets_per_day)
+    start = time.perf_counter()
+    run = client.actor("stub").call(run_input=build_run_input(setup, keywords, since_date, until_date))
+    serial_count = sum(1 for _ in client.dataset(run["defaultDatasetId"]).iterate_items(page_size=500))
+    serial_time = time.perf_counter() - start
+
+    # Concurrent shards with parallel page reads
+    client = SyntheticClient(args.tweets_per_day)
+    shards = make_shards(keywords, since_date, until_date, args.shard_days)
+    start = time.perf_counter()
+    sharded_count = sum(len(items) for _, items in ShardScheduler(client, setup).run(shards))
+    sharded_time = time.perf_counter() - start
+
+    print(f"serial:  1 run, {serial_count} items in {serial_time:.2f}s")
+    print(f"sharded: {len(shards)} runs, {sharded_count} items in {sharded_time:.2f}s "
+          f"({serial_time / sharded_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
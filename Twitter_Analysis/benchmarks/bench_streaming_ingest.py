@@ -0,0 +1,66 @@
+"""
+Compares peak memory of the list-then-organise ingest with the streaming ingest.
+
+Both paths read the same synthetic dataset iterator, standing in for
+`client.dataset(...).iterate_items()`. Run from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_streaming_ingest --tweets 50000
+"""
+# Import necessary libraries
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from apify_config import organise_tweets_to_json, stream_tweets_to_archive
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords, make_tweets
+
+# Function to simulate the dataset iterator of the Apify client
+def fake_dataset_iterator(count, keywords, chunk_size=1000):
+    for start in range(0, count, chunk_size):
+        # Generate the items one page at a time, so the source itself holds little memory
+        yield from make_tweets(min(chunk_size, count - start), keywords, seed=start,
+                              first_id=1700000000000000000 + start)
+
+# Function to run one ingest path into a scratch archive directory
+def run_ingest(ingest, count, keywords, buffer_size):
+    base_directory = tempfile.mkdtemp(prefix="bench_ingest_")
+    setup = {"search_keywords": keywords, "tweet_fields": TWEET_FIELDS, "created_at_format": CREATED_AT_FORMAT,
+             "base_directory": base_directory, "buffer_size": buffer_size}
+    try:
+        ingest(fake_dataset_iterator(count, keywords), setup)
+    finally:
+        shutil.rmtree(base_directory)
+
+# Function to measure the time and peak memory of one ingest path
+def measure(ingest, count, keywords, buffer_size):
+    # Time without tracing, since tracemalloc slows allocation-heavy code unevenly
+    start = time.perf_counter()
+    run_ingest(ingest, count, keywords, buffer_size)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run_ingest(ingest, count, keywords, buffer_size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def list_then_organise(items, setup):
+    return organise_tweets_to_json(list(items), setup)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=50000)
+    parser.add_argument("--keywords", type=int, default=5)
+    parser.add_argument("--buffer-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    keywords = make_keywords(args.keywords)
+    print(f"{'ingest':>20} {'time (s)':>10} {'peak memory (MiB)':>18}")
+    for name, ingest in (("list + organise", list_then_organise), ("streaming", stream_tweets_to_archive)):
+        elapsed, peak = measure(ingest, args.tweets, keywords, args.buffer_size)
+        print(f"{name:>20} {elapsed:>10.2f} {peak / 2 ** 20:>18.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares the memory held by grouped tweets as dicts and as compact TweetRecords.
+
+Measures what the grouped output of a run keeps alive (the raw items are built first and
+not counted), for the archive projection of apify_config.py and for the filtered items of
+apify_code.py. Run from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_tweet_records --tweets 100000
+"""
+# Import necessary libraries
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime
+
+from apify_config import group_tweets_by_keywords
+from synthetic_tweets import CREATED_AT_FORMAT, TWEET_FIELDS, make_keywords, make_tweets
+from keyword_matcher import KeywordMatcher
+from tweet_record import TweetSchema
+from tweet_time import week_key_for_ordinal
+
+FILTER_FIELDS = ["full_text", "lang", "reply_count", "retweet_count", "retweeted",
+                 "user_id_str", "id_str", "url", "views_count", "created_at"]
+
+# Function to project a raw tweet onto the configured tweet fields as a dict, as apify_config.py used to
+def build_tweet_json(tweet, tweet_fields, created_at):
+    tweet_json = {}
+    for key, value in tweet_fields.items():
+        if key == "public_metrics":
+            tweet_json[key] = {item_key: tweet.get(item_value, "") for item_key, item_value in value.items()}
+        elif key == "created_at":
+            tweet_json[key] = created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        else:
+            tweet_json[key] = tweet.get(value, "")
+    return tweet_json
+
+# Function to compute the Monday-to-Sunday week key of a datetime, as apify_config.py used to
+def get_week_key(created_at):
+    return week_key_for_ordinal(created_at.toordinal())
+
+# Function to group tweets into one dict per tweet per keyword, as group_tweets_by_week does for each keyword
+def group_dicts(tweets, keywords):
+    matcher = KeywordMatcher(keywords)
+    groups = {keyword: {} for keyword in matcher.keywords}
+    for tweet in tweets:
+        for index in matcher.match(tweet[TWEET_FIELDS["text"]]):
+            created_at = datetime.strptime(tweet[TWEET_FIELDS["created_at"]], CREATED_AT_FORMAT)
+            tweet_json = build_tweet_json(tweet, TWEET_FIELDS, created_at)
+            groups[matcher.keywords[index]].setdefault(get_week_key(created_at), []).append(tweet_json)
+    return groups
+
+def group_records(tweets, keywords):
+    return group_tweets_by_keywords(tweets, keywords, TWEET_FIELDS, CREATED_AT_FORMAT)
+
+# Function to filter items into dicts, as filter_dataset_items used to
+def filter_dicts(tweets):
+    filtered = []
+    for item in tweets:
+        filtered_item = {field: item[field] for field in FILTER_FIELDS if field in item}
+        filtered_item['hashtags'] = [{'text': hashtag['text']} for hashtag in item.get('entities', {}).get('hashtags', [])]
+        filtered.append(filtered_item)
+    return filtered
+
+def filter_records(tweets):
+    fields = {field: field for field in FILTER_FIELDS}
+    fields['hashtags'] = lambda item: [hashtag['text'] for hashtag in item.get('entities', {}).get('hashtags', [])]
+    schema = TweetSchema(fields, omit_missing=True)
+    return [schema.record(item) for item in tweets]
+
+# Function to measure the memory retained by the result of a function
+def retained_memory(function, *args):
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return retained
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=100000)
+    parser.add_argument("--keywords", type=int, default=5)
+    args = parser.parse_args()
+
+    keywords = make_keywords(args.keywords)
+    tweets = make_tweets(args.tweets, keywords, duplicate_ratio=0)
+    for index, tweet in enumerate(tweets):
+        tweet["entities"] = {"hashtags": [{"text": keyword[1:], "indices": [0, len(keyword)]}
+                                          for keyword in keywords[:index % 3] if keyword.startswith("#")]}
+
+    print(f"{'pipeline':>18} {'dicts (MiB)':>12} {'records (MiB)':>14} {'reduction':>10}")
+    for name, dict_function, record_function, function_args in (
+            ("group by keyword", group_dicts, group_records, (tweets, keywords)),
+            ("filter items", filter_dicts, filter_records, (tweets,))):
+        dict_memory = retained_memory(dict_function, *function_args)
+        record_memory = retained_memory(record_function, *function_args)
+        print(f"{name:>18} {dict_memory / 2 ** 20:>12.1f} {record_memory / 2 ** 20:>14.1f} "
+              f"{1 - record_memory / dict_memory:>9.0%}")
+
+if __name__ == "__main__":
+    main()
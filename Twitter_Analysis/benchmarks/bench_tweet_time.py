@@ -0,0 +1,105 @@
+"""
+Micro-benchmarks of the creation date parsing and week bucketing fast paths.
+
+Each case times the strptime/strftime code apify_config.py used against tweet_time.py
+on the creation dates of synthetic tweets. Run from the Twitter_Analysis directory:
+
+    python -m benchmarks.bench_tweet_time --tweets 100000
+"""
+# Import necessary libraries
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from synthetic_tweets import CREATED_AT_FORMAT, make_keywords, make_tweets
+from tweet_time import DateParser, format_archive_date, week_key_for_ordinal
+
+# Function to compute a week key the way apify_config.py used to
+def strftime_week_key(created_at):
+    start_of_week = created_at - timedelta(days=created_at.weekday())
+    end_of_week = start_of_week + timedelta(days=6)
+    return f"{start_of_week.strftime('%Y-%m-%d')}_to_{end_of_week.strftime('%Y-%m-%d')}"
+
+def parse_strptime(values):
+    return [datetime.strptime(value, CREATED_AT_FORMAT) for value in values]
+
+def parse_fast(values):
+    parse = DateParser(CREATED_AT_FORMAT).parse
+    return [parse(value) for value in values]
+
+def week_keys_strftime(dates):
+    return [strftime_week_key(created_at) for created_at in dates]
+
+def week_keys_memoized(dates):
+    return [week_key_for_ordinal(created_at.toordinal()) for created_at in dates]
+
+def format_strftime(dates):
+    return [created_at.strftime('%Y-%m-%dT%H:%M:%S.000Z') for created_at in dates]
+
+def format_fast(timestamps):
+    return [format_archive_date(timestamp) for timestamp in timestamps]
+
+def sort_weeks_strptime(week_keys):
+    return sorted(week_keys, key=lambda week_key: datetime.strptime(week_key[:10], '%Y-%m-%d'), reverse=True)
+
+def sort_weeks_strings(week_keys):
+    return sorted(week_keys, key=lambda week_key: week_key[:10], reverse=True)
+
+# Function to bucket and format every tweet the way apify_config.py used to
+def pipeline_strptime(values):
+    results = []
+    for value in values:
+        created_at = datetime.strptime(value, CREATED_AT_FORMAT)
+        results.append((strftime_week_key(created_at), created_at.strftime('%Y-%m-%dT%H:%M:%S.000Z')))
+    return results
+
+def pipeline_fast(values):
+    parse = DateParser(CREATED_AT_FORMAT).parse
+    results = []
+    for value in values:
+        timestamp, week_key = parse(value)
+        results.append((week_key, format_archive_date(timestamp)))
+    return results
+
+# Function to time a case
+def best_time(function, argument, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tweets", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = [tweet["created_at"] for tweet in make_tweets(args.tweets, make_keywords(5))]
+    dates = parse_strptime(values)
+    timestamps = [timestamp for timestamp, _ in parse_fast(values)]
+    week_keys = list(dict.fromkeys(week_keys_strftime(dates)))
+
+    cases = (
+        ("parse created_at", parse_strptime, parse_fast, values),
+        ("week key", week_keys_strftime, week_keys_memoized, dates),
+        ("archive date", format_strftime, format_fast, None),
+        ("sort week groups", sort_weeks_strptime, sort_weeks_strings, week_keys),
+        ("bucket + format", pipeline_strptime, pipeline_fast, values),
+    )
+    print(f"{'case':>18} {'strptime (ms)':>14} {'fast (ms)':>10} {'speedup':>8}")
+    for name, reference, fast, argument in cases:
+        if argument is None:
+            # The fast path formats timestamps where the reference formats datetimes
+            reference_time, expected = best_time(reference, dates, args.repeat)
+            fast_time, result = best_time(fast, timestamps, args.repeat)
+        else:
+            reference_time, expected = best_time(reference, argument, args.repeat)
+            fast_time, result = best_time(fast, argument, args.repeat)
+        if name != "parse created_at":
+            assert result == expected, f"{name}: the fast path disagrees with the reference"
+        print(f"{name:>18} {reference_time * 1000:>14.1f} {fast_time * 1000:>10.1f} {reference_time / fast_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# Import necessary libraries
+import argparse
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, timedelta
+from metric_aggregates import ENGAGEMENT_METRICS, metric_value
+from tweet_archive import TweetArchive
+
+# Bounds standing in for an open-ended period
+EARLIEST_DATE = "0000-01-01"
+LATEST_DATE = "9999-12-31"
+
+# Minimum similarity of the near copies scored once (see near_duplicates.py)
+DEFAULT_SIMILARITY = 0.8
+
+# Function to load the analysis configuration
+def load_analysis_config(config_path="analysis_config.json"):
+    """
+    Loads the generic and event keywords of the analysis configuration.
+
+    Args:
+        config_path (str): Path to the analysis configuration file.
+
+    Returns:
+        list: Every configured keyword entry, generic ones first.
+    """
+    with open(config_path, 'r') as file:
+        config = json.load(file)["analysis_config"]
+    return config.get("generic", []) + config.get("events", [])
+
+# Function to shift a YYYY-MM-DD date by a number of days
+def shift_date(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+# Function to split a configured keyword into analysis periods
+def get_periods(entry):
+    """
+    Lists the periods to analyse for a configured keyword.
+
+    Events with an `event_period` are split into pre-event, during-event and post-event periods
+    within `start_date`..`end_date`. Other entries cover their `year`, or the whole archive for "All".
+
+    Args:
+        entry (dict): A keyword entry of the analysis configuration.
+
+    Returns:
+        list: (name, start_date, end_date) tuples with inclusive YYYY-MM-DD bounds, in date order.
+    """
+    if "start_date" in entry:
+        start_date, end_date = entry["start_date"], entry["end_date"]
+        event_period = entry.get("event_period")
+        if not event_period:
+            return [("event", start_date, end_date)]
+
+        periods = [("pre_event", start_date, shift_date(event_period["start_date"], -1)),
+                   ("during_event", event_period["start_date"], event_period["end_date"]),
+                   ("post_event", shift_date(event_period["end_date"], 1), end_date)]
+        # Drop periods left empty when the event starts or ends with the window
+        return [period for period in periods if period[1] <= period[2]]
+
+    year = str(entry.get("year", "All"))
+    if year.lower() == "all":
+        return [("all", EARLIEST_DATE, LATEST_DATE)]
+    return [(year, f"{year}-01-01", f"{year}-12-31")]
+
+# Time index over the weekly segments of an archive
+class WeekIndex:
+    """
+    Sorted week keys of an archive, searched with bisect.
+
+    Week keys start and end with ISO dates, so they sort chronologically and the weeks
+    overlapping a date range form one contiguous slice. The bounds come from both dates
+    of the key, so legacy Sunday-to-Sunday keys spanning eight days are found too.
+
+    Args:
+        week_keys (iterable): Week keys such as '2023-10-16_to_2023-10-22'.
+    """
+
+    def __init__(self, week_keys):
+        self.week_keys = sorted(week_keys)
+        self.week_starts = [week_key[:10] for week_key in self.week_keys]
+        self.week_ends = [week_key[-10:] for week_key in self.week_keys]
+
+    def weeks_between(self, start_date, end_date):
+        """
+        Finds the weeks overlapping a date range.
+
+        Args:
+            start_date (str): First day of the range, YYYY-MM-DD.
+            end_date (str): Last day of the range, YYYY-MM-DD.
+
+        Returns:
+            list: Week keys overlapping the range, in date order.
+        """
+        # A week overlaps the range if it ends on or after its first day and starts on or before its last
+        low = bisect_left(self.week_ends, start_date)
+        high = bisect_right(self.week_starts, end_date)
+        return self.week_keys[low:high]
+
+# Weeks of a legacy tweets_<keyword>.json file, read like a TweetArchive
+class JsonWeeks:
+    def __init__(self, json_path):
+        with open(json_path, 'r', encoding='utf-8') as file:
+            self.tweets_by_week = json.load(file)
+
+    def weeks(self):
+        return sorted(self.tweets_by_week, reverse=True)
+
+    def read_week(self, week_key):
+        return self.tweets_by_week.get(week_key, [])
+
+# Function to open the archive of a keyword in either layout
+def open_weeks(base_directory, keyword):
+    """
+    Opens the archive of a keyword without converting it.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        keyword (str): The search keyword.
+
+    Returns:
+        TweetArchive or JsonWeeks: The archive, or None if the keyword has none.
+    """
+    archive = TweetArchive(base_directory, keyword)
+    if archive.exists():
+        return archive
+    json_path = os.path.join(base_directory, f"tweets_{keyword}.json")
+    if os.path.isfile(json_path):
+        return JsonWeeks(json_path)
+    return None
+
+# Function to score the polarity of a text with TextBlob
+def textblob_polarity(text):
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+# Function to score the texts of a week, once per cluster of near copies
+def score_texts(scores, text_counts, polarity, similarity=DEFAULT_SIMILARITY):
+    """
+    Adds the polarity of every text not scored yet to `scores`.
+
+    Retweets, truncated retweets and reposts with another link are clustered first, and
+    every text of a cluster gets the polarity of its most repeated text.
+
+    Args:
+        scores (dict): Text -> polarity of the texts scored so far, updated in place.
+        text_counts (Counter): Number of tweets of every text of the week.
+        polarity (callable): Function scoring the polarity of a text.
+        similarity (float): Minimum estimated similarity of near copies; None only reuses identical texts.
+    """
+    new_texts = [text for text in text_counts if text not in scores]
+    if similarity is None or len(new_texts) < 2:
+        for text in new_texts:
+            scores[text] = polarity(text)
+        return
+
+    from near_duplicates import cluster_representatives, text_tokens
+    representatives = cluster_representatives([text_tokens(text) for text in new_texts],
+                                              [text_counts[text] for text in new_texts], similarity)
+    for text, representative in zip(new_texts, representatives.tolist()):
+        representative_text = new_texts[representative]
+        if representative_text not in scores:
+            scores[representative_text] = polarity(representative_text)
+        scores[text] = scores[representative_text]
+
+# Running totals of one analysis period
+class PeriodStats:
+    def __init__(self, name, start_date, end_date):
+        self.name = name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tweets = 0
+        self.authors = set()
+        self.public_metrics = {}
+        self.polarity_sum = 0.0
+        self.sentiment = {"Positive": 0, "Neutral": 0, "Negative": 0}
+
+    def add(self, tweet, polarity):
+        self.tweets += 1
+        self.authors.add(tweet.get("author_id"))
+        for metric, value in tweet.get("public_metrics", {}).items():
+            self.public_metrics[metric] = self.public_metrics.get(metric, 0) + (metric_value(value) or 0)
+        if polarity is not None:
+            self.polarity_sum += polarity
+            self.sentiment["Positive" if polarity > 0 else "Negative" if polarity < 0 else "Neutral"] += 1
+
+    def summary(self, with_sentiment):
+        engagement = sum(self.public_metrics.get(metric, 0) for metric in ENGAGEMENT_METRICS)
+        summary = {
+            "start_date": self.start_date if self.start_date != EARLIEST_DATE else None,
+            "end_date": self.end_date if self.end_date != LATEST_DATE else None,
+            "tweets": self.tweets,
+            "authors": len(self.authors),
+            "public_metrics": self.public_metrics,
+            "engagement": engagement,
+            "engagement_per_tweet": engagement / self.tweets if self.tweets else 0.0,
+        }
+        if with_sentiment:
+            summary["polarity"] = self.polarity_sum / self.tweets if self.tweets else 0.0
+            summary["sentiment"] = self.sentiment
+        return summary
+
+# Function to analyse the periods of one keyword
+def analyse_keyword(archive, periods, polarity=textblob_polarity, similarity=DEFAULT_SIMILARITY):
+    """
+    Computes volume, engagement and sentiment of every period in one pass over the archive.
+
+    Only the weeks overlapping a period are read, each of them once, and every tweet
+    is assigned to its period by bisecting the period start dates. Near copies within a
+    week are scored once, and the polarity of their cluster counts once per tweet.
+
+    Args:
+        archive (TweetArchive or JsonWeeks): The keyword's archive.
+        periods (list): (name, start_date, end_date) tuples from get_periods, in date order.
+        polarity (callable): Function scoring the polarity of a text; None skips sentiment.
+        similarity (float): Minimum similarity of near copies scored once; None scores every distinct text.
+
+    Returns:
+        dict: Period name -> summary of the period.
+    """
+    stats = [PeriodStats(*period) for period in periods]
+    period_starts = [period_stats.start_date for period_stats in stats]
+    week_index = WeekIndex(archive.weeks())
+
+    # Read the weeks of all periods once; adjacent periods share boundary weeks
+    week_keys = dict.fromkeys(week_key for period_stats in stats
+                              for week_key in week_index.weeks_between(period_stats.start_date, period_stats.end_date))
+
+    scores = {}  # Retweets repeat their text, so score every distinct text once
+    for week_key in week_keys:
+        matched = []
+        for tweet in archive.read_week(week_key):
+            day = tweet["created_at"][:10]
+            position = bisect_right(period_starts, day) - 1
+            if position < 0 or day > stats[position].end_date:
+                continue
+            matched.append((position, tweet))
+
+        if polarity is not None:
+            score_texts(scores, Counter(tweet.get("text", "") for _, tweet in matched), polarity, similarity)
+        for position, tweet in matched:
+            stats[position].add(tweet, scores[tweet.get("text", "")] if polarity is not None else None)
+
+    return {period_stats.name: period_stats.summary(polarity is not None) for period_stats in stats}
+
+# Function to run every configured analysis
+def run_analysis(config_entries, base_directory, polarity=textblob_polarity, similarity=DEFAULT_SIMILARITY):
+    """
+    Analyses every configured keyword.
+
+    Args:
+        config_entries (list): Keyword entries from load_analysis_config.
+        base_directory (str): Directory holding the archives.
+        polarity (callable): Function scoring the polarity of a text; None skips sentiment.
+        similarity (float): Minimum similarity of near copies scored once; None scores every distinct text.
+
+    Returns:
+        dict: Keyword -> {"type": ..., "periods": {period name: summary}}.
+    """
+    results = {}
+    for entry in config_entries:
+        keyword = entry["keyword"]
+        archive = open_weeks(base_directory, keyword)
+        if archive is None:
+            logging.warning(f"No archive found for {keyword} in {base_directory}.")
+            continue
+
+        try:
+            results[keyword] = {"type": entry.get("type", ""),
+                                "periods": analyse_keyword(archive, get_periods(entry), polarity, similarity)}
+        except Exception as e:
+            logging.error(f"Error analysing {keyword}: {e}")
+        finally:
+            if isinstance(archive, TweetArchive):
+                archive.close()
+    return results
+
+# Function to print the results as a table
+def print_results(results):
+    print(f"{'keyword':<16} {'period':<14} {'tweets':>8} {'authors':>8} {'engagement':>11} {'polarity':>9}")
+    for keyword, result in results.items():
+        for name, summary in result["periods"].items():
+            polarity = f"{summary['polarity']:>9.3f}" if "polarity" in summary else f"{'-':>9}"
+            print(f"{keyword:<16} {name:<14} {summary['tweets']:>8} {summary['authors']:>8} "
+                  f"{summary['engagement']:>11} {polarity}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report pre-, during- and post-event activity of the configured keywords.")
+    parser.add_argument("--config", default="analysis_config.json", help="Path to the analysis configuration file.")
+    parser.add_argument("--base-directory", default="TWEET_ARCHIEVE", help="Directory holding the archives.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    parser.add_argument("--no-sentiment", action="store_true", help="Skip the sentiment analysis.")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY,
+                        help="Minimum similarity of near copies scored once (default: %(default)s).")
+    parser.add_argument("--exact-sentiment", action="store_true", help="Score every distinct text, even near copies.")
+    args = parser.parse_args()
+
+    results = run_analysis(load_analysis_config(args.config), args.base_directory,
+                           None if args.no_sentiment else textblob_polarity,
+                           None if args.exact_sentiment else args.similarity)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == "__main__":
+    main()
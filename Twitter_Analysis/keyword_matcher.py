@@ -0,0 +1,105 @@
+# Import necessary libraries
+import re
+from collections import deque
+
+# Multi-keyword matcher built on an Aho-Corasick automaton
+class KeywordMatcher:
+    """
+    Matches many search keywords against a text in a single pass.
+
+    Keywords are matched case-insensitively as substrings, which mirrors
+    `contains_keyword` in `apify_config.py`. The automaton is compiled once into
+    a flat transition table so each character of a text costs a single dict lookup,
+    and stretches of text that cannot start a keyword are skipped with a regex search.
+
+    Args:
+        search_keywords (list): Keywords to match. Duplicates are matched once.
+    """
+
+    def __init__(self, search_keywords):
+        # Preserve the order of first appearance and drop duplicates
+        self.keywords = list(dict.fromkeys(search_keywords))
+        self._always = tuple(i for i, keyword in enumerate(self.keywords) if not keyword)
+        self._delta, self._outputs = self._compile([keyword.lower() for keyword in self.keywords])
+        # Characters that leave the root state; everything else can be skipped from the root
+        first_chars = "".join(sorted(self._delta[0]))
+        self._skip_to_start = re.compile(f"[{re.escape(first_chars)}]").search if first_chars else None
+
+    @staticmethod
+    def _compile(patterns):
+        # Build the trie of lowercased keywords
+        goto = [{}]
+        outputs = [set()]
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].add(index)
+
+        # Resolve failure links breadth first and fold them into a full transition table
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            transitions = dict(delta[fail[state]])
+            for char, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state]].get(char, 0)
+                transitions[char] = next_state
+                queue.append(next_state)
+            delta[state] = transitions
+
+        return delta, [tuple(sorted(output)) for output in outputs]
+
+    def match(self, text):
+        """
+        Find the keywords contained in a text.
+
+        Args:
+            text (str): The text to scan. It is lowercased before matching.
+
+        Returns:
+            set: Indices into `self.keywords` of every keyword found in the text.
+        """
+        matched = set(self._always)
+        if self._skip_to_start is None:
+            return matched
+
+        delta = self._delta
+        outputs = self._outputs
+        skip_to_start = self._skip_to_start
+        text = text.lower()
+        length = len(text)
+        position = 0
+        state = 0
+        while position < length:
+            if state == 0:
+                # Jump straight to the next character that can start a keyword
+                start = skip_to_start(text, position)
+                if start is None:
+                    break
+                position = start.start()
+            state = delta[state].get(text[position], 0)
+            if outputs[state]:
+                matched.update(outputs[state])
+            position += 1
+        return matched
+
+    def match_keywords(self, text):
+        """
+        Find the keywords contained in a text.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            list: Matched keywords, in the order they were given.
+        """
+        return [self.keywords[index] for index in sorted(self.match(text))]
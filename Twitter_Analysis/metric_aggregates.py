@@ -0,0 +1,270 @@
+# Import necessary libraries
+import argparse
+import heapq
+import json
+import re
+import sqlite3
+from collections import defaultdict
+
+# Engagement metrics summed into the 'engagement' figure of a tweet
+ENGAGEMENT_METRICS = ("retweet_count", "reply_count", "quote_count", "like_count", "bookmark_count")
+
+# Hashtag key of the totals over every tweet of the archive
+ALL_TWEETS = ""
+
+# Number of most engaging tweets kept per week and hashtag
+DEFAULT_TOP_K = 10
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+
+# Bump when the aggregation changes, so stored aggregates are rebuilt
+AGGREGATES_VERSION = 2
+
+# Maximum number of parameters bound in a single SQLite query
+QUERY_CHUNK_SIZE = 500
+
+# Function to read a public metric that may be missing or empty
+def metric_value(value):
+    """
+    Reads a public metric value.
+
+    Args:
+        value: The value stored in the tweet, e.g. 12, "12" or "" when the actor did not return it.
+
+    Returns:
+        int: The value, or None if it is missing.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Function to compute the engagement of an archived tweet
+def tweet_engagement(tweet):
+    public_metrics = tweet.get("public_metrics", {})
+    return sum(metric_value(public_metrics.get(metric)) or 0 for metric in ENGAGEMENT_METRICS)
+
+# Materialized public_metrics aggregates of an archive
+class MetricAggregates:
+    """
+    Keeps per-week and per-hashtag public_metrics totals of an archive in a SQLite file.
+
+    For every week and hashtag (plus `ALL_TWEETS` for the whole archive) one row stores the sum
+    and the number of tweets carrying each metric, and the `top_k` most engaging tweets. Hashtags
+    are lowercased, so '#INFORMS2023' and '#informs2023' share a row. Totals
+    are updated incrementally with each batch of new tweets, so reports read them in
+    O(weeks) instead of rescanning the tweets. Like `TweetIdIndex`, the number of committed
+    tweets is recorded so the owner can detect stale aggregates and rebuild them.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+        top_k (int): Number of most engaging tweets kept per week and hashtag.
+    """
+
+    def __init__(self, db_path, top_k=DEFAULT_TOP_K):
+        self.db_path = db_path
+        self.top_k = top_k
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS totals (
+                week_key TEXT NOT NULL,
+                hashtag TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                top_tweets TEXT NOT NULL,
+                PRIMARY KEY (week_key, hashtag)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def committed_count(self):
+        """
+        Returns:
+            int: Number of tweets the aggregates were last committed with, or 0 if they were
+                 computed by another version of the aggregation.
+        """
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        return meta.get("tweets", 0) if meta.get("version") == AGGREGATES_VERSION else 0
+
+    def add(self, tweets_by_week, committed_count):
+        """
+        Adds new tweets to the aggregates in a single transaction.
+
+        Args:
+            tweets_by_week (dict): Week key -> new tweets of that week. Tweets must not have been added before.
+            committed_count (int): Number of tweets in the archive once these are added.
+        """
+        with self.connection:
+            self._add(tweets_by_week, committed_count)
+
+    def rebuild(self, tweets_by_week, committed_count):
+        """
+        Recomputes the aggregates of a whole archive in a single transaction.
+
+        Args:
+            tweets_by_week (iterable): (week_key, tweets) pairs of every archived tweet.
+            committed_count (int): Number of tweets in the archive.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM totals")
+            self._add(tweets_by_week, committed_count)
+
+    def _add(self, tweets_by_week, committed_count):
+        rows = defaultdict(list)  # (week_key, hashtag, metric names) -> [metric values of a tweet]
+        candidates = defaultdict(list)  # (week_key, hashtag) -> [(engagement, tweet_id)]
+        items = tweets_by_week.items() if isinstance(tweets_by_week, dict) else tweets_by_week
+
+        for week_key, tweets in items:
+            for tweet in tweets:
+                engagement = tweet_engagement(tweet)
+                names, values = ["tweets", "engagement"], [1, engagement]
+                for metric, value in tweet.get("public_metrics", {}).items():
+                    value = metric_value(value)
+                    if value is not None:
+                        names.append(metric)
+                        values.append(value)
+                names, values = tuple(names), tuple(values)
+
+                tweet_id = int(tweet["tweet_id"] if "tweet_id" in tweet else tweet["id"])
+                hashtags = {hashtag.lower() for hashtag in HASHTAG_PATTERN.findall(tweet.get("text", ""))}
+                for hashtag in {ALL_TWEETS, *hashtags}:
+                    rows[week_key, hashtag, names].append(values)
+                    candidates[week_key, hashtag].append((engagement, tweet_id))
+
+        # Sum the metrics column by column; tweets of a batch nearly always carry the same metrics
+        totals = defaultdict(dict)  # (week_key, hashtag) -> {metric: [sum, count]}
+        for (week_key, hashtag, names), values in rows.items():
+            group = totals[week_key, hashtag]
+            for metric, column in zip(names, zip(*values)):
+                total = group.setdefault(metric, [0, 0])
+                total[0] += sum(column)
+                total[1] += len(column)
+
+        # Merge with the stored rows of every touched week, read at once
+        week_keys = list({week_key for week_key, _ in candidates})
+        for start in range(0, len(week_keys), QUERY_CHUNK_SIZE):
+            chunk = week_keys[start:start + QUERY_CHUNK_SIZE]
+            stored = self.connection.execute("SELECT week_key, hashtag, metrics, top_tweets FROM totals "
+                                             f"WHERE week_key IN ({','.join('?' * len(chunk))})", chunk)
+            for week_key, hashtag, metrics, top_tweets in stored:
+                group = totals.get((week_key, hashtag))
+                if group is None:
+                    continue
+                for metric, (total, count) in json.loads(metrics).items():
+                    if metric in group:
+                        group[metric][0] += total
+                        group[metric][1] += count
+                    else:
+                        group[metric] = [total, count]
+                candidates[week_key, hashtag].extend(map(tuple, json.loads(top_tweets)))
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO totals (week_key, hashtag, metrics, top_tweets) VALUES (?, ?, ?, ?)",
+            ((week_key, hashtag, json.dumps(group), json.dumps(heapq.nlargest(self.top_k, candidates[week_key, hashtag])))
+             for (week_key, hashtag), group in totals.items()))
+
+        self.connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                    (("tweets", committed_count), ("version", AGGREGATES_VERSION)))
+
+    def weekly_totals(self, hashtag=ALL_TWEETS):
+        """
+        Reads the weekly totals of a hashtag.
+
+        Args:
+            hashtag (str): The hashtag, without '#' and in any case. Defaults to every tweet of the archive.
+
+        Returns:
+            dict: Week key -> {metric: {"sum": ..., "count": ...}}, latest week first.
+        """
+        weeks = {}
+        rows = self.connection.execute("SELECT week_key, metrics FROM totals WHERE hashtag = ? ORDER BY week_key DESC",
+                                       (hashtag.lower(),))
+        for week_key, metrics in rows:
+            weeks[week_key] = {metric: {"sum": total, "count": count} for metric, (total, count) in json.loads(metrics).items()}
+        return weeks
+
+    def hashtag_averages(self, metric="engagement", week_keys=None, limit=None):
+        """
+        Ranks hashtags by the average of a metric over the tweets carrying it.
+
+        Args:
+            metric (str): The metric to average: 'engagement' or one of the public_metrics
+                          mapped by `tweet_fields`, e.g. 'retweet_count'.
+            week_keys (iterable): Weeks to include. Every week is included if omitted.
+            limit (int): Number of hashtags to return. Every hashtag is returned if omitted.
+
+        Returns:
+            list: (hashtag, average, tweets) tuples, highest average first.
+        """
+        hashtags = defaultdict(lambda: [0, 0])  # hashtag -> [sum, count]
+        week_keys = set(week_keys) if week_keys is not None else None
+        for week_key, hashtag, metrics in self.connection.execute("SELECT week_key, hashtag, metrics FROM totals "
+                                                                  "WHERE hashtag != ?", (ALL_TWEETS,)):
+            if week_keys is not None and week_key not in week_keys:
+                continue
+            total = json.loads(metrics).get(metric)
+            if total:
+                hashtags[hashtag][0] += total[0]
+                hashtags[hashtag][1] += total[1]
+        averages = sorted(((hashtag, total / count, count) for hashtag, (total, count) in hashtags.items() if count),
+                          key=lambda row: row[1], reverse=True)
+        return averages[:limit] if limit is not None else averages
+
+    def top_tweets(self, week_key=None, hashtag=ALL_TWEETS, limit=None):
+        """
+        Reads the most engaging tweets of a week, or of the whole archive.
+
+        Args:
+            week_key (str): The week. Every week is searched if omitted.
+            hashtag (str): The hashtag, without '#' and in any case. Defaults to every tweet of the archive.
+            limit (int): Number of tweets to return. Defaults to top_k.
+
+        Returns:
+            list: (tweet_id, engagement) tuples, most engaging first.
+        """
+        query = "SELECT top_tweets FROM totals WHERE hashtag = ?"
+        parameters = [hashtag.lower()]
+        if week_key is not None:
+            query += " AND week_key = ?"
+            parameters.append(week_key)
+        tweets = [tuple(tweet) for (top_tweets,) in self.connection.execute(query, parameters)
+                  for tweet in json.loads(top_tweets)]
+        return [(tweet_id, engagement) for engagement, tweet_id in heapq.nlargest(limit or self.top_k, tweets)]
+
+    def close(self):
+        self.connection.close()
+
+def main():
+    from tweet_archive import TweetArchive
+
+    parser = argparse.ArgumentParser(description="Print the weekly public_metrics totals of an archive.")
+    parser.add_argument("keyword", help="The search keyword of the archive, e.g. '#INFORMS2023'.")
+    parser.add_argument("--base-directory", default="TWEET_ARCHIEVE", help="Directory holding the archives.")
+    parser.add_argument("--hashtag", default=ALL_TWEETS, help="Only count the tweets using this hashtag (without '#').")
+    parser.add_argument("--top-hashtags", type=int, metavar="N",
+                        help="Print the N hashtags with the highest average --metric instead.")
+    parser.add_argument("--metric", default="engagement", help="Metric ranking the hashtags (default: engagement).")
+    parser.add_argument("--top-tweets", type=int, metavar="N",
+                        help="Print the IDs of the N most engaging tweets of --hashtag instead.")
+    args = parser.parse_args()
+
+    with TweetArchive(args.base_directory, args.keyword) as archive:
+        aggregates = archive.aggregates
+        if args.top_hashtags:
+            for hashtag, average, tweets in aggregates.hashtag_averages(args.metric, limit=args.top_hashtags):
+                print(f"#{hashtag}: {average:.1f} average {args.metric} over {tweets} tweets")
+            return
+        if args.top_tweets:
+            for tweet_id, engagement in aggregates.top_tweets(hashtag=args.hashtag, limit=args.top_tweets):
+                print(f"{tweet_id}: engagement {engagement}")
+            return
+
+        for week_key, metrics in aggregates.weekly_totals(args.hashtag).items():
+            tweets = metrics.pop("tweets")["sum"]
+            totals = ", ".join(f"{metric} {values['sum']}" for metric, values in sorted(metrics.items()))
+            print(f"{week_key}: {tweets} tweets, {totals}")
+
+if __name__ == "__main__":
+    main()
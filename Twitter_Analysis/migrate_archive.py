@@ -0,0 +1,51 @@
+# Import necessary libraries
+import argparse
+import glob
+import logging
+import os
+from tweet_archive import TweetArchive, migrate_json_archive
+
+# Function to convert every legacy tweets_*.json file of a directory
+def migrate_directory(source_directory, output_directory=None):
+    """
+    Converts the legacy `tweets_*.json` files of a directory into segmented archives.
+
+    Files whose archive already exists are skipped, so the tool can be re-run safely.
+    The legacy files are left untouched.
+
+    Args:
+        source_directory (str): Directory holding the legacy JSON files.
+        output_directory (str): Directory to write the archives to. Defaults to `source_directory`.
+
+    Returns:
+        list: The archives that were written.
+    """
+    output_directory = output_directory or source_directory
+    migrated = []
+
+    for json_path in sorted(glob.glob(os.path.join(glob.escape(source_directory), "tweets_*.json"))):
+        name = os.path.splitext(os.path.basename(json_path))[0][len("tweets_"):]
+        if TweetArchive(output_directory, name).exists():
+            logging.warning(f"Skipping {json_path}: archive already exists.")
+            continue
+
+        try:
+            archive = migrate_json_archive(json_path, output_directory)
+            print(f"Migrated {json_path} to {archive.path} ({archive.count()} tweets, {len(archive.weeks())} weeks).")
+            migrated.append(archive)
+        except Exception as e:
+            logging.error(f"Error migrating {json_path}: {e}")
+
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy tweets_*.json files into segmented weekly archives.")
+    parser.add_argument("source_directory", nargs="?", default="TWEET_ARCHIEVE",
+                        help="Directory holding the legacy tweets_*.json files.")
+    parser.add_argument("--output-directory", help="Directory to write the archives to. Defaults to the source directory.")
+    args = parser.parse_args()
+
+    migrate_directory(args.source_directory, args.output_directory)
+
+if __name__ == "__main__":
+    main()
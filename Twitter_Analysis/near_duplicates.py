@@ -0,0 +1,201 @@
+# Import necessary libraries
+import re
+import zlib
+import numpy as np
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+WORD_PATTERN = re.compile(r"\w+")
+
+# Multipliers folding the word hashes of a shingle into one hash; uint64 arithmetic wraps around
+SHINGLE_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5],
+                               dtype=np.uint64)
+
+# Number of shingles permuted at a time; bounds the (permutations x shingles) matrix
+SIGNATURE_CHUNK_SIZE = 100000
+
+# Function to split a raw tweet text into the words compared between near copies
+def text_tokens(text):
+    """
+    Splits a tweet text into lowercase words, without links or punctuation.
+
+    Args:
+        text (str): Raw tweet text.
+
+    Returns:
+        list: The words, e.g. ["rt", "informs", "smarter", "decisions"].
+    """
+    return WORD_PATTERN.findall(URL_PATTERN.sub(" ", text.lower()))
+
+# Function to drop the retweet prefixes of a token list
+def strip_retweet(tokens):
+    """
+    Drops the "rt <handle>" prefixes retweets (and retweets of retweets) add to a text.
+
+    Args:
+        tokens (list): Lowercase words of the text, from text_tokens or a cleaning step keeping handles.
+
+    Returns:
+        list: The words of the retweeted text.
+    """
+    start = 0
+    while len(tokens) - start > 2 and tokens[start] == "rt":
+        start += 2
+    return tokens[start:]
+
+# Function to hash the word shingles of token lists
+def shingle_hashes(token_lists, size=3):
+    """
+    Hashes the word shingles of token lists.
+
+    Every distinct word is hashed once, then the shingles of all lists are folded from the
+    word hashes in a few vectorized passes. Lists shorter than a shingle are a single shingle.
+
+    Args:
+        token_lists (list): Words of every text.
+        size (int): Words per shingle, at most len(SHINGLE_MULTIPLIERS).
+
+    Returns:
+        tuple: 32-bit hash of every shingle as a uint64 array, and the offset of the first shingle of every list.
+    """
+    token_lists = [strip_retweet(tokens) or [""] for tokens in token_lists]
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    vocabulary = {}
+    codes = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for tokens in token_lists for word in tokens),
+                        dtype=np.int64, count=int(lengths.sum()))
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in vocabulary),
+                              dtype=np.uint64, count=len(vocabulary))[codes]
+
+    # Fold the words of the shingle starting at every position, without crossing into the next list
+    positions = np.arange(len(word_hashes))
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    folded = np.zeros(len(word_hashes), dtype=np.uint64)
+    for shift in range(size):
+        following = positions + shift
+        inside = following < ends
+        folded[inside] += word_hashes[following[inside]] * SHINGLE_MULTIPLIERS[shift]
+
+    # Keep the positions a whole shingle starts at, or the first word of a short list
+    counts = np.maximum(lengths - size + 1, 1)
+    starts = np.cumsum(lengths) - lengths
+    kept = positions - np.repeat(starts, lengths) < np.repeat(counts, lengths)
+    offsets = np.cumsum(counts) - counts
+    return folded[kept] >> np.uint64(32), offsets
+
+# Function to compute MinHash signatures
+def minhash_signatures(token_lists, num_perm=32, shingle_size=3, seed=1):
+    """
+    Computes the MinHash signature of every token list.
+
+    Every permutation is a multiply-add-shift hash, (a * x + b) mod 2**64 >> 32 with random
+    64-bit a and b, applied to many shingles at once and reduced to the minimum of every list.
+
+    Args:
+        token_lists (list): Words of every text.
+        num_perm (int): Number of permutations, i.e. signature length.
+        shingle_size (int): Words per shingle.
+        seed (int): Seed of the permutations, so signatures are reproducible.
+
+    Returns:
+        ndarray: (len(token_lists), num_perm) array of 32-bit minimum hashes, as uint64.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False)[:, None] | np.uint64(1)
+    b = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False)[:, None]
+    shingles, offsets = shingle_hashes(token_lists, shingle_size)
+
+    signatures = np.empty((len(offsets), num_perm), dtype=np.uint64)
+    # Chunks hold whole lists, so no list is split between two reductions
+    bounds = np.append(offsets, len(shingles))
+    first = 0
+    while first < len(offsets):
+        last = int(np.searchsorted(bounds, bounds[first] + SIGNATURE_CHUNK_SIZE, side="right")) - 1
+        last = min(max(last, first + 1), len(offsets))
+        permuted = (a * shingles[bounds[first]:bounds[last]] + b) >> np.uint64(32)
+        signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - bounds[first], axis=1).T
+        first = last
+    return signatures
+
+# Function to find the pairs of similar signatures with locality-sensitive hashing
+def similar_pairs(signatures, bands=8, threshold=0.8, seed=1):
+    """
+    Finds pairs of texts whose estimated Jaccard similarity reaches the threshold.
+
+    Signatures are split into bands; texts sharing a whole band fall into the same bucket,
+    and every text is compared with the first text of its bucket.
+
+    Args:
+        signatures (ndarray): Output of minhash_signatures.
+        bands (int): Number of bands; must divide the signature length.
+        threshold (float): Minimum share of equal signature values.
+        seed (int): Seed of the band hashing.
+
+    Returns:
+        set: (first, other) row pairs, first < other.
+    """
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    if rows * bands != num_perm:
+        raise ValueError(f"{bands} bands do not divide {num_perm} permutations")
+
+    # Fold each band into one 64-bit bucket key
+    multipliers = np.random.default_rng(seed).integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    positions = np.arange(count)
+    pairs = set()
+    for band in range(bands):
+        keys = (signatures[:, band * rows:(band + 1) * rows] * multipliers).sum(axis=1)
+        _, first_positions, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        firsts = first_positions[inverse]
+        others = positions[firsts != positions]
+        if not len(others):
+            continue
+        firsts = firsts[others]
+        similarity = (signatures[firsts] == signatures[others]).mean(axis=1)
+        matched = similarity >= threshold
+        pairs.update(zip(firsts[matched].tolist(), others[matched].tolist()))
+    return pairs
+
+# Function to find the root of a union-find item, compressing its path
+def find_root(parents, item):
+    root = item
+    while parents[root] != root:
+        root = parents[root]
+    while parents[item] != root:
+        parents[item], item = root, parents[item]
+    return root
+
+# Function to cluster near copies
+def cluster_representatives(token_lists, weights=None, threshold=0.8, num_perm=32, bands=8, shingle_size=3):
+    """
+    Clusters texts that are near copies of each other, such as retweets and truncated reposts.
+
+    Every pair of texts whose word shingles are estimated at least `threshold` similar is merged,
+    and the representative of a cluster is its heaviest text, the earliest one on ties. With the
+    default 8 bands of 4 permutations, pairs at 0.8 similarity are found 98% of the time and
+    pairs at 0.5 rarely.
+
+    Args:
+        token_lists (list): Words of every distinct text, e.g. from text_tokens.
+        weights (array): Number of tweets of every text. Defaults to one each.
+        threshold (float): Minimum estimated Jaccard similarity of two near copies.
+        num_perm (int): MinHash signature length.
+        bands (int): Number of locality-sensitive hashing bands.
+        shingle_size (int): Words per shingle.
+
+    Returns:
+        ndarray: Position of the representative of every text.
+    """
+    count = len(token_lists)
+    weights = np.ones(count) if weights is None else np.asarray(weights)
+    parents = list(range(count))
+    if count > 1:
+        signatures = minhash_signatures(token_lists, num_perm, shingle_size)
+        for first, other in sorted(similar_pairs(signatures, bands, threshold)):
+            first_root, other_root = find_root(parents, first), find_root(parents, other)
+            if first_root != other_root:
+                parents[max(first_root, other_root)] = min(first_root, other_root)
+    roots = [find_root(parents, position) for position in range(count)]
+
+    best = {}
+    for position in np.lexsort((np.arange(count), -weights)).tolist():
+        best.setdefault(roots[position], position)
+    return np.array([best[root] for root in roots], dtype=np.int64)
@@ -0,0 +1,192 @@
+# Import necessary libraries
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Function to read the peak resident set size of the process
+def peak_rss_bytes():
+    """
+    Returns:
+        int: The peak resident set size of the process in bytes, or None where it cannot be read.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+# Per-stage counters of a pipeline run
+class RunMetrics:
+    """
+    Accumulates wall time, calls, items and bytes per pipeline stage.
+
+    Stages are recorded with `stage` around a block, with `timed_iter` around an iterator
+    (e.g. a dataset download consumed as it streams), or with `add` by loops that time
+    their own steps. Stages running in several threads add up their times, so the stage
+    total can exceed the run's wall time. Counters are cheap enough to stay always on;
+    `report` turns them into one JSON-serialisable line.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the counters and restarts the run clock.
+        """
+        with self._lock:
+            self.stages = {}
+            self.started_at = datetime.now().isoformat(timespec="seconds")
+            self.started = time.perf_counter()
+
+    def add(self, name, seconds=0.0, calls=1, items=0, bytes_read=0, bytes_written=0):
+        """
+        Adds to the counters of a stage.
+
+        Args:
+            name (str): The stage, e.g. 'actor_run' or 'write'.
+            seconds (float): Wall time spent in the stage.
+            calls (int): Number of times the stage ran.
+            items (int): Number of items the stage processed.
+            bytes_read (int): Bytes read from disk or network.
+            bytes_written (int): Bytes written to disk.
+        """
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"seconds": 0.0, "calls": 0, "items": 0, "bytes_read": 0, "bytes_written": 0}
+            stage["seconds"] += seconds
+            stage["calls"] += calls
+            stage["items"] += items
+            stage["bytes_read"] += bytes_read
+            stage["bytes_written"] += bytes_written
+
+    def seconds(self, name):
+        """
+        Returns:
+            float: Wall time recorded so far for a stage, 0 if it has not run.
+        """
+        with self._lock:
+            return self.stages[name]["seconds"] if name in self.stages else 0.0
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """
+        Times a block as one call of a stage.
+
+        Yields:
+            dict: Counters the block can fill in once known: 'items', 'bytes_read' and 'bytes_written'.
+        """
+        counts = {"items": items, "bytes_read": 0, "bytes_written": 0}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.add(name, time.perf_counter() - start, **counts)
+
+    def timed_iter(self, name, iterable):
+        """
+        Wraps an iterator, timing only the time spent producing its items.
+
+        Args:
+            name (str): The stage, e.g. 'download'.
+            iterable (iterable): The items.
+
+        Yields:
+            The items of `iterable`.
+        """
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        seconds = 0.0
+        count = 0
+        try:
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                seconds += clock() - start
+                count += 1
+                yield item
+        finally:
+            self.add(name, seconds, items=count)
+
+    @contextmanager
+    def profile(self, profile_path=None):
+        """
+        Runs a block under cProfile and dumps the stats, if a path is given.
+
+        Args:
+            profile_path (str): File receiving the stats, readable with `python -m pstats`. Nothing is profiled if omitted.
+        """
+        if not profile_path:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            logging.info(f"Profile written to {profile_path}.")
+
+    def report(self, **fields):
+        """
+        Builds the report of the run so far.
+
+        Args:
+            **fields: Extra fields to include, e.g. the status and keywords of the run.
+
+        Returns:
+            dict: The start time, duration, peak RSS and stage counters of the run, plus `fields`.
+        """
+        with self._lock:
+            stages = {name: dict(stage, seconds=round(stage["seconds"], 6)) for name, stage in self.stages.items()}
+        return {"started_at": self.started_at, "duration": round(time.perf_counter() - self.started, 6),
+                "peak_rss_bytes": peak_rss_bytes(), **fields, "stages": stages}
+
+    def write_report(self, report_path, **fields):
+        """
+        Appends the report of the run to a JSON lines file, one line per run.
+
+        Args:
+            report_path (str): The JSON lines file.
+            **fields: Extra fields to include.
+
+        Returns:
+            dict: The report written.
+        """
+        report = self.report(**fields)
+        directory = os.path.dirname(report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(report_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(report, ensure_ascii=False) + "\n")
+        return report
+
+    def log_summary(self):
+        """
+        Logs one line per stage, slowest first.
+        """
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda stage: stage[1]["seconds"], reverse=True)
+        for name, stage in stages:
+            logging.info(f"{name}: {stage['seconds']:.2f}s, {stage['calls']} calls, {stage['items']} items, "
+                         f"{stage['bytes_read']} bytes read, {stage['bytes_written']} bytes written")
+
+# Counters shared by every stage of the current run
+METRICS = RunMetrics()
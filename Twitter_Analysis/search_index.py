@@ -0,0 +1,528 @@
+# Import necessary libraries
+import argparse
+import heapq
+import re
+import sqlite3
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import date
+from itertools import accumulate
+from run_metrics import METRICS
+from tweet_time import EPOCH_ORDINAL, SECONDS_PER_DAY, parse_archive_date
+
+# Words of two characters or more, hashtags and mentions of a tweet text, and its links
+TERM_PATTERN = re.compile(r"[#@]\w+|\w\w+")
+URL_PATTERN = re.compile(r"https?://\S+")
+
+# Words too common to narrow a search, left out of the index
+STOP_WORDS = frozenset((
+    "rt", "the", "and", "for", "are", "is", "to", "of", "in", "on", "at", "by", "an", "as", "be", "it", "or",
+    "this", "that", "with", "from", "have", "has", "was", "we", "you", "our", "your", "here", "will", "can"))
+
+# Prefix of the terms holding the tweets of an author
+AUTHOR_PREFIX = "author:"
+
+# Blocks a term may have per archive before the archive's postings are merged
+MAX_BLOCKS = 16
+
+# Posting lists up to this length are stored without deflating them
+MIN_COMPRESSED_POSTINGS = 16
+RAW_BLOCK, DEFLATED_BLOCK = b"r", b"z"
+
+# Tweets buffered per archive before their postings are written
+MAX_PENDING_TWEETS = 100000
+
+# Maximum number of parameters bound in a single SQLite query
+QUERY_CHUNK_SIZE = 500
+
+# Function to list the index terms of an archived tweet
+def tweet_terms(tweet):
+    """
+    Lists the terms a tweet is indexed under.
+
+    Text is lowercased and split into words, hashtags ('#informs2023') and mentions
+    ('@informs'). Hashtags and mentions are also indexed as plain words, so 'informs2023'
+    finds '#INFORMS2023'. Links, one-character words and `STOP_WORDS` are left out. The
+    author is indexed as 'author:<author_id>'.
+
+    Args:
+        tweet (dict): An archived tweet.
+
+    Returns:
+        set: The terms.
+    """
+    terms = set(TERM_PATTERN.findall(URL_PATTERN.sub(" ", tweet.get("text", "").lower())))
+    terms.update([term[1:] for term in terms if term[0] in "#@"])
+    terms -= STOP_WORDS
+    if tweet.get("author_id"):
+        terms.add(f"{AUTHOR_PREFIX}{tweet['author_id']}")
+    return terms
+
+# Function to normalise a query term
+def normalise_term(term):
+    if term.lower().startswith(AUTHOR_PREFIX):
+        return AUTHOR_PREFIX + term[len(AUTHOR_PREFIX):]
+    return term.lower()
+
+# Function to tell whether a query term can be looked up in the index
+def is_indexed(term):
+    term = normalise_term(term)
+    return term.endswith("*") or term.startswith(AUTHOR_PREFIX) or (len(term) > 1 and term not in STOP_WORDS)
+
+# Functions to compress a posting list
+def encode_postings(postings):
+    """
+    Compresses postings sorted by creation date and tweet ID.
+
+    Dates and IDs are delta encoded as int64 columns, which are mostly small numbers
+    since tweet IDs grow with time. Blocks of more than `MIN_COMPRESSED_POSTINGS`
+    postings are then deflated; smaller ones, e.g. rare words and most authors, are
+    stored as they are since deflating them costs more than it saves.
+
+    Args:
+        postings (list): Sorted (created_at, tweet_id) pairs.
+
+    Returns:
+        bytes: The block, starting with a byte telling whether it is deflated.
+    """
+    times, ids = zip(*postings)
+    data = (array('q', [times[0]] + [b - a for a, b in zip(times, times[1:])]).tobytes()
+            + array('q', [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]).tobytes())
+    if len(postings) <= MIN_COMPRESSED_POSTINGS:
+        return RAW_BLOCK + data
+    return DEFLATED_BLOCK + zlib.compress(data, 1)
+
+def decode_postings(data):
+    """
+    Decodes a block written by `encode_postings`.
+
+    Returns:
+        list: Sorted (created_at, tweet_id) pairs.
+    """
+    values = array('q')
+    values.frombytes(zlib.decompress(data[1:]) if data[:1] == DEFLATED_BLOCK else data[1:])
+    half = len(values) // 2
+    return list(zip(accumulate(values[:half]), accumulate(values[half:])))
+
+# Function to collect the postings of archived tweets
+def collect_postings(archive, tweets_by_week, postings, locations):
+    """
+    Adds the postings and locations of archived tweets to the given containers.
+
+    Args:
+        archive (str): Name of the archive.
+        tweets_by_week (dict or iterable): Week key -> tweets, or (week_key, tweets) pairs.
+        postings (defaultdict): Term -> list of (created_at, tweet_id), extended in place.
+        locations (list): (tweet_id, archive, week_key) rows, extended in place.
+    """
+    items = tweets_by_week.items() if isinstance(tweets_by_week, dict) else tweets_by_week
+    for week_key, tweets in items:
+        for tweet in tweets:
+            tweet_id = int(tweet["tweet_id"] if "tweet_id" in tweet else tweet["id"])
+            posting = (parse_archive_date(tweet["created_at"]), tweet_id)
+            for term in tweet_terms(tweet):
+                postings[term].append(posting)
+            locations.append((tweet_id, archive, week_key))
+
+# Function to convert a YYYY-MM-DD date into the bounds of its day
+def day_bounds(day):
+    """
+    Returns:
+        tuple: The first and last second of the day, in the timestamps of the archive.
+    """
+    start = (date.fromisoformat(day).toordinal() - EPOCH_ORDINAL) * SECONDS_PER_DAY
+    return start, start + SECONDS_PER_DAY - 1
+
+# Function to parse a query string into a tree
+def parse_query(text):
+    """
+    Parses a query such as '#informs2023 (smarter OR author:123)'.
+
+    Terms separated by spaces or AND must all match, OR binds looser than AND, and
+    parentheses group. A term ending in '*' matches every term with that prefix.
+
+    Args:
+        text (str): The query.
+
+    Returns:
+        The query tree: a term string, or ('and' | 'or', [subtrees]).
+    """
+    tokens = re.findall(r"\(|\)|[^\s()]+", text)
+    position = 0
+
+    def parse_or():
+        nonlocal position
+        operands = [parse_and()]
+        while position < len(tokens) and tokens[position] == "OR":
+            position += 1
+            operands.append(parse_and())
+        return operands[0] if len(operands) == 1 else ("or", operands)
+
+    def parse_and():
+        nonlocal position
+        operands = []
+        while position < len(tokens) and tokens[position] not in ("OR", ")"):
+            token = tokens[position]
+            position += 1
+            if token == "AND":
+                continue
+            if token == "(":
+                operands.append(parse_or())
+                if position >= len(tokens) or tokens[position] != ")":
+                    raise ValueError(f"Missing ')' in query {text!r}")
+                position += 1
+            else:
+                operands.append(token)
+        if not operands:
+            raise ValueError(f"Empty term in query {text!r}")
+        return operands[0] if len(operands) == 1 else ("and", operands)
+
+    tree = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position]!r} in query {text!r}")
+    return tree
+
+# Persistent inverted index of the archived tweets
+class SearchIndex:
+    """
+    Maps terms, hashtags, mentions and authors to the tweets using them, across every archive.
+
+    One SQLite file per base directory holds, for each term and archive, blocks of
+    compressed postings sorted by creation date, plus the archive and week of every
+    tweet so its content can be read back from the segments. The tweets appended to an
+    archive during one run add one block per term; once an archive has `MAX_BLOCKS`
+    blocks per term, they are merged. Blocks record their first and last dates, so date
+    filters skip the blocks outside the range. Like `TweetIdIndex`, the number of
+    committed tweets is recorded per archive so owners can detect a stale index and
+    rebuild it.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.pending = {}  # archive -> postings, locations and committed count not written yet
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                archive TEXT NOT NULL,
+                block INTEGER NOT NULL,
+                first_time INTEGER NOT NULL,
+                last_time INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (term, archive, block)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS tweets (
+                tweet_id INTEGER NOT NULL,
+                archive TEXT NOT NULL,
+                week_key TEXT NOT NULL,
+                PRIMARY KEY (tweet_id, archive)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def _meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def committed_count(self, archive):
+        """
+        Returns:
+            int: Number of tweets of the archive the index was last committed with.
+        """
+        return self._meta(f"tweets:{archive}")
+
+    def add(self, archive, tweets_by_week, committed_count):
+        """
+        Indexes new tweets of an archive.
+
+        Postings are buffered and written as one block per term when the index is flushed or
+        closed, or once `MAX_PENDING_TWEETS` tweets are waiting, so the appends of one run
+        share their blocks. If the process stops before, the archive's committed count is
+        behind and its owner rebuilds it.
+
+        Args:
+            archive (str): Name of the archive, i.e. its search keyword.
+            tweets_by_week (dict): Week key -> new archived tweets of that week. Tweets must not have been added before.
+            committed_count (int): Number of tweets in the archive once these are added.
+        """
+        pending = self.pending.setdefault(archive, {"postings": defaultdict(list), "locations": []})
+        collect_postings(archive, tweets_by_week, pending["postings"], pending["locations"])
+        pending["committed_count"] = committed_count
+        if len(pending["locations"]) >= MAX_PENDING_TWEETS:
+            self.flush(archive)
+
+    def flush(self, archive=None):
+        """
+        Writes the buffered postings of an archive, or of every archive, in a single transaction.
+
+        Args:
+            archive (str): Name of the archive. Every archive is flushed if omitted.
+        """
+        with METRICS.stage("index"), self.connection:
+            for name in ([archive] if archive is not None else list(self.pending)):
+                pending = self.pending.pop(name, None)
+                if pending is not None:
+                    self._write(name, pending["postings"], pending["locations"], pending["committed_count"])
+
+    def rebuild(self, archive, tweets_by_week, committed_count):
+        """
+        Reindexes a whole archive in a single transaction.
+
+        Args:
+            archive (str): Name of the archive.
+            tweets_by_week (iterable): (week_key, tweets) pairs of every archived tweet.
+            committed_count (int): Number of tweets in the archive.
+        """
+        self.pending.pop(archive, None)
+        postings, locations = defaultdict(list), []
+        collect_postings(archive, tweets_by_week, postings, locations)
+        with self.connection:
+            self.connection.execute("DELETE FROM postings WHERE archive = ?", (archive,))
+            self.connection.execute("DELETE FROM tweets WHERE archive = ?", (archive,))
+            self.connection.execute("DELETE FROM meta WHERE key = ?", (f"blocks:{archive}",))
+            self._write(archive, postings, locations, committed_count)
+
+    def _write(self, archive, postings, locations, committed_count):
+        if postings:
+            block = self._meta(f"blocks:{archive}") + 1
+            self.connection.executemany(
+                "INSERT INTO postings (term, archive, block, first_time, last_time, data) VALUES (?, ?, ?, ?, ?, ?)",
+                ((term, archive, block, entries[0][0], entries[-1][0], encode_postings(entries))
+                 for term, entries in ((term, sorted(entries)) for term, entries in postings.items())))
+            self.connection.executemany("INSERT OR REPLACE INTO tweets (tweet_id, archive, week_key) VALUES (?, ?, ?)",
+                                        locations)
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"blocks:{archive}", block))
+            if block >= MAX_BLOCKS:
+                self._compact(archive)
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                (f"tweets:{archive}", committed_count))
+
+    def compact(self, archive):
+        """
+        Merges the blocks of every term of an archive into one, in a single transaction.
+
+        Args:
+            archive (str): Name of the archive.
+        """
+        with self.connection:
+            self._compact(archive)
+
+    def _compact(self, archive):
+        blocks = defaultdict(list)
+        for term, data in self.connection.execute("SELECT term, data FROM postings WHERE archive = ?", (archive,)):
+            blocks[term].append(decode_postings(data))
+        self.connection.execute("DELETE FROM postings WHERE archive = ?", (archive,))
+        self.connection.executemany(
+            "INSERT INTO postings (term, archive, block, first_time, last_time, data) VALUES (?, ?, 1, ?, ?, ?)",
+            ((term, archive, entries[0][0], entries[-1][0], encode_postings(entries))
+             for term, entries in ((term, list(heapq.merge(*term_blocks))) for term, term_blocks in blocks.items())))
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, 1)", (f"blocks:{archive}",))
+
+    def postings(self, term, since=None, until=None):
+        """
+        Reads the tweets indexed under a term, or under every term with a prefix.
+
+        Args:
+            term (str): A word, '#hashtag', '@mention' or 'author:<author_id>', in any case.
+                        A trailing '*' matches every term starting with the rest, e.g. 'informs*'.
+            since (str): Only return tweets created on or after this date, YYYY-MM-DD.
+            until (str): Only return tweets created on or before this date, YYYY-MM-DD.
+
+        Returns:
+            dict: Tweet ID -> creation timestamp, for every archive.
+        """
+        if not is_indexed(term):
+            raise ValueError(f"'{term}' is not indexed, search for other words.")
+        start = day_bounds(since)[0] if since else None
+        end = day_bounds(until)[1] if until else None
+        term = normalise_term(term)
+        if term.endswith("*"):
+            # Terms sharing a prefix are adjacent in the primary key
+            query, parameters = "SELECT data FROM postings WHERE term >= ? AND term < ?", [term[:-1], term[:-1] + "\U0010ffff"]
+        else:
+            query, parameters = "SELECT data FROM postings WHERE term = ?", [term]
+        if start is not None:
+            query += " AND last_time >= ?"
+            parameters.append(start)
+        if end is not None:
+            query += " AND first_time <= ?"
+            parameters.append(end)
+
+        found = {}
+        for (data,) in self.connection.execute(query, parameters):
+            for created_at, tweet_id in decode_postings(data):
+                if (start is None or created_at >= start) and (end is None or created_at <= end):
+                    found[tweet_id] = created_at
+        return found
+
+    def evaluate(self, tree, since=None, until=None):
+        """
+        Evaluates a query tree from `parse_query`.
+
+        Returns:
+            dict: Tweet ID -> creation timestamp of every matching tweet.
+        """
+        if isinstance(tree, str):
+            return self.postings(tree, since, until)
+        operator, operands = tree
+        # Stop words do not narrow an AND and match nothing in an OR; drop them unless nothing else is left
+        operands = [operand for operand in operands if not isinstance(operand, str) or is_indexed(operand)] or operands
+        # Start AND from the rarest term so intersections stay small
+        results = sorted((self.evaluate(operand, since, until) for operand in operands), key=len)
+        found = dict(results[0])
+        for result in results[1:]:
+            if operator == "and":
+                found = {tweet_id: created_at for tweet_id, created_at in found.items() if tweet_id in result}
+            else:
+                found.update(result)
+        return found
+
+    def search(self, query, since=None, until=None, limit=None):
+        """
+        Finds the tweets matching a query.
+
+        Args:
+            query (str or tuple): A query string for `parse_query`, or a parsed tree.
+            since (str): Only return tweets created on or after this date, YYYY-MM-DD.
+            until (str): Only return tweets created on or before this date, YYYY-MM-DD.
+            limit (int): Maximum number of tweets to return. Every match is returned if omitted.
+
+        Returns:
+            list: Tweet IDs, latest first.
+        """
+        tree = parse_query(query) if isinstance(query, str) else query
+        found = self.evaluate(tree, since, until)
+        tweet_ids = sorted(found, key=lambda tweet_id: (found[tweet_id], tweet_id), reverse=True)
+        return tweet_ids[:limit] if limit is not None else tweet_ids
+
+    def locate(self, tweet_ids):
+        """
+        Finds the archives and weeks holding tweets.
+
+        Args:
+            tweet_ids (iterable): Tweet IDs as integers.
+
+        Returns:
+            dict: Tweet ID -> (archive, week_key), one location per tweet.
+        """
+        tweet_ids = list(tweet_ids)
+        locations = {}
+        for start in range(0, len(tweet_ids), QUERY_CHUNK_SIZE):
+            chunk = tweet_ids[start:start + QUERY_CHUNK_SIZE]
+            rows = self.connection.execute("SELECT tweet_id, archive, week_key FROM tweets "
+                                           f"WHERE tweet_id IN ({','.join('?' * len(chunk))})", chunk)
+            for tweet_id, archive, week_key in rows:
+                locations.setdefault(tweet_id, (archive, week_key))
+        return locations
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+# Function to read the archived tweets matching a query
+def search_archives(base_directory, query, since=None, until=None, limit=None):
+    """
+    Finds the archived tweets matching a query and reads them from their segments.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        query (str): A query for `parse_query`, e.g. '#informs2023 OR author:1709153696578478080'.
+        since (str): Only return tweets created on or after this date, YYYY-MM-DD.
+        until (str): Only return tweets created on or before this date, YYYY-MM-DD.
+        limit (int): Maximum number of tweets to return.
+
+    Returns:
+        list: (week_key, tweet) pairs, latest tweet first.
+    """
+    from tweet_archive import TweetArchive, get_tweet_id, open_search_index
+
+    index = open_search_index(base_directory)
+    try:
+        tweet_ids = index.search(query, since, until, limit)
+        locations = index.locate(tweet_ids)
+    finally:
+        index.close()
+
+    # Read every week holding a match once
+    weeks = defaultdict(set)
+    for archive, week_key in locations.values():
+        weeks[archive].add(week_key)
+    tweets = {}
+    for archive_name, week_keys in weeks.items():
+        with TweetArchive(base_directory, archive_name) as archive:
+            for week_key in week_keys:
+                for tweet in archive.read_week(week_key):
+                    tweet_id = int(get_tweet_id(tweet))
+                    if locations.get(tweet_id) == (archive_name, week_key):
+                        tweets[tweet_id] = (week_key, tweet)
+    return [tweets[tweet_id] for tweet_id in tweet_ids if tweet_id in tweets]
+
+# Function to start archiving a keyword from the tweets already archived
+def track_keyword(base_directory, keyword, since=None, until=None):
+    """
+    Fills the archive of a new keyword with the tweets of the other archives containing it.
+
+    Candidates are the tweets indexed under every indexed word of the keyword, the last word
+    as a prefix, e.g. 'smarter AND decisions*' for 'Smarter Decisions'. They are then checked
+    with `contains_keyword`, as fetched tweets are. Keywords matching inside a word (e.g.
+    'forms' in '#INFORMS') are not found.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        keyword (str): The new search keyword, e.g. '#INFORMS'.
+        since (str): Only add tweets created on or after this date, YYYY-MM-DD.
+        until (str): Only add tweets created on or before this date, YYYY-MM-DD.
+
+    Returns:
+        int: Number of tweets added to the keyword's archive.
+    """
+    from apify_config import contains_keyword, open_keyword_archive
+
+    words = [word for word in TERM_PATTERN.findall(keyword.lower()) if is_indexed(word)]
+    if not words:
+        raise ValueError(f"'{keyword}' has no indexed word to search for.")
+    tree = ("and", words[:-1] + [words[-1] + "*"])
+    tweets_by_week = defaultdict(list)
+    for week_key, tweet in search_archives(base_directory, tree, since, until):
+        if contains_keyword(tweet.get("text", ""), keyword):
+            tweets_by_week[week_key].append(tweet)
+
+    with open_keyword_archive(base_directory, keyword) as archive:
+        return archive.append(dict(tweets_by_week))
+
+def main():
+    from tweet_archive import index_archives
+
+    parser = argparse.ArgumentParser(description="Search the archived tweets, or add a keyword from them.")
+    parser.add_argument("query", nargs="?", help="e.g. '#INFORMS2023 (smarter OR author:1709153696578478080)'.")
+    parser.add_argument("--base-directory", default="TWEET_ARCHIEVE", help="Directory holding the archives.")
+    parser.add_argument("--since", help="Only tweets created on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--until", help="Only tweets created on or before this date (YYYY-MM-DD).")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--build", action="store_true", help="Index every archive that is missing or stale first.")
+    parser.add_argument("--track", metavar="KEYWORD", help="Archive a new keyword from the archived tweets.")
+    args = parser.parse_args()
+
+    if args.build:
+        for name, count in index_archives(args.base_directory).items():
+            print(f"{name}: {count} tweets indexed")
+    if args.track:
+        added = track_keyword(args.base_directory, args.track, args.since, args.until)
+        print(f"{added} archived tweets added to the archive of {args.track}.")
+    if args.query:
+        try:
+            results = search_archives(args.base_directory, args.query, args.since, args.until, args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+        for week_key, tweet in results:
+            print(f"{tweet['created_at']}  {tweet.get('author_id', '')}  {' '.join(tweet.get('text', '').split())[:100]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Import necessary libraries
+import logging
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from actor_input import build_run_input
+from run_metrics import METRICS
+
+# Defaults for the optional scheduler settings of apify_setup.json
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_PAGE_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 2.0
+
+# One actor run: a single keyword over a date sub-window
+Shard = namedtuple("Shard", ["keyword", "since_date", "until_date"])
+
+# Function to split a search into shards
+def make_shards(search_keywords, since_date, until_date, shard_days):
+    """
+    Splits a search into one shard per keyword and date sub-window.
+
+    Args:
+        search_keywords (list): The keywords to search for.
+        since_date (datetime): Start of the search window.
+        until_date (datetime): End of the search window.
+        shard_days (int): Length of each sub-window in days.
+
+    Returns:
+        list: Shards, ordered by keyword then date.
+    """
+    # The actor searches whole days, so align the sub-windows on midnight
+    since_date = datetime.combine(since_date.date(), datetime.min.time())
+    until_date = datetime.combine(until_date.date(), datetime.min.time())
+    shards = []
+    for keyword in dict.fromkeys(search_keywords):
+        window_start = since_date
+        while window_start < until_date:
+            window_end = min(window_start + timedelta(days=shard_days), until_date)
+            shards.append(Shard(keyword, window_start, window_end))
+            window_start = window_end
+    return shards
+
+# Function to download a dataset with parallel paginated reads
+def fetch_dataset_items(client, dataset_id, page_size=DEFAULT_PAGE_SIZE, page_concurrency=DEFAULT_PAGE_CONCURRENCY):
+    """
+    Downloads every item of a dataset, reading its pages concurrently.
+
+    The first page tells the dataset size; the remaining pages are then requested in parallel.
+
+    Args:
+        client: An ApifyClient, or any object exposing `dataset(id).list_items(offset=, limit=)`.
+        dataset_id (str): The dataset to download.
+        page_size (int): Number of items per page.
+        page_concurrency (int): Maximum number of pages read at the same time.
+
+    Returns:
+        list: The dataset items, in dataset order.
+    """
+    dataset = client.dataset(dataset_id)
+    first_page = dataset.list_items(offset=0, limit=page_size)
+    items = list(first_page.items)
+    if first_page.total <= len(items):
+        return items
+
+    offsets = range(len(items), first_page.total, page_size)
+    with ThreadPoolExecutor(max_workers=page_concurrency) as executor:
+        # map keeps the pages in dataset order
+        for page in executor.map(lambda offset: dataset.list_items(offset=offset, limit=page_size), offsets):
+            items.extend(page.items)
+    return items
+
+# Scheduler running actor shards concurrently
+class ShardScheduler:
+    """
+    Runs actor shards concurrently and yields their items as each shard completes.
+
+    Every shard is retried with exponential backoff on its own, so a failing
+    keyword or sub-window does not cost the rest of the search. Shards that still
+    fail are collected in `failed`.
+
+    Args:
+        client: An ApifyClient, or any object exposing `actor(id).call(run_input=)`
+                and `dataset(id).list_items(offset=, limit=)`.
+        setup (dict): The apify setup. `max_concurrency`, `page_size`, `page_concurrency`,
+                      `max_retries` and `retry_backoff` (seconds) are optional.
+    """
+
+    def __init__(self, client, setup):
+        self.client = client
+        self.setup = setup
+        self.max_concurrency = setup.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        self.page_size = setup.get("page_size", DEFAULT_PAGE_SIZE)
+        self.page_concurrency = setup.get("page_concurrency", DEFAULT_PAGE_CONCURRENCY)
+        self.max_retries = setup.get("max_retries", DEFAULT_MAX_RETRIES)
+        self.retry_backoff = setup.get("retry_backoff", DEFAULT_RETRY_BACKOFF)
+        self.failed = []
+
+    def run_shard(self, shard):
+        """
+        Runs the actor for one shard and downloads its dataset, retrying on failure.
+
+        A run that does not end with the SUCCEEDED status counts as a failure.
+
+        Args:
+            shard (Shard): The shard to run.
+
+        Returns:
+            list: The raw items of the shard.
+        """
+        run_input = build_run_input(self.setup, [shard.keyword], shard.since_date, shard.until_date)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with METRICS.stage("actor_run"):
+                    run = self.client.actor(self.setup['actor_id']).call(run_input=run_input)
+                if not run:
+                    raise RuntimeError("the actor run did not return")
+                # Failed, aborted and timed-out runs leave a partial dataset behind
+                if run.get("status") != "SUCCEEDED":
+                    raise RuntimeError(f"the actor run ended with status {run.get('status')}")
+                with METRICS.stage("download") as counts:
+                    items = fetch_dataset_items(self.client, run["defaultDatasetId"], self.page_size, self.page_concurrency)
+                    counts["items"] = len(items)
+                return items
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                # Exponential backoff with jitter so retried shards do not fire together
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logging.warning(f"Shard {format_shard(shard)} failed ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+    def run(self, shards):
+        """
+        Runs shards concurrently.
+
+        Args:
+            shards (list): The shards to run.
+
+        Yields:
+            tuple: (shard, items) for every successful shard, in completion order.
+        """
+        self.failed = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(self.run_shard, shard): shard for shard in shards}
+            for future in as_completed(futures):
+                # A finished future keeps its items; drop every reference once they are handed over
+                shard = futures.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    logging.error(f"Error running shard {format_shard(shard)}: {e}")
+                    self.failed.append(shard)
+                    continue
+                finally:
+                    del future
+                yield shard, items
+                del items
+
+# Function to describe a shard in log messages
+def format_shard(shard):
+    return f"{shard.keyword} {shard.since_date.strftime('%Y-%m-%d')}..{shard.until_date.strftime('%Y-%m-%d')}"
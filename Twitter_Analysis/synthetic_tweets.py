@@ -0,0 +1,120 @@
+# Import necessary libraries
+import random
+from datetime import datetime, timedelta
+from metric_aggregates import HASHTAG_PATTERN
+
+# Tweet fields mapping used by the default apify_setup.json
+TWEET_FIELDS = {"author_id": "user_id_str",
+                "created_at": "created_at",
+                "text": "full_text",
+                "tweet_id": "id_str",
+                "public_metrics": {
+                    "retweet_count": "retweet_count",
+                    "reply_count": "reply_count",
+                    "quote_count": "quote_count",
+                    "bookmark_count": "bookmark_count"},
+                "url": "url"
+                }
+
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+WORDS = ("analytics", "operations", "research", "optimization", "decisions", "smarter",
+         "conference", "meeting", "annual", "session", "keynote", "students", "award",
+         "data", "science", "model", "supply", "chain", "network", "great", "talk",
+         "poor", "wifi", "amazing", "phoenix", "panel", "poster", "career", "fair")
+
+# Function to build the list of synthetic search keywords
+def make_keywords(count):
+    """
+    Builds a list of distinct hashtag and mention keywords.
+
+    Args:
+        count (int): Number of keywords to build.
+
+    Returns:
+        list: Keywords such as '#INFORMS2023' and '@INFORMS'.
+    """
+    base = ["#INFORMS2023", "@INFORMS", "#INFORMS", "#ORMS", "#analytics"]
+    keywords = base[:count]
+    for index in range(len(keywords), count):
+        keywords.append(f"#Topic{index}")
+    return keywords
+
+# Function to copy a text the way retweets and reposts do
+def make_near_copy(text, rng):
+    """
+    Copies a tweet text as a retweet, a truncated retweet or a repost with another link.
+
+    Args:
+        text (str): The text to copy.
+        rng (random.Random): Random generator picking the kind of copy.
+
+    Returns:
+        str: The near copy.
+    """
+    variant = rng.randrange(3)
+    if variant == 0:
+        return f"RT @user{rng.randrange(1000)}: {text}"
+    if variant == 1:
+        words = text.split()
+        return f"RT @INFORMS: {' '.join(words[:max(1, len(words) * 9 // 10)])}…"
+    return f"{text} https://t.co/{rng.randrange(1 << 40):x}"
+
+# Function to generate raw actor items
+def make_tweets(count, keywords, seed=0, start=datetime(2023, 1, 2), days=365, duplicate_ratio=0.05,
+                first_id=1700000000000000000, entities=False, copy_ratio=0.0):
+    """
+    Generates raw tweets shaped like the items of the Apify tweet scraper dataset.
+
+    Args:
+        count (int): Number of tweets to generate.
+        keywords (list): Keywords to sprinkle into the tweet texts.
+        seed (int): Seed of the random generator, so corpora are reproducible.
+        start (datetime): Earliest creation date.
+        days (int): Number of days the creation dates are spread over.
+        duplicate_ratio (float): Share of tweets repeating an earlier tweet ID.
+        first_id (int): Tweet ID of the first tweet; IDs increase from there.
+        entities (bool): Add the `entities.hashtags` list of the actor, read from the text.
+        copy_ratio (float): Share of new tweets whose text is a near copy of an earlier tweet, posted
+            up to two days after it, as in viral weeks.
+
+    Returns:
+        list: Raw tweets as dictionaries.
+    """
+    rng = random.Random(seed)
+    tweets = []
+    for index in range(count):
+        if tweets and rng.random() < duplicate_ratio:
+            tweets.append(dict(rng.choice(tweets)))
+            continue
+
+        words = rng.choices(WORDS, k=rng.randint(8, 30))
+        for keyword in rng.sample(keywords, k=min(len(keywords), rng.randint(0, 3))):
+            words.insert(rng.randrange(len(words) + 1), keyword)
+        if rng.random() < 0.3:
+            words.insert(0, "RT @INFORMS:")
+        created_at = start + timedelta(seconds=rng.randrange(days * 86400))
+        if copy_ratio and tweets and rng.random() < copy_ratio:
+            # Copies follow the copied tweet within two days
+            original = rng.choice(tweets)
+            words = [make_near_copy(original["full_text"], rng)]
+            created_at = datetime.strptime(original["created_at"], CREATED_AT_FORMAT) + timedelta(
+                seconds=rng.randrange(2 * 86400))
+        tweet_id = str(first_id + index)
+        author_id = str(rng.randrange(1, 5000))
+        tweets.append({
+            "id_str": tweet_id,
+            "user_id_str": author_id,
+            "full_text": " ".join(words),
+            "created_at": created_at.strftime(CREATED_AT_FORMAT),
+            "retweet_count": rng.randrange(50),
+            "reply_count": rng.randrange(10),
+            "quote_count": rng.randrange(5),
+            "bookmark_count": rng.randrange(5),
+            "views_count": rng.randrange(10000),
+            "lang": "en",
+            "url": f"https://twitter.com/user{author_id}/status/{tweet_id}",
+        })
+        if entities:
+            tweets[-1]["entities"] = {"hashtags": [{"text": hashtag} for hashtag in HASHTAG_PATTERN.findall(tweets[-1]["full_text"])]}
+    return tweets
@@ -0,0 +1,370 @@
+# Import necessary libraries
+import json
+import logging
+import os
+import tempfile
+import time
+from metric_aggregates import MetricAggregates
+from run_metrics import METRICS
+from search_index import SearchIndex
+from tweet_id_index import TweetIdIndex
+from tweet_record import TweetRecord
+
+MANIFEST_FILE = "manifest.json"
+ID_INDEX_FILE = "ids.sqlite"
+AGGREGATES_FILE = "aggregates.sqlite"
+SEARCH_INDEX_FILE = "search_index.sqlite"
+SEGMENT_SUFFIX = ".jsonl"
+ARCHIVE_FORMAT = "weekly-jsonl"
+ARCHIVE_VERSION = 1
+
+# Function to read the ID of an archived tweet
+def get_tweet_id(tweet):
+    """
+    Reads the ID of an archived tweet.
+
+    Args:
+        tweet (dict or TweetRecord): An archived tweet. Archives written from the Twitter API use 'id'
+                                     while archives written from the Apify actor use 'tweet_id'.
+
+    Returns:
+        str or int: The tweet ID.
+    """
+    if isinstance(tweet, TweetRecord):
+        return tweet.tweet_id
+    return tweet["tweet_id"] if "tweet_id" in tweet else tweet["id"]
+
+# Function to write a JSON file atomically
+def write_json_atomic(file_path, data):
+    """
+    Writes JSON to a temporary file and renames it over the target.
+
+    Readers therefore see either the previous or the new content, never a partial file.
+
+    Args:
+        file_path (str): The file to write.
+        data: JSON serialisable data.
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Function to open the search index shared by the archives of a directory
+def open_search_index(base_directory):
+    """
+    Opens the inverted index of every archive of a directory.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+
+    Returns:
+        SearchIndex: The index, stored in `<base_directory>/search_index.sqlite`.
+    """
+    os.makedirs(base_directory, exist_ok=True)
+    return SearchIndex(os.path.join(base_directory, SEARCH_INDEX_FILE))
+
+# Segmented, append-only archive of one keyword's tweets
+class TweetArchive:
+    """
+    Stores the tweets of one search keyword as one JSONL segment per week plus a manifest.
+
+    Layout on disk::
+
+        <base_directory>/tweets_<name>/manifest.json
+        <base_directory>/tweets_<name>/2023-10-16_to_2023-10-22.jsonl
+
+    New tweets are appended to the segments of the weeks they belong to. The manifest
+    records how many bytes of each segment are committed and is replaced atomically
+    after the segments are synced, so an interrupted write is discarded on the next append.
+    Tweet IDs are kept in a persistent `TweetIdIndex` so known tweets are skipped
+    without reading any segment, the public_metrics of new tweets are added to
+    `MetricAggregates` so reports never rescan the segments, and their terms, hashtags
+    and author are added to the `SearchIndex` shared by the archives of the directory.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+        name (str): Name of the archive, usually the search keyword.
+    """
+
+    def __init__(self, base_directory, name):
+        self.name = name
+        self.base_directory = base_directory
+        self.path = os.path.join(base_directory, f"tweets_{name}")
+        self.manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        self._id_index = None
+        self._aggregates = None
+        self._search_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._id_index is not None:
+            self._id_index.close()
+            self._id_index = None
+        if self._aggregates is not None:
+            self._aggregates.close()
+            self._aggregates = None
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+
+    def _load_manifest(self):
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        return {"name": self.name, "format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "weeks": {}}
+
+    def exists(self):
+        """
+        Returns:
+            bool: True if the archive has been written to disk.
+        """
+        return os.path.isfile(self.manifest_path)
+
+    @property
+    def id_index(self):
+        """
+        The ID index of the archive, rebuilt from the segments if it is missing or stale.
+        """
+        if self._id_index is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._id_index = TweetIdIndex(os.path.join(self.path, ID_INDEX_FILE))
+            if self._id_index.committed_count() != self.count():
+                self._id_index.rebuild(((get_tweet_id(tweet), week_key)
+                                        for week_key in self.weeks()
+                                        for tweet in self.read_week(week_key)), self.count())
+        return self._id_index
+
+    @property
+    def aggregates(self):
+        """
+        The public_metrics aggregates of the archive, rebuilt from the segments if they are missing or stale.
+        """
+        if self._aggregates is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._aggregates = MetricAggregates(os.path.join(self.path, AGGREGATES_FILE))
+            if self._aggregates.committed_count() != self.count():
+                self._aggregates.rebuild(((week_key, self.read_week(week_key)) for week_key in self.weeks()), self.count())
+        return self._aggregates
+
+    @property
+    def search_index(self):
+        """
+        The search index of the directory, with this archive reindexed if it is missing or stale.
+        """
+        if self._search_index is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._search_index = open_search_index(self.base_directory)
+            if self._search_index.committed_count(self.name) != self.count():
+                self._search_index.rebuild(self.name, ((week_key, self.read_week(week_key)) for week_key in self.weeks()),
+                                           self.count())
+        return self._search_index
+
+    def segment_path(self, week_key):
+        return os.path.join(self.path, f"{week_key}{SEGMENT_SUFFIX}")
+
+    def weeks(self):
+        """
+        Returns:
+            list: Week keys stored in the archive, latest week first.
+        """
+        return sorted(self.manifest["weeks"], reverse=True)
+
+    def count(self):
+        """
+        Returns:
+            int: Number of tweets stored in the archive.
+        """
+        return sum(week["tweets"] for week in self.manifest["weeks"].values())
+
+    def read_week(self, week_key):
+        """
+        Reads the committed tweets of one week.
+
+        Args:
+            week_key (str): The week to read, e.g. '2023-10-16_to_2023-10-22'.
+
+        Returns:
+            list: Tweets of the week sorted by their creation date (latest first).
+        """
+        week = self.manifest["weeks"].get(week_key)
+        if not week:
+            return []
+
+        with METRICS.stage("read") as counts:
+            with open(self.segment_path(week_key), 'rb') as file:
+                # Ignore anything past the committed length, e.g. an interrupted append
+                content = file.read(week["bytes"])
+            tweets = [json.loads(line) for line in content.splitlines() if line]
+            counts.update(items=len(tweets), bytes_read=len(content))
+        return sorted(tweets, key=lambda x: x["created_at"], reverse=True)
+
+    def read_weeks(self, week_keys=None):
+        """
+        Reads several weeks in the layout of the legacy `tweets_<keyword>.json` files.
+
+        Args:
+            week_keys (iterable): Weeks to read. Every week is read if omitted.
+
+        Returns:
+            dict: A dictionary where keys are week ranges and values are lists of tweets,
+                  latest week first.
+        """
+        stored = self.manifest["weeks"]
+        selected = self.weeks() if week_keys is None else sorted((key for key in week_keys if key in stored), reverse=True)
+        return {week_key: self.read_week(week_key) for week_key in selected}
+
+    def append(self, tweets_by_week):
+        """
+        Appends tweets to the segments of their weeks.
+
+        Tweets already stored in the archive, or repeated within `tweets_by_week`, are skipped,
+        so overlapping runs merge into existing weeks tweet by tweet. Tweets without a numeric
+        ID are skipped with a warning.
+
+        Args:
+            tweets_by_week (dict): A dictionary where keys are week ranges and values are lists of tweets,
+                                   as dicts or `TweetRecord`s.
+
+        Returns:
+            int: Number of tweets written.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # Bring the indexes up to date before the segments change; rebuilding a stale one is index
+        # time, except for reading its segments, which read_week already records as read time
+        index_start = time.perf_counter()
+        read_seconds = METRICS.seconds("read")
+        id_index = self.id_index
+        aggregates = self.aggregates
+        search_index = self.search_index
+        read_seconds = METRICS.seconds("read") - read_seconds
+        METRICS.add("index", time.perf_counter() - index_start - read_seconds, calls=0)
+
+        merge_start = time.perf_counter()
+        # Tweets are indexed by their numeric ID; skip the ones without one rather than the whole batch
+        ids_by_week = {}
+        skipped = 0
+        for week_key, tweets in tweets_by_week.items():
+            ids_by_week[week_key] = []
+            for tweet in tweets:
+                try:
+                    ids_by_week[week_key].append((int(get_tweet_id(tweet)), tweet))
+                except (KeyError, TypeError, ValueError):
+                    skipped += 1
+        if skipped:
+            logging.warning(f"Skipped {skipped} tweets without a numeric ID in {self.name}.")
+
+        known_ids = id_index.known_ids(tweet_id for tweets in ids_by_week.values() for tweet_id, _ in tweets)
+        new_entries = []
+        new_tweets_by_week = {}
+        write_seconds = 0.0
+        bytes_written = 0
+
+        for week_key, tweets in ids_by_week.items():
+            week = self.manifest["weeks"].get(week_key, {"tweets": 0, "bytes": 0})
+
+            lines = []
+            new_tweets = []
+            for tweet_id, tweet in tweets:
+                if tweet_id in known_ids:
+                    continue
+                known_ids.add(tweet_id)
+                new_entries.append((tweet_id, week_key))
+                if isinstance(tweet, TweetRecord):
+                    # Serialise records only once they are known to be new
+                    tweet = tweet.to_json()
+                lines.append(json.dumps(tweet, ensure_ascii=False) + "\n")
+                new_tweets.append(tweet)
+
+            if not lines:
+                continue
+            new_tweets_by_week[week_key] = new_tweets
+
+            write_start = time.perf_counter()
+            segment_path = self.segment_path(week_key)
+            with open(segment_path, 'r+b' if os.path.exists(segment_path) else 'wb') as file:
+                # Drop any uncommitted tail before appending
+                file.truncate(week["bytes"])
+                file.seek(week["bytes"])
+                file.write("".join(lines).encode('utf-8'))
+                file.flush()
+                os.fsync(file.fileno())
+                size = file.tell()
+            write_seconds += time.perf_counter() - write_start
+            bytes_written += size - week["bytes"]
+
+            self.manifest["weeks"][week_key] = {"tweets": week["tweets"] + len(lines), "bytes": size}
+
+        # Deduplication and serialisation, without the segment writes
+        METRICS.add("merge", time.perf_counter() - merge_start - write_seconds, items=len(new_entries))
+        if new_entries or not self.exists():
+            # Commit the new segment lengths, then record the IDs and metrics they contain
+            write_start = time.perf_counter()
+            write_json_atomic(self.manifest_path, self.manifest)
+            METRICS.add("write", write_seconds + time.perf_counter() - write_start, items=len(new_entries),
+                        bytes_written=bytes_written + os.path.getsize(self.manifest_path))
+            with METRICS.stage("index", items=len(new_entries)):
+                id_index.add(new_entries, self.count())
+                aggregates.add(new_tweets_by_week, self.count())
+                search_index.add(self.name, new_tweets_by_week, self.count())
+
+        return len(new_entries)
+
+# Function to bring the search index of every archive of a directory up to date
+def index_archives(base_directory):
+    """
+    Indexes every segmented archive of a directory that is missing from the search index or stale.
+
+    Legacy `tweets_<keyword>.json` files are not indexed until they are migrated.
+
+    Args:
+        base_directory (str): Directory holding the archives.
+
+    Returns:
+        dict: Archive name -> number of tweets indexed.
+    """
+    counts = {}
+    for entry in sorted(os.listdir(base_directory)):
+        if entry.startswith("tweets_") and os.path.isfile(os.path.join(base_directory, entry, MANIFEST_FILE)):
+            with TweetArchive(base_directory, entry[len("tweets_"):]) as archive:
+                archive.search_index
+                counts[archive.name] = archive.count()
+    return counts
+
+# Function to convert a legacy tweets_<keyword>.json file into a segmented archive
+def migrate_json_archive(json_path, base_directory=None):
+    """
+    Converts a legacy week-keyed JSON archive into a segmented archive.
+
+    Args:
+        json_path (str): Path of the legacy file, e.g. 'TWEET_ARCHIEVE/tweets_@INFORMS.json'.
+        base_directory (str): Directory to write the archive to. Defaults to the directory of `json_path`.
+
+    Returns:
+        TweetArchive: The archive the tweets were written to.
+    """
+    file_name = os.path.basename(json_path)
+    name = os.path.splitext(file_name)[0]
+    if name.startswith("tweets_"):
+        name = name[len("tweets_"):]
+
+    with open(json_path, 'r', encoding='utf-8') as file:
+        tweets_by_week = json.load(file)
+
+    with TweetArchive(base_directory or os.path.dirname(json_path), name) as archive:
+        archive.append(tweets_by_week)
+    return archive
@@ -0,0 +1,91 @@
+# Import necessary libraries
+import sqlite3
+
+# Maximum number of parameters bound in a single SQLite query
+QUERY_CHUNK_SIZE = 500
+
+# Persistent index of the tweet IDs stored in an archive
+class TweetIdIndex:
+    """
+    Keeps the IDs of archived tweets in a SQLite table keyed by the int64 tweet ID.
+
+    Lookups go through the primary key B-tree on disk, so deduplicating a batch costs
+    O(batch) queries whatever the size of the archive and memory stays flat.
+    The number of committed tweets is recorded alongside the IDs so the owner can
+    detect an index that fell behind its data and rebuild it.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS tweet_ids (
+                tweet_id INTEGER PRIMARY KEY,
+                week_key TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def committed_count(self):
+        """
+        Returns:
+            int: Number of tweets the index was last committed with.
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'tweets'").fetchone()
+        return row[0] if row else 0
+
+    def known_ids(self, tweet_ids):
+        """
+        Finds which of the given tweet IDs are already indexed.
+
+        Args:
+            tweet_ids (iterable): Tweet IDs as strings or integers.
+
+        Returns:
+            set: The indexed IDs, as integers.
+        """
+        tweet_ids = list({int(tweet_id) for tweet_id in tweet_ids})
+        known = set()
+        for start in range(0, len(tweet_ids), QUERY_CHUNK_SIZE):
+            chunk = tweet_ids[start:start + QUERY_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(f"SELECT tweet_id FROM tweet_ids WHERE tweet_id IN ({placeholders})", chunk)
+            known.update(row[0] for row in rows)
+        return known
+
+    def add(self, entries, committed_count):
+        """
+        Indexes new tweets in a single transaction.
+
+        Args:
+            entries (iterable): (tweet_id, week_key) pairs.
+            committed_count (int): Number of tweets in the archive once these are added.
+        """
+        with self.connection:
+            self._insert(entries, committed_count)
+
+    def rebuild(self, entries, committed_count):
+        """
+        Replaces the whole index in a single transaction.
+
+        Args:
+            entries (iterable): (tweet_id, week_key) pairs of every archived tweet.
+            committed_count (int): Number of tweets in the archive.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM tweet_ids")
+            self._insert(entries, committed_count)
+
+    def _insert(self, entries, committed_count):
+        self.connection.executemany("INSERT OR IGNORE INTO tweet_ids (tweet_id, week_key) VALUES (?, ?)",
+                                    ((int(tweet_id), week_key) for tweet_id, week_key in entries))
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tweets', ?)", (committed_count,))
+
+    def close(self):
+        self.connection.close()
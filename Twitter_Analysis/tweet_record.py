@@ -0,0 +1,171 @@
+# Import necessary libraries
+import json
+import sys
+from tweet_time import DateParser, format_archive_date
+
+# Kinds of schema fields
+TWEET_ID, AUTHOR_ID, CREATED_AT, TEXT, HASHTAGS, VALUE, NESTED = range(7)
+
+# Marker of a field missing from the item
+MISSING = object()
+
+# Compact tweet record
+class TweetRecord:
+    """
+    A tweet held in `__slots__` instead of a dict.
+
+    The tweet ID is kept as an int, the author ID and hashtags are interned so repeated
+    authors share one string, the creation date is an int timestamp and every other
+    field, public metrics included, is flattened into one tuple laid out by the schema.
+    Records are turned back into dicts only at the edges, with `to_json`.
+    """
+
+    __slots__ = ("schema", "tweet_id", "author_id", "created_at", "text", "hashtags", "values")
+
+    def to_json(self):
+        """
+        Returns:
+            dict: The tweet in the layout of its schema: the output names of its field mapping in
+                  order, nested mappings such as `public_metrics` as nested dicts, and 'created_at'
+                  written like '2023-10-18T14:05:00.000Z' when the schema parses creation dates,
+                  as the archives store it.
+        """
+        return self.schema.to_json(self)
+
+    def dumps(self):
+        """
+        Returns:
+            str: The tweet serialised as one JSON line, without a line break.
+        """
+        return json.dumps(self.to_json(), ensure_ascii=False)
+
+    def __eq__(self, other):
+        if not isinstance(other, TweetRecord):
+            return NotImplemented
+        return self.to_json() == other.to_json()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"TweetRecord({self.to_json()!r})"
+
+# Layout shared by the records of one field mapping
+class TweetSchema:
+    """
+    Builds `TweetRecord`s from raw items and serialises them back.
+
+    The field mapping has the shape of `tweet_fields` in apify_setup.json: output names map
+    to an item key, or to a nested mapping such as `public_metrics`. A value may also be a
+    function computing the field from the item. The output names 'tweet_id', 'author_id',
+    'created_at', 'text' and 'hashtags' (a list of hashtag texts, written as [{'text': ...}])
+    get compact typed slots.
+
+    Args:
+        fields (dict): Output name -> item key, nested mapping or function.
+        created_at_format (str): Format of the item's creation date. If omitted, 'created_at'
+                                 is copied as-is instead of being reformatted for the archive.
+        omit_missing (bool): Leave fields missing from the item out of the output instead of writing "".
+    """
+
+    def __init__(self, fields, created_at_format=None, omit_missing=False):
+        self.fields = fields
+        self.created_at_format = created_at_format
+        self.omit_missing = omit_missing
+        self.date_parser = DateParser(created_at_format) if created_at_format else None
+        self.layout = []  # (output name, kind, item key, position in values or nested layout)
+        self.value_count = 0
+
+        slots = {"tweet_id": TWEET_ID, "author_id": AUTHOR_ID, "text": TEXT, "hashtags": HASHTAGS}
+        if created_at_format:
+            slots["created_at"] = CREATED_AT
+        for name, source in fields.items():
+            if isinstance(source, dict):
+                nested = []
+                for nested_name, nested_source in source.items():
+                    nested.append((nested_name, nested_source, self.value_count))
+                    self.value_count += 1
+                self.layout.append((name, NESTED, None, nested))
+            elif name in slots:
+                self.layout.append((name, slots[name], source, None))
+            else:
+                self.layout.append((name, VALUE, source, self.value_count))
+                self.value_count += 1
+
+    def _read(self, item, source):
+        if callable(source):
+            return source(item)
+        return item.get(source, MISSING if self.omit_missing else "")
+
+    def record(self, item, timestamp=None):
+        """
+        Builds the record of a raw item.
+
+        Args:
+            item (dict): The raw tweet returned by the actor.
+            timestamp (int): The creation date from `DateParser.parse`, if the caller already parsed it.
+
+        Returns:
+            TweetRecord: The compact record.
+        """
+        record = TweetRecord()
+        record.schema = self
+        record.tweet_id = record.author_id = record.created_at = record.text = record.hashtags = MISSING
+        values = [MISSING] * self.value_count
+
+        for name, kind, source, position in self.layout:
+            if kind == NESTED:
+                for _, nested_source, nested_position in position:
+                    values[nested_position] = self._read(item, nested_source)
+            elif kind == VALUE:
+                values[position] = self._read(item, source)
+            elif kind == TWEET_ID:
+                tweet_id = self._read(item, source)
+                record.tweet_id = int(tweet_id) if isinstance(tweet_id, str) and tweet_id.isdigit() else tweet_id
+            elif kind == AUTHOR_ID:
+                author_id = self._read(item, source)
+                record.author_id = sys.intern(author_id) if isinstance(author_id, str) else author_id
+            elif kind == CREATED_AT:
+                if timestamp is None:
+                    timestamp = self.date_parser.parse(item[source])[0]
+                record.created_at = timestamp
+            elif kind == TEXT:
+                record.text = self._read(item, source)
+            elif kind == HASHTAGS:
+                hashtags = self._read(item, source)
+                record.hashtags = tuple(sys.intern(hashtag) for hashtag in hashtags) if hashtags is not MISSING else hashtags
+
+        record.values = tuple(values)
+        return record
+
+    def to_json(self, record):
+        """
+        Serialises a record into the output layout.
+
+        Args:
+            record (TweetRecord): A record built by this schema.
+
+        Returns:
+            dict: The tweet, with fields in the order of the mapping.
+        """
+        tweet_json = {}
+        values = record.values
+        for name, kind, _, position in self.layout:
+            if kind == NESTED:
+                tweet_json[name] = {nested_name: values[nested_position] for nested_name, _, nested_position in position
+                                    if values[nested_position] is not MISSING}
+                continue
+            if kind == VALUE:
+                value = values[position]
+            elif kind == TWEET_ID:
+                value = str(record.tweet_id) if isinstance(record.tweet_id, int) else record.tweet_id
+            elif kind == AUTHOR_ID:
+                value = record.author_id
+            elif kind == CREATED_AT:
+                value = format_archive_date(record.created_at)
+            elif kind == TEXT:
+                value = record.text
+            else:
+                value = [{'text': hashtag} for hashtag in record.hashtags] if record.hashtags is not MISSING else MISSING
+            if value is not MISSING:
+                tweet_json[name] = value
+        return tweet_json
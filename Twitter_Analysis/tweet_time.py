@@ -0,0 +1,146 @@
+# Import necessary libraries
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# Creation date format of the Apify tweet scraper (and of the Twitter v1.1 API)
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+# English month and day names; Twitter dates do not depend on the locale
+MONTHS = {name: number for number, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1)}
+WEEKDAYS = frozenset(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"))
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SECONDS_PER_DAY = 86400
+
+# Function to compute the week key of a day, memoized by date ordinal
+@lru_cache(maxsize=4096)
+def week_key_for_ordinal(ordinal):
+    """
+    Computes the Monday-to-Sunday week key of a day.
+
+    Args:
+        ordinal (int): The proleptic Gregorian ordinal of the day, as `date.toordinal()`.
+
+    Returns:
+        str: The week key, e.g. '2023-10-16_to_2023-10-22'.
+    """
+    start_of_week = date.fromordinal(ordinal - (ordinal - 1) % 7)
+    end_of_week = start_of_week + timedelta(days=6)
+    return f"{start_of_week.isoformat()}_to_{end_of_week.isoformat()}"
+
+# Function to format the day part of an archived creation date, memoized by day
+@lru_cache(maxsize=4096)
+def archive_day_prefix(day):
+    return date.fromordinal(EPOCH_ORDINAL + day).isoformat() + "T"
+
+# Function to format a timestamp as an archived creation date
+def format_archive_date(timestamp):
+    """
+    Formats a timestamp like `time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(timestamp))`.
+
+    Args:
+        timestamp (int): Seconds since the epoch.
+
+    Returns:
+        str: The date, e.g. '2023-10-16T10:00:00.000Z'.
+    """
+    day, seconds = divmod(timestamp, SECONDS_PER_DAY)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{archive_day_prefix(day)}{hours:02d}:{minutes:02d}:{seconds:02d}.000Z"
+
+# Function to compute the days since the epoch of an ISO date, memoized by day
+@lru_cache(maxsize=4096)
+def iso_day_number(day):
+    return date.fromisoformat(day).toordinal() - EPOCH_ORDINAL
+
+# Function to parse an archived creation date
+def parse_archive_date(value):
+    """
+    Parses a creation date written by `format_archive_date`, the inverse of that function.
+
+    Args:
+        value (str): The date, e.g. '2023-10-16T10:00:00.000Z'.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    return iso_day_number(value[:10]) * SECONDS_PER_DAY + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+# Function to parse the day of a Twitter creation date, memoized since tweets share few days
+@lru_cache(maxsize=4096)
+def twitter_day_ordinal(day):
+    """
+    Parses the day fields of a Twitter creation date.
+
+    Args:
+        day (str): The weekday, month, day and year fields, e.g. 'Mon Oct 16 2023'.
+
+    Returns:
+        int: The ordinal of the day, or None if the fields are not valid.
+    """
+    weekday, month, day_of_month, year = day[:3], day[4:7], day[8:10], day[11:]
+    if weekday not in WEEKDAYS or month not in MONTHS or day[3] != " " or day[7] != " " or day[10] != " " \
+            or not day_of_month.isdigit() or not year.isdigit() or len(year) != 4:
+        return None
+    try:
+        return date(int(year), MONTHS[month], int(day_of_month)).toordinal()
+    except ValueError:
+        return None
+
+# Function to split a Twitter creation date without strptime
+def split_twitter_date(value):
+    """
+    Parses a creation date in `TWITTER_DATE_FORMAT` by slicing its fixed-width fields.
+
+    Args:
+        value (str): The date, e.g. 'Mon Oct 16 10:00:00 +0000 2023'.
+
+    Returns:
+        tuple: (ordinal, seconds since midnight), or None if the value is not in the fixed layout.
+    """
+    if len(value) != 30 or value[19:26] != " +0000 " or value[13] != ":" or value[16] != ":":
+        return None
+    ordinal = twitter_day_ordinal(value[:11] + value[26:])
+    hours, minutes, seconds = value[11:13], value[14:16], value[17:19]
+    if ordinal is None or not (hours.isdigit() and minutes.isdigit() and seconds.isdigit()):
+        return None
+    hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+    if hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    return ordinal, hours * 3600 + minutes * 60 + seconds
+
+# Parser of the creation dates of one format
+class DateParser:
+    """
+    Parses creation dates into a timestamp and a week key.
+
+    Dates in `TWITTER_DATE_FORMAT` are sliced directly, other formats (and any value
+    the fast path does not recognise) go through `datetime.strptime`, so both paths
+    accept and reject the same values. Week keys are memoized by day.
+
+    Args:
+        created_at_format (str): The format of the 'created_at' field in tweets.
+    """
+
+    def __init__(self, created_at_format):
+        self.created_at_format = created_at_format
+        self.fast = created_at_format == TWITTER_DATE_FORMAT
+
+    def parse(self, value):
+        """
+        Parses a creation date.
+
+        Args:
+            value (str): The creation date.
+
+        Returns:
+            tuple: (timestamp, week_key). The timestamp counts the seconds of the wall-clock time
+                   since the epoch, the way the archive formats dates.
+        """
+        parsed = split_twitter_date(value) if self.fast else None
+        if parsed is None:
+            created_at = datetime.strptime(value, self.created_at_format)
+            parsed = created_at.toordinal(), created_at.hour * 3600 + created_at.minute * 60 + created_at.second
+        ordinal, seconds = parsed
+        return (ordinal - EPOCH_ORDINAL) * SECONDS_PER_DAY + seconds, week_key_for_ordinal(ordinal)